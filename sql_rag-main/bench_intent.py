@@ -0,0 +1,64 @@
+import argparse
+import time
+
+import spacy
+
+import intent_analyzer
+from intent_analyzer import EXCLUDED_COMPONENTS, SPACY_MODEL, analyze_queries, analyze_query, context_from_doc
+
+QUERIES = [
+    "The list of sales events being attended by finance companies",
+    "Which companies with more than 1000 employees attend fintech conferences?",
+    "Show me all healthcare events in Singapore in 2025",
+    "People working at oil and gas companies in Texas",
+    "Which trade shows are exhibiting aerospace firms?",
+    "List events where software businesses are sponsors",
+    "How many CTOs work at companies exhibiting at AHICE South East Asia?",
+    "Find large technology corporations participating in cybersecurity workshops",
+]
+
+
+def timed(fn):
+    start = time.perf_counter()
+    result = fn()
+    return result, time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Startup time and per-query latency of the intent analyzer.")
+    parser.add_argument('--repeat', type=int, default=25, help='Times the query set is repeated.')
+    parser.add_argument('--batch_size', type=int, default=64, help='nlp.pipe batch size.')
+    args = parser.parse_args()
+
+    full, full_load = timed(lambda: spacy.load(SPACY_MODEL))
+    lean, lean_load = timed(lambda: spacy.load(SPACY_MODEL, exclude=EXCLUDED_COMPONENTS))
+    print(f"startup: full pipeline {full_load:.2f}s {full.pipe_names}")
+    print(f"startup: lean pipeline {lean_load:.2f}s {lean.pipe_names}")
+
+    disagreements = [q for q in QUERIES if context_from_doc(full(q)) != context_from_doc(lean(q))]
+    print(f"full vs lean contexts disagree on {len(disagreements)} of {len(QUERIES)} queries")
+
+    workload = QUERIES * args.repeat
+    n = len(workload)
+    intent_analyzer._nlp = full
+    _, full_time = timed(lambda: [context_from_doc(full(q)) for q in workload])
+    _, lean_time = timed(lambda: [context_from_doc(lean(q)) for q in workload])
+    _, pipe_time = timed(lambda: [context_from_doc(d) for d in lean.pipe(workload, batch_size=args.batch_size)])
+
+    intent_analyzer._nlp = lean
+    intent_analyzer.clear_cache()
+    _, memo_time = timed(lambda: [analyze_query(q) for q in workload])
+    intent_analyzer.clear_cache()
+    _, batch_time = timed(lambda: analyze_queries(workload, batch_size=args.batch_size))
+
+    print(f"{'mode':<34} {'ms/query':>9}")
+    for name, elapsed in [("full pipeline, one doc per query", full_time),
+                          ("lean pipeline, one doc per query", lean_time),
+                          ("lean pipeline, nlp.pipe", pipe_time),
+                          ("analyze_query (memoized)", memo_time),
+                          ("analyze_queries (memoized + pipe)", batch_time)]:
+        print(f"{name:<34} {elapsed * 1000 / n:>9.3f}")
+
+
+if __name__ == "__main__":
+    main()
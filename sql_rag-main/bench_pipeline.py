@@ -0,0 +1,250 @@
+import argparse
+import json
+import os
+import platform
+import sqlite3
+import subprocess
+import sys
+import threading
+import time
+import tracemalloc
+from collections import Counter, defaultdict
+from concurrent.futures import ThreadPoolExecutor
+
+# Offline end-to-end benchmark: the LLM is replaced by recorded SQL/summaries (llm_backend.ReplayBackend)
+# and the response cache is disabled, so every question runs the full pipeline against the database.
+os.environ["RESPONSE_CACHE_SIZE"] = "0"
+os.environ["RESPONSE_CACHE_SEMANTIC"] = "0"
+# full-scan warnings from the recorded SQL would drown out the report
+os.environ.setdefault("LOG_LEVEL", "ERROR")
+
+from bench_templates import CORPUS_PATH, load_corpus, percentile
+from database_api import run_query
+from db_pool import DB_PATH
+from llm_backend import LLM_REPLAY_PATH, GroqBackend, RecordingBackend, ReplayBackend, set_backend
+from tracing import add_trace_listener, configure_logging, remove_trace_listener
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+# Relative change treated as a regression when comparing two runs, and the absolute floors
+# below which latency and memory differences are noise.
+REGRESSION_THRESHOLD = 0.10
+NOISE_FLOOR_MS = 0.5
+NOISE_FLOOR_MB = 1.0
+
+
+class TraceCollector:
+    def __init__(self):
+        self.stages = defaultdict(list)
+        self.outcomes = Counter()
+        self._lock = threading.Lock()
+
+    def __call__(self, trace):
+        with self._lock:
+            for stage, seconds in trace.spans:
+                self.stages[stage].append(seconds * 1000)
+            self.stages['total'].append(trace.elapsed * 1000)
+            self.outcomes[trace.attributes.get('outcome', 'llm')] += 1
+
+
+def summarize_ms(values):
+    return {
+        'count': len(values),
+        'mean_ms': sum(values) / len(values) if values else 0.0,
+        'p50_ms': percentile(values, 0.50),
+        'p95_ms': percentile(values, 0.95),
+        'p99_ms': percentile(values, 0.99),
+    }
+
+
+def ask(query):
+    # run_query rather than process(): process() logs and swallows errors, which would hide them here.
+    start = time.perf_counter()
+    try:
+        run_query(query)
+        return (time.perf_counter() - start) * 1000, None
+    except Exception as e:
+        return (time.perf_counter() - start) * 1000, str(e)
+
+
+def run_stages(queries, repeat):
+    # Sequential passes, so stage timings are not inflated by contention.
+    collector = TraceCollector()
+    add_trace_listener(collector)
+    errors = []
+    try:
+        for _ in range(repeat):
+            for query in queries:
+                _, error = ask(query)
+                if error:
+                    errors.append(f"{query}: {error}")
+    finally:
+        remove_trace_listener(collector)
+    stages = {stage: summarize_ms(values) for stage, values in sorted(collector.stages.items())}
+    return stages, dict(collector.outcomes), errors
+
+
+def run_throughput(queries, concurrency, repeat):
+    work = [query for _ in range(repeat) for query in queries]
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        results = list(pool.map(ask, work))
+    wall = time.perf_counter() - start
+    latencies = [ms for ms, error in results if error is None]
+    report = summarize_ms(latencies)
+    report.update({
+        'concurrency': concurrency,
+        'errors': sum(1 for _, error in results if error is not None),
+        'wall_s': wall,
+        'throughput_qps': len(latencies) / wall if wall else 0.0,
+    })
+    return report
+
+
+def run_memory(queries):
+    # A separate pass: tracemalloc slows allocation-heavy code, so it is kept out of the timings.
+    tracemalloc.start()
+    try:
+        for query in queries:
+            ask(query)
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    memory = {'peak_traced_mb': peak / 2 ** 20}
+    if resource is not None:
+        # ru_maxrss is KiB on Linux, bytes on macOS
+        scale = 2 ** 20 if sys.platform == 'darwin' else 2 ** 10
+        memory['peak_rss_mb'] = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / scale
+    return memory
+
+
+def build_info():
+    here = os.path.dirname(os.path.abspath(__file__))
+    try:
+        revision = subprocess.run(['git', 'describe', '--always', '--dirty'], cwd=here, capture_output=True,
+                                  text=True, timeout=10).stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        revision = None
+    return {
+        'revision': revision,
+        'python': platform.python_version(),
+        'sqlite': sqlite3.sqlite_version,
+        'database': os.path.abspath(DB_PATH),
+        'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S'),
+    }
+
+
+def print_report(results):
+    build = results['build']
+    print(f"build {build['revision']}  python {build['python']}  sqlite {build['sqlite']}  db {build['database']}")
+    print(f"{'stage':<14} {'count':>6} {'mean_ms':>9} {'p50_ms':>9} {'p95_ms':>9} {'p99_ms':>9}")
+    for stage, s in results['stages'].items():
+        print(f"{stage:<14} {s['count']:>6} {s['mean_ms']:>9.2f} {s['p50_ms']:>9.2f} {s['p95_ms']:>9.2f} {s['p99_ms']:>9.2f}")
+    print("outcomes: " + ', '.join(f"{name}={count}" for name, count in sorted(results['outcomes'].items())))
+    print(f"{'clients':>8} {'done':>6} {'errors':>6} {'qps':>8} {'p50_ms':>9} {'p95_ms':>9} {'p99_ms':>9}")
+    for t in results['throughput']:
+        print(f"{t['concurrency']:>8} {t['count']:>6} {t['errors']:>6} {t['throughput_qps']:>8.2f} "
+              f"{t['p50_ms']:>9.2f} {t['p95_ms']:>9.2f} {t['p99_ms']:>9.2f}")
+    print("memory: " + ', '.join(f"{name}={value:.1f}" for name, value in results['memory'].items()))
+    for error in results['errors'][:5]:
+        print(f"error: {error}")
+
+
+def compare_results(old, new, threshold=REGRESSION_THRESHOLD):
+    # Prints old vs new for every shared metric; returns the metrics that got worse by more
+    # than `threshold` (latency and memory up, throughput down).
+    rows = []
+    for stage in sorted(set(old['stages']) & set(new['stages'])):
+        for key in ('p50_ms', 'p95_ms', 'p99_ms'):
+            rows.append((f"{stage} {key}", old['stages'][stage][key], new['stages'][stage][key], False))
+    old_throughput = {t['concurrency']: t for t in old['throughput']}
+    for t in new['throughput']:
+        base = old_throughput.get(t['concurrency'])
+        if base is not None:
+            rows.append((f"qps @{t['concurrency']}", base['throughput_qps'], t['throughput_qps'], True))
+            rows.append((f"p95_ms @{t['concurrency']}", base['p95_ms'], t['p95_ms'], False))
+    for key in sorted(set(old['memory']) & set(new['memory'])):
+        rows.append((key, old['memory'][key], new['memory'][key], False))
+
+    print(f"comparing {old['build']['revision']} -> {new['build']['revision']}")
+    for key in ('corpus', 'repeat', 'llm_latency'):
+        if old['settings'].get(key) != new['settings'].get(key):
+            print(f"warning: {key} differs ({old['settings'].get(key)} vs {new['settings'].get(key)}), "
+                  "latencies are not comparable")
+    print(f"{'metric':<26} {'old':>10} {'new':>10} {'change':>8}")
+    regressions = []
+    for name, before, after, higher_is_better in rows:
+        change = (after - before) / before if before else 0.0
+        worse = -change if higher_is_better else change
+        floor = NOISE_FLOOR_MB if name.endswith('_mb') else NOISE_FLOOR_MS if '_ms' in name else 0.0
+        flagged = worse > threshold and abs(after - before) >= floor
+        if flagged:
+            regressions.append(name)
+        print(f"{name:<26} {before:>10.2f} {after:>10.2f} {change * 100:>+7.1f}%{'  REGRESSION' if flagged else ''}")
+    print(f"{len(regressions)} regression(s) above {threshold * 100:.0f}%")
+    return regressions
+
+
+def load_results(path):
+    with open(path, encoding='utf-8') as f:
+        return json.load(f)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Offline end-to-end benchmark of the query pipeline with a replayed LLM.")
+    parser.add_argument('--corpus', default=CORPUS_PATH, help='One natural language question per line.')
+    parser.add_argument('--recordings', default=LLM_REPLAY_PATH, help='Recorded SQL and summaries (JSON lines).')
+    parser.add_argument('--llm_latency', type=float, default=0.2, help='Seconds the replayed LLM waits per call.')
+    parser.add_argument('--repeat', type=int, default=3, help='Passes over the corpus per measurement.')
+    parser.add_argument('--concurrency', type=int, nargs='+', default=[1, 4, 16], help='Concurrent callers to test.')
+    parser.add_argument('--output', help='Write the results to this JSON file.')
+    parser.add_argument('--baseline', help='Compare against results from an earlier run; exits 1 on regressions.')
+    parser.add_argument('--compare', nargs=2, metavar=('OLD', 'NEW'), help='Only compare two saved result files.')
+    parser.add_argument('--threshold', type=float, default=REGRESSION_THRESHOLD, help='Relative change that counts as a regression.')
+    parser.add_argument('--record', action='store_true',
+                        help='Call Groq for every question and append its answers to --recordings instead of benchmarking.')
+    args = parser.parse_args()
+    configure_logging()
+
+    if args.compare:
+        regressions = compare_results(load_results(args.compare[0]), load_results(args.compare[1]), args.threshold)
+        sys.exit(1 if regressions else 0)
+
+    queries = load_corpus(args.corpus)
+    if args.record:
+        set_backend(RecordingBackend(GroqBackend(), args.recordings))
+        for query in queries:
+            _, error = ask(query)
+            print(f"{'error' if error else 'recorded':<8} | {query}" + (f" | {error}" if error else ''))
+        return
+
+    backend = set_backend(ReplayBackend(path=args.recordings, latency=args.llm_latency))
+    # first call loads the spaCy model, the template vocabulary and the pool; keep it out of the timings
+    ask(queries[0])
+
+    stages, outcomes, errors = run_stages(queries, args.repeat)
+    throughput = [run_throughput(queries, concurrency, args.repeat) for concurrency in args.concurrency]
+    results = {
+        'build': build_info(),
+        'settings': {'corpus': len(queries), 'repeat': args.repeat, 'llm_latency': args.llm_latency,
+                     'llm_calls': backend.calls, 'unrecorded_calls': backend.misses},
+        'stages': stages,
+        'outcomes': outcomes,
+        'throughput': throughput,
+        'memory': run_memory(queries),
+        'errors': errors,
+    }
+    print_report(results)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(results, f, indent=2)
+    if args.baseline:
+        regressions = compare_results(load_results(args.baseline), results, args.threshold)
+        sys.exit(1 if regressions else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,71 @@
+import argparse
+import os
+import random
+import sqlite3
+import tempfile
+import time
+
+from tag_search import build_tag_index, rewrite_like_chains
+
+TERMS_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'utilities', 'industries_list_dedup.txt')
+KEYWORDS = ['finance', 'software', 'health', 'energy', 'marketing']
+
+
+def load_terms(path):
+    with open(path, 'r', encoding='utf-8') as f:
+        return [line.strip() for line in f if line.strip()]
+
+
+def make_db(path, rows, terms, seed=0):
+    rng = random.Random(seed)
+    conn = sqlite3.connect(path)
+    conn.execute("CREATE TABLE companies (company_name TEXT, similar_terms TEXT)")
+    batch = []
+    for i in range(rows):
+        tags = rng.sample(terms, 5)
+        batch.append((f"Company {i}", '|'.join(f"{t} ({rng.uniform(0.3, 0.7):.2f})" for t in tags)))
+    conn.executemany("INSERT INTO companies VALUES (?, ?)", batch)
+    conn.commit()
+    conn.close()
+    build_tag_index(path, tables=['companies'])
+
+
+def time_query(conn, sql, repeat):
+    best = float('inf')
+    rows = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        rows = conn.execute(sql).fetchall()
+        best = min(best, time.perf_counter() - start)
+    return best, len(rows)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare LIKE '%term%' scans on similar_terms with the FTS5 rewrite.")
+    parser.add_argument('--rows', type=int, nargs='+', default=[1000, 10000, 100000], help='Row counts to benchmark.')
+    parser.add_argument('--repeat', type=int, default=5, help='Runs per query; the best time is reported.')
+    parser.add_argument('--terms_file', type=str, default=TERMS_FILE, help='Vocabulary used to generate tags.')
+    args = parser.parse_args()
+
+    terms = load_terms(args.terms_file)
+    like_sql = "SELECT company_name FROM companies WHERE " + ' OR '.join(
+        f"LOWER(companies.similar_terms) LIKE '%{kw}%'" for kw in KEYWORDS)
+    indexed_sql = rewrite_like_chains(like_sql, {'companies'})
+
+    print(f"{'rows':>10} {'like_ms':>10} {'fts_ms':>10} {'speedup':>8} {'matches':>8}")
+    with tempfile.TemporaryDirectory() as tmp:
+        for rows in args.rows:
+            path = os.path.join(tmp, f"tags_{rows}.db")
+            make_db(path, rows, terms)
+            conn = sqlite3.connect(path)
+            like_time, like_rows = time_query(conn, like_sql, args.repeat)
+            fts_time, fts_rows = time_query(conn, indexed_sql, args.repeat)
+            conn.close()
+            if like_rows != fts_rows:
+                print(f"WARNING: result mismatch at {rows} rows ({like_rows} vs {fts_rows})")
+            print(f"{rows:>10} {like_time * 1000:>10.2f} {fts_time * 1000:>10.2f} "
+                  f"{like_time / fts_time:>7.1f}x {fts_rows:>8}")
+
+
+if __name__ == "__main__":
+    main()
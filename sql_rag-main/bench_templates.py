@@ -0,0 +1,65 @@
+import argparse
+import os
+import statistics
+import time
+from collections import Counter
+
+from database_api import query_db_bounded
+from query_templates import match_template, template_summary
+from result_shaping import ensure_limit
+
+CORPUS_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'query_corpus.txt')
+
+
+def load_corpus(path):
+    with open(path, encoding='utf-8') as f:
+        return [line.strip() for line in f if line.strip() and not line.startswith('#')]
+
+
+def percentile(values, q):
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(q * (len(ordered) - 1))))]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Coverage and latency of the template fast-path over a query corpus.")
+    parser.add_argument('--corpus', default=CORPUS_PATH, help='One natural language question per line.')
+    parser.add_argument('--verbose', action='store_true', help='Print the template, SQL and summary per question.')
+    args = parser.parse_args()
+
+    queries = load_corpus(args.corpus)
+    # first call loads the vocabulary and the spaCy model; keep it out of the timings
+    match_template(queries[0])
+
+    by_template = Counter()
+    match_ms, total_ms = [], []
+    for query in queries:
+        start = time.perf_counter()
+        match = match_template(query)
+        matched = time.perf_counter()
+        match_ms.append((matched - start) * 1000)
+        if match is None:
+            if args.verbose:
+                print(f"LLM       | {query}")
+            continue
+        result, truncated = query_db_bounded(ensure_limit(match['sql']), match['params'])
+        summary = template_summary(match, result, truncated)
+        total_ms.append((time.perf_counter() - start) * 1000)
+        by_template[match['template']] += 1
+        if args.verbose:
+            print(f"{match['template']:<9.9} | {query}\n          | {summary}")
+
+    covered = sum(by_template.values())
+    print(f"coverage: {covered}/{len(queries)} questions ({100.0 * covered / len(queries):.1f}%)")
+    for name, count in by_template.most_common():
+        print(f"  {name:<24} {count}")
+    print(f"template match   p50 {statistics.median(match_ms):.3f} ms  p95 {percentile(match_ms, 0.95):.3f} ms")
+    if total_ms:
+        print(f"answer (matched) p50 {statistics.median(total_ms):.3f} ms  p95 {percentile(total_ms, 0.95):.3f} ms"
+              "  (match + SQL + templated summary, no LLM calls)")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,199 +1,105 @@
 import sqlite3
 import pandas as pd
-import groq
 import os
-import spacy
-# If it doesn't work please run: {python -m spacy download en_core_web_sm}
-nlp = spacy.load('en_core_web_sm')
+import time
+import logging
+from db_pool import DB_PATH, get_pool
+from llm_backend import get_backend
+from index_advisor import check_query_plan
+from tag_search import rewrite_for_connection
+from rollups import available_rollups
+from response_cache import get_response_cache
+from intent_analyzer import analyze_query, find_qualifiers, find_related_noun
+from prompt_builder import build_repair_prompt, build_sql_prompt, log_prompt_usage, referenced_tables
+from sql_utils import referenced_tables as sql_tables
+from sql_validator import validate_sql
+from query_templates import TEMPLATE_SUMMARIES, match_template, template_summary
+from result_shaping import MAX_RESULT_ROWS, describe_result, ensure_limit, estimate_tokens, fetch_bounded
+from tracing import RESULT_ROWS, LLM_TOKENS, annotate, observe_llm_usage, span, trace_query
+logger = logging.getLogger(__name__)
 combined_response=""
-# Assuming you've set your Groq API key as an environment variable
-groq_api_key = os.environ.get("GROQ_API_KEY")
-client = groq.Groq(api_key=groq_api_key)
+# LLM calls go through llm_backend (Groq by default, GROQ_API_KEY read on first use);
+# LLM_BACKEND=replay answers from recorded SQL/summaries for offline runs.
 
 def connect_to_db():
-    return sqlite3.connect('events_database.db')
+    return sqlite3.connect(DB_PATH)
 
 def query_db(query, params=None):
-    conn = connect_to_db()
-    try:
+    pool = get_pool()
+    with pool.connection() as conn:
+        pool.record_statement(conn, query)
         if params:
             result = pd.read_sql_query(query, conn, params=params)
         else:
             result = pd.read_sql_query(query, conn)
         return result
-    finally:
-        conn.close()
-
-def analyze_query(query):
-    doc = nlp(query)
-    event_indicators = ['event', 'conference', 'seminar', 'workshop', 'meetup', 'exhibition', 'trade show', 'symposium']
-    company_indicators = ['company', 'business', 'corporation', 'firm', 'enterprise', 'organization', 'industry']
-    
-    event_context = False
-    company_context = False
-   
-    for token in doc:
- 
-        if token.lemma_.lower() in event_indicators:
-            modifiers = [child for child in token.children if child.pos_ in ['ADJ'] or child.dep_ in ['compound', 'amod']]
-            if modifiers:
-                event_context = True
-                print(f"Event context set to True. '{token.text}' modified by: {[m.text for m in modifiers]}")
-        
-        if token.lemma_.lower() in company_indicators:
-            modifiers = [child for child in token.children if child.pos_ in ['ADJ'] or child.dep_ in ['compound', 'amod']]
-            if modifiers:
-                company_context = True
-                print(f"Company context set to True. '{token.text}' modified by: {[m.text for m in modifiers]}")
-
-
-    
-    if not event_context or not company_context:
-        for token in doc:
-            if token.pos_ == 'VERB':
-                related_noun, relation_type = find_related_noun(token, event_indicators, company_indicators)
-                if related_noun:
-                    qualifiers = find_qualifiers(token)
-                    if qualifiers:
-                        if related_noun == 'event' and not event_context:
-                            event_context = True
-                            print(f"Event context set to True. Verb '{token.text}' qualifies events with: {', '.join(qualifiers)}")
-                        elif related_noun == 'company' and not company_context:
-                            company_context = True
-                            print(f"Company context set to True. Verb '{token.text}' qualifies companies with: {', '.join(qualifiers)}")
-
-    print(f"Final Event context: {event_context}")
-    print(f"Final Company context: {company_context}")
-    
-    if event_context and company_context:
-        return 'both'
-    elif event_context:
-        return 'event'
-    elif company_context:
-        return 'company'
-    else:
-        return 'unknown'
-
-def find_related_noun(token, event_indicators, company_indicators):
-    for ancestor in token.ancestors:
-        if any(indicator in ancestor.lemma_.lower() for indicator in event_indicators):
-            return 'event', 'descendant'
-        if any(indicator in ancestor.lemma_.lower() for indicator in company_indicators):
-            return 'company', 'descendant'
-    
-    for child in token.subtree:
-        if child.dep_ in ['nsubj', 'dobj', 'pobj']:
-            if any(indicator in child.lemma_.lower() for indicator in event_indicators):
-                return 'event', 'ancestor'
-            if any(indicator in child.lemma_.lower() for indicator in company_indicators):
-                return 'company', 'ancestor'
-    
-    return 'unknown', 'unknown'
-
-def find_qualifiers(token):
-    qualifiers = []
-    for child in token.subtree:
-        if child.dep_ in ['amod', 'pobj'] and child.pos_ in ['ADJ', 'NOUN']:
-            qualifiers.append(child.text)
-    return qualifiers
-        
+
+def query_db_bounded(query, params=None, max_rows=MAX_RESULT_ROWS):
+    # Streams rows off the cursor and stops at max_rows, so a broad join never
+    # materializes more than that; returns (DataFrame, truncated).
+    pool = get_pool()
+    with span('execute'), pool.connection() as conn:
+        pool.record_statement(conn, query)
+        result, truncated = fetch_bounded(conn, query, params, max_rows)
+    RESULT_ROWS.observe(len(result))
+    return result, truncated
+
+def rewrite_tag_search(query):
+    with span('tag_rewrite'), get_pool().connection() as conn:
+        return rewrite_for_connection(conn, query)
+
+def explain_db(query, params=None):
+    with span('explain'), get_pool().connection() as conn:
+        plan, suggestions = check_query_plan(conn, query, params)
+    annotate(sql=query, plan=plan)
+    return plan, suggestions
+
+def rollups_db():
+    with get_pool().connection() as conn:
+        return available_rollups(conn)
+
+def validate_db(query):
+    with span('validate'), get_pool().connection() as conn:
+        return validate_sql(conn, query)
+
 def generate_sql_query(natural_language_query):
-    context = analyze_query(natural_language_query)
-    
-    prompt = f"""
-You are given an SQL database with the following schema:
-event_info contains following columns: event_logo_url,event_name,event_start_date,event_end_date,event_venue,event_country,event_description,event_url,similar_terms
-
-companies contains following columns: company_logo_url,company_logo_text,company_name,relation_to_event,event_url,company_revenue,employee_range_lower,employee_range_upper,company_phone,company_founding_year,company_address,company_overview,homepage_url,linkedin_company_url,homepage_base_url,company_logo_url_on_event_page,company_logo_match_flag,similar_terms,revenue_millions
-
-people contains following columns: first_name,middle_name,last_name,job_title,person_city,person_state,person_country,email,homepage_base_url,duration_in_current_job,duration_in_current_company
-
-Given the following natural language query, generate ONLY an appropriate SQLite-compatible SQL query without any additional explanation. Do not print anything other than the query itself.
-
-Events and company data can be merged using 'event_url' column.
-Company and people data can be merged using 'homepage_base_url' column.
-Each event_url corresponds to a unique event, and each homepage_base_url can be interpreted as a unique company.
-Event Details:
-1.event_name: Official name of the event
-2.event_start_date: Date when the event begins
-3.event_end_date: Date when the event concludes
-4.event_venue:Specific location where the event is held
-5.event_country: Country where the event takes place
-6.event_description: A detailed summary of the event's purpose and content
-7.event_url: The official website link for the event
-8.event_logo_url: A URL to the event's logo image
-9.similar_terms: Keywords or phrases related to event for search purposes
-People Details:
-1.first_name: The person's given name
-2.middle_name: The person's middle name (if applicable)
-3.last_name: The person's family name or surname
-4.duration_in_current_job: How long they've been in their current role
-5.duration_in_current_company: How long they've been with their current employer
-6.person_city: The city where the person is located
-7.person_state: The state or region where the person resides
-8.person_country: The country where the person is based
-9.email: The person's email address
-Online Presence:
-homepage_base_url: The root domain of the person's personal or professional website
-IMPORTANT CHANGES:
-1. When searching for companies based on employee count, use these new columns. For example:
-   - To find companies with more than 1000 employees, use: WHERE employee_range_upper > 1000
-   - To find companies with 50-200 employees, use: WHERE employee_range_lower >= 50 AND employee_range_upper <= 200
-2. The 'company_revenue' column is now standardized in millions and stored in the 'revenue_millions' column.
-3. When searching for companies based on revenue, use the 'revenue_millions' column.
-
-IMPORTANT: When searching for relevant information, prioritize using the 'similar_terms' column in the event_info and companies tables. Use the following guidelines:
-1. Ignore any delimiters in the 'similar_terms' column. Treat the entire column as a single text field.
-2. Use case-insensitive partial matching for each relevant keyword from the query.
-3. Search for keywords anywhere within the 'similar_terms' column, not just at the beginning or end of terms.
-4. Include variations and related terms of the keywords in your search.
-5. Use the LIKE operator with wildcards for flexible matching. For example:
-   WHERE LOWER(companies.similar_terms) LIKE '%keyword1%'
-     OR LOWER(companies.similar_terms) LIKE '%keyword2%'
-     OR LOWER(companies.similar_terms) LIKE '%related_term%'
-6. Only use direct column comparisons if there's no relevant match in the 'similar_terms' column.
-7.Wherever any people details are mentioned, search for them in the 'people' table.
-8. Verbs like most,participating and other action verbs are not right for searching in similar_terms, comprehend statement in such case. DO NOT do this in case other than verb. Search all nouns in similar_terms only. If noun is mentioned with explicit terms like name or description still search in similar_terms as long as it is a noun.
-9. Each table only has the columns described in the corresponding description. Company does not have access to event's columns without performing a join and vice-versa.
-10. When generating SQL query for different tables with same column names always specify the table name before referring to the column.
-11.Do not use INTERSECT when Joining different tables
-CONTEXT INSTRUCTIONS:
-The context of the query has been analyzed and determined to be: {context}
-- If the context is 'company', search only in the similar_terms column of the companies table.
-- If the context is 'event', search only in the similar_terms column of the event_info table.
-- If the context is 'both', search in both tables and use INTERSECT to find common results in the similar_terms columns.
-- If the context is 'unknown', search in both tables and use UNION to combine results from the similar_terms columns.
-- If any context (event or company) is false, DO NOT SEARCH its corresponding similar_terms column.
-Natural language query: {natural_language_query}
-
-    SQL query:
-    """  
-    response = client.chat.completions.create(
-        messages=[
-            {
-                "role": "system",
-                "content": "You are an AI assistant that generates SQL queries based on natural language inputs. Strictly follow the context instructions to determine which tables and columns to search."
-            },
-            {
-                "role": "user",
-                "content": prompt
-            }
-        ],
-        model="llama-3.1-70b-versatile",
-        temperature=0.1,
-        max_tokens=300,
-    )
-    # print(f"Full prompt:\n{prompt}")
-    # print(f"Raw API response:\n{response}")
+    with span('intent'):
+        context = analyze_query(natural_language_query)
+    # Only the schema sections and rules relevant to the detected context/tables are sent;
+    # see prompt_builder for the section order that keeps the prefix cacheable.
+    build = build_sql_prompt(natural_language_query, context, rollups_db())
+    with span('llm_sql'):
+        response = get_backend().complete(
+            'sql', natural_language_query, build['messages'],
+            model="llama-3.1-70b-versatile",
+            temperature=0.1,
+            max_tokens=300,
+        )
+    log_prompt_usage(build, response)
+    observe_llm_usage('sql', response)
+    return response.choices[0].message.content.strip()
+
+def repair_sql_query(natural_language_query, sql_query, error):
+    # Only reached when the local repairs in sql_validator could not make the query compile.
+    tables = set(sql_tables(sql_query)) | set(referenced_tables(natural_language_query, analyze_query(natural_language_query)))
+    with span('llm_repair'):
+        response = get_backend().complete(
+            'repair', natural_language_query, build_repair_prompt(natural_language_query, sql_query, error, tables),
+            model="llama-3.1-70b-versatile",
+            temperature=0.1,
+            max_tokens=300,
+        )
+    observe_llm_usage('repair', response)
     return response.choices[0].message.content.strip()
-def summarize_query_result(sql_query, query_result):
+
+def summary_messages(sql_query, query_result, truncated=False):
     prompt = f"""
     Summarize the following SQL query result for an end user. Provide a clear, concise explanation of the data without technical jargon. Focus on the key insights and important information revealed by the query.
 
     SQL Query: {sql_query}
 
-    Query Result:
-    {query_result.to_string()}
+    Query Result (column statistics over all returned rows, followed by sample rows):
+    {describe_result(query_result, truncated)}
 
     Your summary should:
     1. Highlight the main findings.
@@ -202,46 +108,158 @@ def summarize_query_result(sql_query, query_result):
 
     Summary:
     """
-    
-    response = client.chat.completions.create(
-        messages=[
-            {
-                "role": "system",
-                "content": "You are an AI assistant that summarizes SQL query results in a clear, non-technical manner for end users."
-            },
-            {
-                "role": "user",
-                "content": prompt
-            }
-        ],
+    return [
+        {
+            "role": "system",
+            "content": "You are an AI assistant that summarizes SQL query results in a clear, non-technical manner for end users."
+        },
+        {
+            "role": "user",
+            "content": prompt
+        }
+    ]
+
+def summarize_query_result(sql_query, query_result, truncated=False):
+    with span('summarize'):
+        response = get_backend().complete(
+            'summary', sql_query, summary_messages(sql_query, query_result, truncated),
+            model="llama-3.1-70b-versatile",
+            temperature=0.3,
+            max_tokens=300,
+        )
+    observe_llm_usage('summary', response)
+    return response.choices[0].message.content.strip()
+
+def stream_query_summary(sql_query, query_result, truncated=False):
+    return get_backend().stream(
+        'summary', sql_query, summary_messages(sql_query, query_result, truncated),
         model="llama-3.1-70b-versatile",
         temperature=0.3,
         max_tokens=300,
     )
-    
-    return response.choices[0].message.content.strip()
 
+def prepare_sql(user_input):
+    sql_query = generate_sql_query(user_input)
+    # Compile against the live schema before running anything; cheap local repairs first,
+    # one targeted LLM retry only if those are not enough.
+    sql_query, error, _ = validate_db(sql_query)
+    if error:
+        sql_query, error, _ = validate_db(repair_sql_query(user_input, sql_query, error))
+        if error:
+            raise ValueError(f"Generated SQL is invalid: {error}")
+    sql_query = rewrite_tag_search(sql_query)
+    logger.debug("Generated SQL query: %s", sql_query)
+    sql_query = ensure_limit(sql_query)
+    explain_db(sql_query)
+    return sql_query
+
+def plan_query(user_input):
+    # Common question shapes are answered from parameterized templates without an LLM
+    # call; returns (sql, params, template match or None).
+    with span('template'):
+        match = match_template(user_input)
+    if match is None:
+        return prepare_sql(user_input), None, None
+    annotate(outcome='template')
+    sql_query = ensure_limit(match['sql'])
+    logger.debug("Template SQL query (%s): %s %s", match['template'], sql_query, match['params'])
+    explain_db(sql_query, match['params'])
+    return sql_query, match['params'], match
+
+
+def run_query(user_query):
+    # Full pipeline; returns the summary together with the bounded result rows so the API
+    # can page them to the client separately from the (digest-based) summary.
+    with trace_query(user_query):
+        cache = get_response_cache()
+        with span('cache'):
+            cached = cache.get(user_query)
+        if cached is not None:
+            annotate(outcome='cache')
+            return cached
+
+        start = time.perf_counter()
+        sql_query, params, template = plan_query(user_query)
+
+        result, truncated = query_db_bounded(sql_query, params)
+        logger.debug("Query result: %d rows (truncated=%s)", len(result), truncated)
+        if template is not None and TEMPLATE_SUMMARIES:
+            summarize = template_summary(template, result, truncated)
+        else:
+            summarize=summarize_query_result(user_query,result,truncated)
+        logger.debug("Summary: %s", summarize)
+
+        answer = {'summary': summarize, 'sql': sql_query, 'rows': result, 'truncated': truncated}
+        cache.put(user_query, answer, time.perf_counter() - start)
+        return answer
 
 def process(user_query):
     user_input = user_query
         
     if user_input.lower() == 'quit':
         return ""
-        
+
     try:
-        sql_query = generate_sql_query(user_input)
-        print(f"Generated SQL query: {sql_query}")
-            
-        result = query_db(sql_query)
-        print("\nQuery result:")
-        print(result)
-        summarize=summarize_query_result(user_input,result)
-        clean_text(summarize)
-        print({summarize})
-
-        return summarize
-    except Exception as e:
-            print(f"An error occurred: {str(e)}")
+        return run_query(user_input)['summary']
+    except Exception:
+        logger.exception("Query failed: %s", user_input)
+
+def process_stream(user_query):
+    # Same pipeline as process(), yielding progress events as each stage finishes and
+    # the summary token by token, so the client can render before the LLM is done.
+    user_input = user_query
+    if user_input.lower() == 'quit':
+        yield {'event': 'done', 'data': {'summary': ''}, 'answer': None}
+        return
+
+    with trace_query(user_input):
+        cache = get_response_cache()
+        with span('cache'):
+            cached = cache.get(user_input)
+        if cached is not None:
+            annotate(outcome='cache')
+            yield {'event': 'token', 'data': cached['summary']}
+            yield {'event': 'done', 'data': {'summary': cached['summary'], 'cached': True}, 'answer': cached}
+            return
+
+        try:
+            start = time.perf_counter()
+            sql_query, params, template = plan_query(user_input)
+            yield {'event': 'sql', 'data': sql_query}
+
+            result, truncated = query_db_bounded(sql_query, params)
+            yield {'event': 'rows', 'data': {'count': len(result), 'truncated': truncated,
+                                             'columns': list(result.columns)}}
+
+            if template is not None and TEMPLATE_SUMMARIES:
+                summary_stream = [template_summary(template, result, truncated)]
+            else:
+                summary_stream = stream_query_summary(user_input, result, truncated)
+            tokens = []
+            # includes the time the client takes to read the tokens
+            with span('summarize'):
+                try:
+                    for token in summary_stream:
+                        tokens.append(token)
+                        yield {'event': 'token', 'data': token}
+                finally:
+                    # a client disconnect closes this generator mid-summary; close the LLM
+                    # stream too instead of leaving the provider generating for nobody
+                    close = getattr(summary_stream, 'close', None)
+                    if close is not None:
+                        close()
+            summarize = ''.join(tokens).strip()
+            if template is None or not TEMPLATE_SUMMARIES:
+                # streamed responses carry no usage block
+                LLM_TOKENS.observe(estimate_tokens(summarize), call='summary', direction='completion')
+
+            answer = {'summary': summarize, 'sql': sql_query, 'rows': result, 'truncated': truncated}
+            cache.put(user_input, answer, time.perf_counter() - start)
+            yield {'event': 'done', 'data': {'summary': summarize, 'cached': False}, 'answer': answer}
+        except Exception as e:
+            annotate(outcome='error', error=str(e))
+            logger.exception("Streaming query failed: %s", user_input)
+            yield {'event': 'error', 'data': str(e)}
 
 # if __name__ == "__main__":
-#     main()
+#     main()
\ No newline at end of file
@@ -0,0 +1,262 @@
+import logging
+import os
+import queue
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+
+logger = logging.getLogger(__name__)
+
+DB_PATH = os.environ.get("EVENTS_DB_PATH", "events_database.db")
+
+
+class PoolTimeoutError(Exception):
+    pass
+
+
+class QueryTimeoutError(Exception):
+    pass
+
+
+def enable_wal(db_path=DB_PATH):
+    # journal_mode is persistent, so one writable connection is enough; readers then
+    # never block on a writer rebuilding tags/indexes.
+    try:
+        conn = sqlite3.connect(db_path)
+        try:
+            return conn.execute("PRAGMA journal_mode=WAL").fetchone()[0]
+        finally:
+            conn.close()
+    except sqlite3.Error:
+        return None
+
+
+class ConnectionPool:
+    def __init__(self, db_path=DB_PATH, size=4, acquire_timeout=10.0, query_timeout_ms=15000,
+                 cache_size_kb=16384, mmap_size=268435456, statement_cache_size=128,
+                 progress_interval=10000, wal=True):
+        self.db_path = db_path
+        self.size = size
+        self.acquire_timeout = acquire_timeout
+        self.query_timeout_ms = query_timeout_ms
+        self.cache_size_kb = cache_size_kb
+        self.mmap_size = mmap_size
+        self.statement_cache_size = statement_cache_size
+        self.progress_interval = progress_interval
+
+        self._idle = queue.LifoQueue(maxsize=size)
+        self._lock = threading.Lock()
+        self._created = 0
+        self._active = 0
+        self._closed = False
+        # sqlite3 does not report hits of its per-connection prepared-statement cache
+        # (cached_statements), so record_statement keeps a shadow LRU of the same size.
+        # The statement_repeat_* metrics are that estimate, not counters read from sqlite.
+        self._statements = {}
+        # load_database.py swaps a rebuilt file in with os.replace; connections opened
+        # before that keep reading the old, unlinked file. Each connection remembers the
+        # generation it was opened in and is retired once the file (or reset()) moves on.
+        self._file = self._file_id()
+        self._generation = 0
+        self._generations = {}
+
+        self._acquisitions = 0
+        self._wait_total = 0.0
+        self._wait_max = 0.0
+        self._statement_repeats = 0
+        self._statement_first_runs = 0
+        self._timeouts = 0
+        self._reopens = 0
+
+        if wal:
+            enable_wal(db_path)
+
+    def _connect(self):
+        uri = f"file:{os.path.abspath(self.db_path)}?mode=ro"
+        conn = sqlite3.connect(uri, uri=True, check_same_thread=False,
+                               cached_statements=self.statement_cache_size)
+        conn.execute(f"PRAGMA cache_size = -{int(self.cache_size_kb)}")
+        conn.execute(f"PRAGMA mmap_size = {int(self.mmap_size)}")
+        conn.execute("PRAGMA temp_store = MEMORY")
+        conn.execute("PRAGMA query_only = 1")
+        return conn
+
+    def _file_id(self):
+        try:
+            stat = os.stat(self.db_path)
+            return stat.st_dev, stat.st_ino
+        except OSError:
+            return None
+
+    def reset(self):
+        # Retires every open connection: idle ones on their next checkout, busy ones when
+        # they are released. New connections open the database file as it is now.
+        with self._lock:
+            self._generation += 1
+            self._reopens += 1
+
+    def _check_file(self):
+        current = self._file_id()
+        if current == self._file:
+            return
+        with self._lock:
+            if current == self._file:
+                return
+            self._file = current
+        logger.info("Database file %s was replaced; reopening pooled connections", self.db_path)
+        self.reset()
+
+    def _stale(self, conn):
+        with self._lock:
+            return self._generations.get(id(conn)) != self._generation
+
+    def _discard(self, conn):
+        conn.close()
+        with self._lock:
+            self._created -= 1
+            self._statements.pop(id(conn), None)
+            self._generations.pop(id(conn), None)
+
+    def _acquire(self):
+        start = time.perf_counter()
+        deadline = start + self.acquire_timeout
+        self._check_file()
+        conn = None
+        while conn is None:
+            try:
+                conn = self._idle.get_nowait()
+            except queue.Empty:
+                with self._lock:
+                    if self._created < self.size:
+                        self._created += 1
+                        create = True
+                    else:
+                        create = False
+                if create:
+                    try:
+                        conn = self._connect()
+                    except Exception:
+                        with self._lock:
+                            self._created -= 1
+                        raise
+                    with self._lock:
+                        self._statements[id(conn)] = OrderedDict()
+                        self._generations[id(conn)] = self._generation
+                else:
+                    try:
+                        conn = self._idle.get(timeout=max(0.0, deadline - time.perf_counter()))
+                    except queue.Empty:
+                        raise PoolTimeoutError(
+                            f"No database connection available after {self.acquire_timeout}s")
+            if self._stale(conn):
+                self._discard(conn)
+                conn = None
+
+        waited = time.perf_counter() - start
+        with self._lock:
+            self._active += 1
+            self._acquisitions += 1
+            self._wait_total += waited
+            self._wait_max = max(self._wait_max, waited)
+        return conn
+
+    def _release(self, conn):
+        with self._lock:
+            self._active -= 1
+            closed = self._closed
+        if closed:
+            conn.close()
+        elif self._stale(conn):
+            self._discard(conn)
+        else:
+            self._idle.put(conn)
+
+    @contextmanager
+    def connection(self, timeout_ms=None):
+        conn = self._acquire()
+        timeout_ms = self.query_timeout_ms if timeout_ms is None else timeout_ms
+        state = {"timed_out": False}
+        if timeout_ms:
+            deadline = time.monotonic() + timeout_ms / 1000.0
+
+            def check_deadline():
+                if time.monotonic() > deadline:
+                    state["timed_out"] = True
+                    return 1
+                return 0
+
+            conn.set_progress_handler(check_deadline, self.progress_interval)
+        try:
+            yield conn
+        except Exception as e:
+            # pandas wraps the sqlite "interrupted" error in its own DatabaseError, so
+            # rely on the handler's flag rather than the exception type.
+            if state["timed_out"]:
+                with self._lock:
+                    self._timeouts += 1
+                raise QueryTimeoutError(f"Query exceeded {timeout_ms} ms and was aborted") from e
+            raise
+        finally:
+            conn.set_progress_handler(None, 0)
+            self._release(conn)
+
+    def record_statement(self, conn, sql):
+        # A repeat is a query text already among the last statement_cache_size run on this
+        # connection, i.e. one sqlite3 would most likely find prepared in its cache.
+        with self._lock:
+            cache = self._statements.setdefault(id(conn), OrderedDict())
+            if sql in cache:
+                cache.move_to_end(sql)
+                self._statement_repeats += 1
+            else:
+                cache[sql] = True
+                self._statement_first_runs += 1
+                if len(cache) > self.statement_cache_size:
+                    cache.popitem(last=False)
+
+    def metrics(self):
+        with self._lock:
+            lookups = self._statement_repeats + self._statement_first_runs
+            return {
+                "size": self.size,
+                "connections_created": self._created,
+                "active_connections": self._active,
+                "idle_connections": self._idle.qsize(),
+                "acquisitions": self._acquisitions,
+                "wait_time_total_ms": round(self._wait_total * 1000, 3),
+                "wait_time_avg_ms": round(self._wait_total * 1000 / self._acquisitions, 3) if self._acquisitions else 0.0,
+                "wait_time_max_ms": round(self._wait_max * 1000, 3),
+                "statement_repeats": self._statement_repeats,
+                "statement_first_runs": self._statement_first_runs,
+                "statement_repeat_rate": round(self._statement_repeats / lookups, 4) if lookups else 0.0,
+                "query_timeouts": self._timeouts,
+                "reopens": self._reopens,
+            }
+
+    def close(self):
+        with self._lock:
+            self._closed = True
+        while True:
+            try:
+                self._idle.get_nowait().close()
+            except queue.Empty:
+                break
+
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def get_pool():
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                _pool = ConnectionPool(
+                    size=int(os.environ.get("DB_POOL_SIZE", 4)),
+                    acquire_timeout=float(os.environ.get("DB_POOL_ACQUIRE_TIMEOUT", 10)),
+                    query_timeout_ms=int(os.environ.get("DB_QUERY_TIMEOUT_MS", 15000)),
+                )
+    return _pool
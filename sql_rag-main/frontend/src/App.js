@@ -67,29 +67,42 @@ function App() {
   const [loading, setLoading] = useState(false);
   const [error, setError] = useState('');
   const [currentQuery, setCurrentQuery] = useState('');
-  const delay = (ms) => new Promise(resolve => setTimeout(resolve, ms));
-  const [currentAns,setCurrentAns]=useState('');
-  const sendQueryToBackend = async (query) => {
-    try {
-      const response = await fetch('http://127.0.0.1:5000/api/query', {
-        method: 'POST',
-        headers: {
-          'Content-Type': 'application/json',
-        },
-        body: JSON.stringify({ query: query }),
-      });
+  const updateReply = (reply) => {
+    setHistory(prevHistory => {
+      const newHistory = [...prevHistory];
+      newHistory[newHistory.length - 1] = { ...newHistory[newHistory.length - 1], botReply: reply };
+      return newHistory;
+    });
+  };
 
-      if (!response.ok) {
-        throw new Error('Network response was not ok');
-      }
+  // Streams progress ('sql', 'rows') and summary tokens over Server-Sent Events so the
+  // answer starts rendering as soon as the first token arrives.
+  const streamQueryFromBackend = (query) => new Promise((resolve, reject) => {
+    const source = new EventSource(
+      `http://127.0.0.1:5000/api/stream?query=${encodeURIComponent(query)}`
+    );
+    let answer = '';
 
-      const data = await response.json();
-      console.log('Response from backend:', data);
-    } catch (error) {
-      console.error('Error sending query to backend:', error);
-      setError('An error occurred while sending the query to the backend.');
-    }
-  };
+    source.addEventListener('sql', () => {
+      updateReply('Generating (SQL ready, running query)');
+    });
+    source.addEventListener('rows', (e) => {
+      const data = JSON.parse(e.data);
+      updateReply(`Generating (${data.count} rows found, summarizing)`);
+    });
+    source.addEventListener('token', (e) => {
+      answer += JSON.parse(e.data);
+      updateReply(answer);
+    });
+    source.addEventListener('done', (e) => {
+      source.close();
+      resolve(JSON.parse(e.data).summary);
+    });
+    source.addEventListener('error', (e) => {
+      source.close();
+      reject(new Error(e.data ? JSON.parse(e.data) : 'Lost connection to the backend'));
+    });
+  });
 
   const handleSubmit = async (event) => {
     event.preventDefault();
@@ -105,45 +118,8 @@ function App() {
         { userQuery: query, botReply: 'Generating' }
       ]);
     
-      await sendQueryToBackend(query);
-    
-      let newAnswer = null;
-      let attempts = 0;
-      const maxAttempts = 5;
-      const delayBetweenAttempts = 4000; 
-    
-      while (attempts < maxAttempts) {
-        const response = await fetch('http://127.0.0.1:5000/api/result', {
-          method: 'GET',
-        });
-    
-        if (!response.ok) {
-          throw new Error('Failed to fetch SQL query');
-        }
-    
-        const data = await response.json();
-        console.log("data", data);
-    
-        if (data.response !== currentAns) {
-          newAnswer = data.response.replace(/\\n/g, '\n');
-          break;
-        }
-    
-        await new Promise(resolve => setTimeout(resolve, delayBetweenAttempts));
-        attempts++;
-      }
-    
-      if (newAnswer) {
-        setHistory(prevHistory => {
-          const newHistory = [...prevHistory];
-          newHistory[newHistory.length - 1].botReply = newAnswer;
-          return newHistory;
-        });
-    
-        setCurrentAns(newAnswer);
-      } else {
-        throw new Error('No new answer received after multiple attempts');
-      }
+      const newAnswer = await streamQueryFromBackend(query);
+      updateReply(newAnswer.replace(/\\n/g, '\n'));
     } catch (err) {
       setError('An error occurred while processing your query: ' + err.message);
     } finally {
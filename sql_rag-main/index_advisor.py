@@ -0,0 +1,151 @@
+import argparse
+import logging
+import re
+import sqlite3
+
+from db_pool import DB_PATH, enable_wal
+from sql_utils import table_aliases
+
+logger = logging.getLogger(__name__)
+
+# Join keys the SQL prompt mandates (event_info/companies on event_url, companies/people on
+# homepage_base_url) plus the range columns it tells the model to filter on. The composite
+# companies indexes cover both directions of the event -> company -> people join.
+INDEXES = {
+    'idx_event_info_event_url': ('event_info', ['event_url']),
+    'idx_event_info_start_date': ('event_info', ['event_start_date']),
+    'idx_companies_event_url': ('companies', ['event_url', 'homepage_base_url']),
+    'idx_companies_homepage_base_url': ('companies', ['homepage_base_url', 'event_url']),
+    'idx_companies_employee_upper': ('companies', ['employee_range_upper', 'employee_range_lower']),
+    'idx_companies_revenue': ('companies', ['revenue_millions']),
+    'idx_people_homepage_base_url': ('people', ['homepage_base_url']),
+}
+
+_COMPARISON = r'\s*(?:=|<|>|<=|>=|!=|<>|\bbetween\b|\bin\b)'
+
+
+def build_indexes(db_path=DB_PATH, analyze=True):
+    conn = sqlite3.connect(db_path)
+    try:
+        existing = {row[0] for row in conn.execute("SELECT name FROM sqlite_master WHERE type = 'table'")}
+        created = []
+        for name, (table, columns) in INDEXES.items():
+            if table not in existing:
+                continue
+            conn.execute(f"CREATE INDEX IF NOT EXISTS {name} ON {table} ({', '.join(columns)})")
+            created.append(name)
+        if analyze:
+            conn.execute("ANALYZE")
+        conn.commit()
+    finally:
+        conn.close()
+    enable_wal(db_path)
+    return created
+
+
+def explain_query_plan(conn, sql, params=None):
+    rows = conn.execute(f"EXPLAIN QUERY PLAN {sql}", params or ()).fetchall()
+    return [row[3] for row in rows]
+
+
+def indexed_columns(conn, table):
+    # Only the leading column of an index helps an equality/range lookup.
+    leading = set()
+    for index in conn.execute(f"PRAGMA index_list({table})").fetchall():
+        info = conn.execute(f"PRAGMA index_info({index[1]})").fetchall()
+        if info:
+            leading.add(info[0][2].lower())
+    return leading
+
+
+def table_columns(conn, table):
+    return [row[1] for row in conn.execute(f"PRAGMA table_info({table})").fetchall()]
+
+
+def filtered_columns(sql, table, aliases, columns):
+    names = [name for name, target in aliases.items() if target.lower() == table.lower()]
+    single_table = len(set(aliases.values())) == 1
+    found = []
+    for column in columns:
+        col = re.escape(column)
+        qualified = '|'.join(re.escape(name) for name in names)
+        patterns = [rf'\b(?:{qualified})\.{col}\b{_COMPARISON}',
+                    rf'(?:=|<|>)\s*(?:{qualified})\.{col}\b']
+        if single_table:
+            patterns.append(rf'(?<![\w.]){col}\b{_COMPARISON}')
+        if any(re.search(p, sql, re.IGNORECASE) for p in patterns):
+            found.append(column)
+    return found
+
+
+def full_scans(plan, aliases):
+    scans = []
+    for detail in plan:
+        automatic = 'AUTOMATIC' in detail
+        match = re.match(r'(?:SCAN|SEARCH)\s+(?:TABLE\s+)?(\w+)', detail)
+        if not match:
+            continue
+        # FTS5 tables (tag_search) report their index lookups as a VIRTUAL TABLE scan
+        is_scan = detail.startswith('SCAN') and 'USING' not in detail and 'VIRTUAL TABLE' not in detail
+        if not (is_scan or automatic):
+            continue
+        table = aliases.get(match.group(1).lower())
+        if table:
+            scans.append((table, detail))
+    return scans
+
+
+def suggest_indexes(conn, sql, plan=None):
+    aliases = table_aliases(sql)
+    plan = plan if plan is not None else explain_query_plan(conn, sql)
+    suggestions = []
+    for table, detail in full_scans(plan, aliases):
+        have = indexed_columns(conn, table)
+        for column in filtered_columns(sql, table, aliases, table_columns(conn, table)):
+            if column.lower() in have:
+                continue
+            statement = f"CREATE INDEX idx_{table}_{column} ON {table} ({column})"
+            if statement not in suggestions:
+                suggestions.append(statement)
+    return suggestions
+
+
+def check_query_plan(conn, sql, params=None):
+    try:
+        plan = explain_query_plan(conn, sql, params)
+    except sqlite3.Error as e:
+        logger.debug("Could not explain query: %s", e)
+        return [], []
+    scans = full_scans(plan, table_aliases(sql))
+    suggestions = []
+    if scans:
+        suggestions = suggest_indexes(conn, sql, plan)
+        logger.warning("Full scan in query plan: %s | plan=%s | suggested=%s",
+                       ', '.join(detail for _, detail in scans), plan, suggestions or 'none')
+    return plan, suggestions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Build secondary indexes for the join and range columns used by generated SQL.")
+    parser.add_argument('--db', type=str, default=DB_PATH, help='Path to the SQLite database.')
+    parser.add_argument('--explain', type=str, help='Explain a SQL query and suggest missing indexes instead of building.')
+    args = parser.parse_args()
+
+    if args.explain:
+        conn = sqlite3.connect(args.db)
+        try:
+            plan, suggestions = check_query_plan(conn, args.explain)
+        finally:
+            conn.close()
+        for detail in plan:
+            print(detail)
+        for statement in suggestions:
+            print(f"Suggested: {statement}")
+        return
+
+    created = build_indexes(args.db)
+    print(f"Ensured {len(created)} indexes on {args.db}: {', '.join(created)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,196 @@
+import logging
+import os
+import re
+import threading
+from collections import OrderedDict
+from functools import lru_cache
+
+import spacy
+
+logger = logging.getLogger(__name__)
+
+SPACY_MODEL = 'en_core_web_sm'
+# analyze_query only reads lemmas, POS tags and the dependency parse; NER is never used.
+EXCLUDED_COMPONENTS = ['ner']
+
+EVENT_INDICATORS = frozenset(['event', 'conference', 'seminar', 'workshop', 'meetup', 'exhibition', 'trade show', 'symposium'])
+COMPANY_INDICATORS = frozenset(['company', 'business', 'corporation', 'firm', 'enterprise', 'organization', 'industry'])
+
+# find_related_noun matches indicators anywhere inside a lemma ('conferences', 'eventbrite');
+# one alternation per category replaces the per-indicator substring loop.
+_EVENT_SUBSTRING = re.compile('|'.join(re.escape(i) for i in sorted(EVENT_INDICATORS)))
+_COMPANY_SUBSTRING = re.compile('|'.join(re.escape(i) for i in sorted(COMPANY_INDICATORS)))
+
+MODIFIER_DEPS = frozenset(['compound', 'amod'])
+ARGUMENT_DEPS = frozenset(['nsubj', 'dobj', 'pobj'])
+QUALIFIER_DEPS = frozenset(['amod', 'pobj'])
+QUALIFIER_POS = frozenset(['ADJ', 'NOUN'])
+
+_nlp = None
+_nlp_lock = threading.Lock()
+
+
+def get_nlp():
+    # Loaded on first use rather than at import, so workers that never analyze a query
+    # (or start before one arrives) don't pay for the model.
+    global _nlp
+    if _nlp is None:
+        with _nlp_lock:
+            if _nlp is None:
+                # If it doesn't work please run: {python -m spacy download en_core_web_sm}
+                _nlp = spacy.load(SPACY_MODEL, exclude=EXCLUDED_COMPONENTS)
+    return _nlp
+
+
+@lru_cache(maxsize=4096)
+def lemma_category(lemma):
+    if _EVENT_SUBSTRING.search(lemma):
+        return 'event'
+    if _COMPANY_SUBSTRING.search(lemma):
+        return 'company'
+    return None
+
+
+def indicator_category(token):
+    # Whole-lemma match, as the original per-token check. 'trade show' is never a single
+    # lemma and so never matches; it stays in the list to keep the contexts unchanged.
+    lemma = token.lemma_.lower()
+    if lemma in EVENT_INDICATORS:
+        return 'event'
+    if lemma in COMPANY_INDICATORS:
+        return 'company'
+    return None
+
+
+def find_related_noun(token, event_indicators=None, company_indicators=None):
+    for ancestor in token.ancestors:
+        category = lemma_category(ancestor.lemma_.lower())
+        if category:
+            return category, 'descendant'
+
+    for child in token.subtree:
+        if child.dep_ in ARGUMENT_DEPS:
+            category = lemma_category(child.lemma_.lower())
+            if category:
+                return category, 'ancestor'
+
+    return 'unknown', 'unknown'
+
+
+def find_qualifiers(token):
+    return [child.text for child in token.subtree if child.dep_ in QUALIFIER_DEPS and child.pos_ in QUALIFIER_POS]
+
+
+def context_from_doc(doc):
+    event_context = False
+    company_context = False
+    verbs = []
+
+    # Single pass: indicator nouns with adjectival/compound modifiers, collecting verbs
+    # for the fallback below.
+    for token in doc:
+        if token.pos_ == 'VERB':
+            verbs.append(token)
+        category = indicator_category(token)
+        if category is None:
+            continue
+        modifiers = [child for child in token.children if child.pos_ == 'ADJ' or child.dep_ in MODIFIER_DEPS]
+        if not modifiers:
+            continue
+        if category == 'event':
+            event_context = True
+        else:
+            company_context = True
+        logger.debug("%s context set to True. '%s' modified by: %s",
+                     category.capitalize(), token.text, [m.text for m in modifiers])
+
+    if not event_context or not company_context:
+        for token in verbs:
+            related_noun, _ = find_related_noun(token)
+            if related_noun == 'event' and not event_context:
+                qualifiers = find_qualifiers(token)
+                if qualifiers:
+                    event_context = True
+                    logger.debug("Event context set to True. Verb '%s' qualifies events with: %s", token.text, ', '.join(qualifiers))
+            elif related_noun == 'company' and not company_context:
+                qualifiers = find_qualifiers(token)
+                if qualifiers:
+                    company_context = True
+                    logger.debug("Company context set to True. Verb '%s' qualifies companies with: %s", token.text, ', '.join(qualifiers))
+
+    logger.debug("Final Event context: %s, Final Company context: %s", event_context, company_context)
+
+    if event_context and company_context:
+        return 'both'
+    elif event_context:
+        return 'event'
+    elif company_context:
+        return 'company'
+    else:
+        return 'unknown'
+
+
+class _QueryMemo:
+    # Bounded LRU of query text -> context. Repeated questions (retries, the same
+    # question from several users) skip parsing entirely.
+    def __init__(self, max_entries):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, query):
+        with self._lock:
+            context = self._entries.get(query)
+            if context is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(query)
+            self.hits += 1
+            return context
+
+    def put(self, query, context):
+        with self._lock:
+            self._entries[query] = context
+            self._entries.move_to_end(query)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+_memo = _QueryMemo(int(os.environ.get("INTENT_CACHE_SIZE", 1024)))
+
+
+def analyze_query(query):
+    query = query.strip()
+    context = _memo.get(query)
+    if context is None:
+        context = context_from_doc(get_nlp()(query))
+        _memo.put(query, context)
+    return context
+
+
+def analyze_queries(queries, batch_size=64, n_process=1):
+    # Batch API for multi-query workloads: one nlp.pipe pass over the uncached queries.
+    queries = [q.strip() for q in queries]
+    results = {}
+    pending = []
+    for query in dict.fromkeys(queries):
+        context = _memo.get(query)
+        if context is None:
+            pending.append(query)
+        else:
+            results[query] = context
+    if pending:
+        for query, doc in zip(pending, get_nlp().pipe(pending, batch_size=batch_size, n_process=n_process)):
+            results[query] = context_from_doc(doc)
+            _memo.put(query, results[query])
+    return [results[q] for q in queries]
+
+
+def clear_cache():
+    _memo.clear()
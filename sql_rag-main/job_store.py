@@ -0,0 +1,84 @@
+import threading
+import time
+import uuid
+from collections import OrderedDict
+
+PENDING = 'pending'
+RUNNING = 'running'
+DONE = 'done'
+FAILED = 'error'
+
+
+class JobStore:
+    def __init__(self, max_jobs=1000, ttl=600, clock=time.monotonic):
+        self.max_jobs = max_jobs
+        self.ttl = ttl
+        # injectable so expiry can be tested without sleeping
+        self.clock = clock
+        self._jobs = OrderedDict()
+        self._lock = threading.Lock()
+        self._latest_done = None
+
+    def _expire(self, now):
+        # Finished jobs are kept for ttl after finishing; a job still pending or running ttl
+        # after submission is treated as abandoned so it stops counting as in flight.
+        expired = [job_id for job_id, job in self._jobs.items()
+                   if now - (job['finished'] if job['finished'] is not None else job['submitted']) > self.ttl]
+        for job_id in expired:
+            del self._jobs[job_id]
+        # Oldest first; finished jobs are dropped before anything still in flight.
+        while len(self._jobs) > self.max_jobs:
+            victim = next((job_id for job_id, job in self._jobs.items() if job['finished'] is not None), None)
+            if victim is None:
+                victim = next(iter(self._jobs))
+            del self._jobs[victim]
+
+    def create(self, query):
+        job_id = uuid.uuid4().hex
+        now = self.clock()
+        with self._lock:
+            self._jobs[job_id] = {
+                'id': job_id, 'query': query, 'status': PENDING, 'response': None,
+                'error': None, 'sql': None, 'rows': None, 'truncated': False,
+                'submitted': now, 'finished': None,
+            }
+            self._expire(now)
+        return job_id
+
+    def start(self, job_id):
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is not None:
+                job['status'] = RUNNING
+
+    def finish(self, job_id, response=None, error=None, sql=None, rows=None, truncated=False):
+        now = self.clock()
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is None:
+                return
+            job['status'] = FAILED if error else DONE
+            job['response'] = response
+            job['error'] = error
+            job['sql'] = sql
+            job['rows'] = rows
+            job['truncated'] = truncated
+            job['finished'] = now
+            if not error:
+                self._latest_done = job_id
+
+    def get(self, job_id):
+        with self._lock:
+            self._expire(self.clock())
+            job = self._jobs.get(job_id)
+            return dict(job) if job is not None else None
+
+    def latest(self):
+        with self._lock:
+            job = self._jobs.get(self._latest_done) if self._latest_done else None
+            return dict(job) if job is not None else None
+
+    def in_flight(self):
+        with self._lock:
+            self._expire(self.clock())
+            return sum(1 for job in self._jobs.values() if job['finished'] is None)
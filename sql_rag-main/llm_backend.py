@@ -0,0 +1,174 @@
+import json
+import logging
+import os
+import threading
+import time
+from types import SimpleNamespace
+
+from response_cache import normalize_query
+from result_shaping import estimate_tokens
+
+logger = logging.getLogger(__name__)
+
+# Every LLM round-trip in the pipeline goes through one backend with two calls:
+#   complete(call, query, messages, **options) -> chat completion (choices[0].message.content, usage)
+#   stream(call, query, messages, **options)   -> iterator of text tokens
+# `call` is 'sql', 'repair' or 'summary'; `query` is the user's question, so a replaying
+# backend can answer without parsing the prompt. LLM_BACKEND picks the implementation.
+LLM_BACKEND = os.environ.get("LLM_BACKEND", "groq")
+LLM_REPLAY_PATH = os.environ.get("LLM_REPLAY_PATH", os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                                                                  'bench_recordings.jsonl'))
+LLM_REPLAY_LATENCY = float(os.environ.get("LLM_REPLAY_LATENCY", 0.0))
+
+DEFAULT_SQL = "SELECT event_name, event_start_date, event_country FROM event_info LIMIT 10"
+DEFAULT_SUMMARY = "There are 10 upcoming events, most of them held in Singapore."
+
+
+class GroqBackend:
+    def __init__(self, api_key=None):
+        self.api_key = api_key or os.environ.get("GROQ_API_KEY")
+        self._client = None
+        self._lock = threading.Lock()
+
+    @property
+    def client(self):
+        # Created on first use, so importing the pipeline needs neither the key nor the network.
+        if self._client is None:
+            with self._lock:
+                if self._client is None:
+                    import groq
+                    self._client = groq.Groq(api_key=self.api_key)
+        return self._client
+
+    def complete(self, call, query, messages, **options):
+        return self.client.chat.completions.create(messages=messages, **options)
+
+    def stream(self, call, query, messages, **options):
+        chunks = self.client.chat.completions.create(messages=messages, stream=True, **options)
+        try:
+            for chunk in chunks:
+                token = chunk.choices[0].delta.content if chunk.choices else None
+                if token:
+                    yield token
+        finally:
+            # closing this generator early (client disconnect) drops the HTTP stream
+            close = getattr(chunks, 'close', None)
+            if close is not None:
+                close()
+
+
+def load_recordings(path):
+    # JSON lines of {"query": ..., "sql": ..., "summary": ...}; later lines win, so a
+    # recording session can be appended to an existing file.
+    recordings = {}
+    if not path or not os.path.exists(path):
+        return recordings
+    with open(path, encoding='utf-8') as f:
+        for line in f:
+            if not line.strip():
+                continue
+            entry = json.loads(line)
+            recordings.setdefault(normalize_query(entry['query']), {}).update(
+                {key: value for key, value in entry.items() if key != 'query' and value})
+    return recordings
+
+
+class ReplayBackend:
+    # Answers from recorded SQL and summaries instead of calling a model. `latency` is
+    # slept per call and `token_latency` per streamed token, to stand in for the provider.
+    def __init__(self, recordings=None, path=None, latency=0.0, token_latency=0.0,
+                 default_sql=DEFAULT_SQL, default_summary=DEFAULT_SUMMARY):
+        self.recordings = dict(recordings or {})
+        if path:
+            self.recordings.update(load_recordings(path))
+        self.latency = latency
+        self.token_latency = token_latency
+        self.default_sql = default_sql
+        self.default_summary = default_summary
+        self.calls = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+    def _content(self, call, query):
+        recorded = self.recordings.get(normalize_query(query or ''), {})
+        key = 'summary' if call == 'summary' else 'sql'
+        content = recorded.get(key)
+        with self._lock:
+            self.calls += 1
+            if content is None:
+                self.misses += 1
+        if content is None:
+            content = self.default_summary if key == 'summary' else self.default_sql
+        return content
+
+    def complete(self, call, query, messages, **options):
+        content = self._content(call, query)
+        time.sleep(self.latency)
+        usage = SimpleNamespace(prompt_tokens=sum(estimate_tokens(m['content']) for m in messages),
+                                completion_tokens=estimate_tokens(content))
+        return SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(content=content))], usage=usage)
+
+    def stream(self, call, query, messages, **options):
+        content = self._content(call, query)
+        time.sleep(self.latency)
+        for word in content.split(' '):
+            if self.token_latency:
+                time.sleep(self.token_latency)
+            yield word + ' '
+
+
+class RecordingBackend:
+    # Wraps a live backend and appends each answer to `path` in the format ReplayBackend reads.
+    def __init__(self, backend, path):
+        self.backend = backend
+        self.path = path
+        self._lock = threading.Lock()
+
+    def _record(self, call, query, content):
+        entry = {'query': query, ('summary' if call == 'summary' else 'sql'): content}
+        with self._lock, open(self.path, 'a', encoding='utf-8') as f:
+            f.write(json.dumps(entry) + '\n')
+
+    def complete(self, call, query, messages, **options):
+        response = self.backend.complete(call, query, messages, **options)
+        self._record(call, query, response.choices[0].message.content.strip())
+        return response
+
+    def stream(self, call, query, messages, **options):
+        tokens = []
+        stream = self.backend.stream(call, query, messages, **options)
+        try:
+            for token in stream:
+                tokens.append(token)
+                yield token
+        finally:
+            stream.close()
+        # only complete answers are recorded
+        self._record(call, query, ''.join(tokens).strip())
+
+
+_backend = None
+_backend_lock = threading.Lock()
+
+
+def get_backend():
+    global _backend
+    if _backend is None:
+        with _backend_lock:
+            if _backend is None:
+                if LLM_BACKEND == 'replay':
+                    _backend = ReplayBackend(path=LLM_REPLAY_PATH, latency=LLM_REPLAY_LATENCY)
+                elif LLM_BACKEND == 'groq':
+                    _backend = GroqBackend()
+                else:
+                    raise ValueError(f"Unknown LLM_BACKEND {LLM_BACKEND!r} (expected 'groq' or 'replay')")
+                logger.info("LLM backend: %s", type(_backend).__name__)
+    return _backend
+
+
+def set_backend(backend):
+    # Swaps the backend for every subsequent call (benchmarks, load tests).
+    global _backend
+    with _backend_lock:
+        _backend = backend
+    return backend
@@ -0,0 +1,363 @@
+import argparse
+import logging
+import os
+import sqlite3
+import time
+from collections import Counter
+
+import numpy as np
+import pandas as pd
+
+from db_pool import DB_PATH, enable_wal
+from index_advisor import build_indexes
+from rollups import ROLLUP_TABLES, available_rollups, refresh_rollups
+from tag_search import build_tag_index
+from tracing import configure_logging
+
+logger = logging.getLogger(__name__)
+
+UTILITIES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'utilities')
+CHUNK_SIZE = 5000
+
+# Column order matches the tables the app has always queried; only the types are new.
+# Dates stay ISO-8601 TEXT so they compare and index as text. company_industry is left
+# out on purpose (see README): the prompt never describes it and similar_terms replaces it.
+SCHEMAS = {
+    'event_info': {
+        'csv': 'event_info_updated.csv',
+        'key': ['event_url'],
+        'columns': [
+            ('event_logo_url', 'TEXT'), ('event_name', 'TEXT NOT NULL'), ('event_start_date', 'TEXT'),
+            ('event_end_date', 'TEXT'), ('event_venue', 'TEXT'), ('event_country', 'TEXT'),
+            ('event_description', 'TEXT'), ('event_url', 'TEXT NOT NULL UNIQUE'), ('similar_terms', 'TEXT'),
+        ],
+        'constraints': ["CHECK (event_start_date IS NULL OR event_start_date GLOB '[0-9][0-9][0-9][0-9]-[0-9][0-9]-[0-9][0-9]')",
+                        "CHECK (event_end_date IS NULL OR event_start_date IS NULL OR event_end_date >= event_start_date)"],
+    },
+    'companies': {
+        'csv': 'company_info_updated.csv',
+        'key': ['homepage_base_url', 'event_url'],
+        'columns': [
+            ('company_logo_url', 'TEXT'), ('company_logo_text', 'TEXT'), ('company_name', 'TEXT'),
+            ('relation_to_event', 'TEXT'), ('event_url', 'TEXT NOT NULL'), ('company_revenue', 'TEXT'),
+            ('company_phone', 'TEXT'), ('company_founding_year', 'INTEGER'), ('company_address', 'TEXT'),
+            ('company_overview', 'TEXT'), ('homepage_url', 'TEXT'),
+            ('linkedin_company_url', 'TEXT'), ('homepage_base_url', 'TEXT'),
+            ('company_logo_url_on_event_page', 'TEXT'), ('company_logo_match_flag', 'TEXT'),
+            ('similar_terms', 'TEXT'), ('employee_range_lower', 'INTEGER'), ('employee_range_upper', 'INTEGER'),
+            ('revenue_millions', 'REAL'),
+        ],
+        'constraints': ["CHECK (employee_range_lower IS NULL OR employee_range_upper IS NULL OR employee_range_lower <= employee_range_upper)",
+                        "CHECK (revenue_millions IS NULL OR revenue_millions >= 0)",
+                        "UNIQUE (homepage_base_url, event_url)"],
+    },
+    'people': {
+        'csv': 'people_info_with_emails.csv',
+        # no natural key: rows are matched on their full contents
+        'key': None,
+        'columns': [
+            ('first_name', 'TEXT'), ('middle_name', 'TEXT'), ('last_name', 'TEXT'), ('job_title', 'TEXT'),
+            ('person_city', 'TEXT'), ('person_state', 'TEXT'), ('person_country', 'TEXT'), ('email', 'TEXT'),
+            ('homepage_base_url', 'TEXT'), ('duration_in_current_job', 'TEXT'),
+            ('duration_in_current_company', 'TEXT'),
+        ],
+        'constraints': [],
+    },
+}
+LOAD_ORDER = ['event_info', 'companies', 'people']
+
+_UNIT_SCALE = {'b': 1000.0, 'm': 1.0, 'k': 0.001, 'th': 0.001, 'tr': 1000000.0}
+
+
+def parse_employee_ranges(values):
+    # Vectorized parse_employee_range (utilities/standardize_employees.py) over a column of
+    # raw sizes such as '51-200', '1,001-5,000', '501-1K' or '10001+'. Unlike the scalar
+    # version, thousands separators and a K suffix are honoured.
+    parts = values.astype('string').str.replace(',', '', regex=False).str.extract(
+        r'(\d+(?:\.\d+)?)\s*([kK])?\s*(?:-\s*(\d+(?:\.\d+)?)\s*([kK])?)?')
+    lower = pd.to_numeric(parts[0]) * np.where(parts[1].notna(), 1000, 1)
+    upper = pd.to_numeric(parts[2]) * np.where(parts[3].notna(), 1000, 1)
+    upper = upper.fillna(lower)
+    return lower.round().astype('Int64'), upper.round().astype('Int64')
+
+
+def repair_employee_ranges(lower, upper):
+    # Ranges already split by the old script lost the K of '501-1K' (stored as 501..1);
+    # restore it where that makes the range consistent.
+    lower = pd.to_numeric(lower).round().astype('Int64')
+    upper = pd.to_numeric(upper).round().astype('Int64')
+    lost_k = (upper < lower) & (upper * 1000 >= lower)
+    return lower, upper.mask(lost_k.fillna(False), upper * 1000)
+
+
+def standardize_revenues(values):
+    # Vectorized standardize_revenue: '$1.3 billion' -> 1300.0, '$12 million' -> 12.0,
+    # '$400 thousand' -> 0.4. Bare dollar amounts ('$185000'), which the scalar version
+    # passed through as text, are converted from dollars; anything else becomes NULL.
+    parts = values.astype('string').str.replace(',', '', regex=False).str.extract(
+        r'(\d+(?:\.\d+)?)\s*([A-Za-z]*)')
+    amount = pd.to_numeric(parts[0])
+    unit = parts[1].str.lower()
+    scale = unit.str[:2].map(_UNIT_SCALE).fillna(unit.str[:1].map(_UNIT_SCALE)).astype('float64')
+    scale = scale.mask(unit.fillna('') == '', 1e-6)
+    return (amount * scale).round(4)
+
+
+def normalize_dates(values):
+    dates = pd.to_datetime(values, errors='coerce', format='mixed')
+    return dates.dt.strftime('%Y-%m-%d').astype(object).where(dates.notna(), None)
+
+
+def _null_where(chunk, columns, bad, issue, issues):
+    bad = bad.fillna(False).astype(bool)
+    if bad.any():
+        for column in columns:
+            chunk[column] = chunk[column].mask(bad, None)
+        issues[issue] += int(bad.sum())
+
+
+def enforce_checks(table, chunk, issues):
+    # Field-level versions of the CHECK constraints in SCHEMAS: the offending value is set
+    # to NULL so one bad field does not make INSERT OR IGNORE drop the whole row.
+    if table == 'event_info':
+        start, end = chunk['event_start_date'].astype('string'), chunk['event_end_date'].astype('string')
+        _null_where(chunk, ['event_end_date'], end < start, 'event_end_date before event_start_date (nulled)', issues)
+    elif table == 'companies':
+        _null_where(chunk, ['employee_range_lower', 'employee_range_upper'],
+                    chunk['employee_range_lower'] > chunk['employee_range_upper'],
+                    'employee_range_lower > employee_range_upper (nulled)', issues)
+        _null_where(chunk, ['revenue_millions'], chunk['revenue_millions'] < 0, 'negative revenue_millions (nulled)', issues)
+    for name, kind in SCHEMAS[table]['columns']:
+        if 'NOT NULL' in kind:
+            issues[f'missing {name} (dropped)'] += int(chunk[name].isna().sum())
+    return chunk
+
+
+def transform(table, chunk, issues=None):
+    # `issues` (a Counter) collects the values nulled and rows that will be dropped.
+    chunk = chunk.replace(r'^\s*$', None, regex=True)
+    if table == 'event_info':
+        chunk['event_start_date'] = normalize_dates(chunk['event_start_date'])
+        chunk['event_end_date'] = normalize_dates(chunk['event_end_date'])
+    elif table == 'companies':
+        if 'n_employees' in chunk:
+            lower, upper = parse_employee_ranges(chunk['n_employees'])
+        else:
+            lower, upper = repair_employee_ranges(chunk['employee_range_lower'], chunk['employee_range_upper'])
+        chunk['employee_range_lower'], chunk['employee_range_upper'] = lower, upper
+        revenue = standardize_revenues(chunk['company_revenue'])
+        if 'revenue_millions' in chunk:
+            revenue = revenue.fillna(pd.to_numeric(chunk['revenue_millions'], errors='coerce'))
+        chunk['revenue_millions'] = revenue
+        chunk['company_founding_year'] = pd.to_numeric(chunk['company_founding_year'], errors='coerce').round().astype('Int64')
+    columns = [name for name, _ in SCHEMAS[table]['columns']]
+    chunk = enforce_checks(table, chunk.reindex(columns=columns), issues if issues is not None else Counter())
+    # sqlite3 binds None as NULL; numpy/pandas scalars are converted to plain Python types
+    return [tuple(None if pd.isna(v) else (v.item() if hasattr(v, 'item') else v) for v in row)
+            for row in chunk.itertuples(index=False, name=None)]
+
+
+def create_table(conn, table):
+    spec = SCHEMAS[table]
+    body = [f'"{name}" {kind}' for name, kind in spec['columns']]
+    body += spec['constraints']
+    # STRICT makes SQLite reject values of the wrong type instead of storing them as text
+    strict = ' STRICT' if sqlite3.sqlite_version_info >= (3, 37, 0) else ''
+    conn.execute(f'CREATE TABLE "{table}" (\n  ' + ',\n  '.join(body) + f'\n){strict}')
+
+
+def load_table(conn, table, csv_path, chunk_size=CHUNK_SIZE):
+    columns = [name for name, _ in SCHEMAS[table]['columns']]
+    insert = f'INSERT OR IGNORE INTO "{table}" ({", ".join(columns)}) VALUES ({", ".join("?" * len(columns))})'
+    read = skipped = 0
+    issues = Counter()
+    with conn:
+        for chunk in pd.read_csv(csv_path, dtype=str, keep_default_na=False, chunksize=chunk_size):
+            rows = transform(table, chunk, issues)
+            before = conn.total_changes
+            conn.executemany(insert, rows)
+            read += len(rows)
+            # INSERT OR IGNORE drops rows missing a NOT NULL column and duplicate keys
+            skipped += len(rows) - (conn.total_changes - before)
+    missing = sum(count for issue, count in issues.items() if issue.endswith('(dropped)'))
+    if skipped > missing:
+        issues['duplicate key (dropped)'] = skipped - missing
+    log_issues(table, issues)
+    return read, skipped, issues
+
+
+def log_issues(table, issues):
+    for issue, count in sorted(issues.items()):
+        if count:
+            logger.warning("%s: %d rows with %s", table, count, issue)
+
+
+def rebuild_database(db_path=DB_PATH, csv_dir=UTILITIES_DIR, chunk_size=CHUNK_SIZE):
+    # Builds into a scratch file and swaps it in, so the stale duplicate tables (events,
+    # company_events) and loosely typed columns of the old file are not carried over.
+    scratch = f"{db_path}.loading"
+    for path in (scratch, f"{scratch}-journal"):
+        if os.path.exists(path):
+            os.remove(path)
+    report = {'tables': {}}
+    start = time.perf_counter()
+    conn = sqlite3.connect(scratch)
+    try:
+        # a half-built scratch file is simply rebuilt, so skip the journal and fsyncs
+        conn.execute("PRAGMA journal_mode=OFF")
+        conn.execute("PRAGMA synchronous=OFF")
+        for table in LOAD_ORDER:
+            create_table(conn, table)
+            table_start = time.perf_counter()
+            read, skipped, issues = load_table(conn, table, os.path.join(csv_dir, SCHEMAS[table]['csv']), chunk_size)
+            elapsed = time.perf_counter() - table_start
+            report['tables'][table] = {'rows': read - skipped, 'skipped': skipped,
+                                       'issues': {issue: count for issue, count in issues.items() if count},
+                                       'seconds': elapsed, 'rows_per_s': read / elapsed if elapsed else 0.0}
+    finally:
+        conn.close()
+    report['load_seconds'] = time.perf_counter() - start
+
+    index_start = time.perf_counter()
+    report['indexes'] = build_indexes(scratch, analyze=False)
+    report['tag_indexes'] = build_tag_index(scratch)
+    conn = sqlite3.connect(scratch)
+    try:
+        with conn:
+            report['rollups'] = refresh_rollups(conn)
+        conn.execute("ANALYZE")
+        conn.commit()
+    finally:
+        conn.close()
+    report['index_seconds'] = time.perf_counter() - index_start
+
+    # A -wal left by the old file must not be replayed onto the new one.
+    for suffix in ('-wal', '-shm'):
+        if os.path.exists(db_path + suffix):
+            os.remove(db_path + suffix)
+    os.replace(scratch, db_path)
+    enable_wal(db_path)
+    report['total_seconds'] = time.perf_counter() - start
+    report['db_bytes'] = os.path.getsize(db_path)
+    return report
+
+
+def read_rows(table, csv_path, chunk_size=CHUNK_SIZE, issues=None):
+    for chunk in pd.read_csv(csv_path, dtype=str, keep_default_na=False, chunksize=chunk_size):
+        yield from transform(table, chunk, issues)
+
+
+def sync_table(conn, table, csv_path, chunk_size=CHUNK_SIZE):
+    # Applies the difference between the CSV and the table in place: unchanged rows are not
+    # touched, so the FTS triggers and rollups only see real changes. Returns the old and
+    # new versions of every row that changed.
+    spec = SCHEMAS[table]
+    columns = [name for name, _ in spec['columns']]
+    positions = [columns.index(c) for c in spec['key']] if spec['key'] else range(len(columns))
+
+    def key(row):
+        return tuple(row[i] for i in positions)
+
+    existing = {}
+    for rowid, *row in conn.execute(f'SELECT rowid, {", ".join(columns)} FROM "{table}"'):
+        existing.setdefault(key(row), []).append((rowid, tuple(row)))
+
+    inserts, updates, touched = [], [], []
+    issues = Counter()
+    for row in read_rows(table, csv_path, chunk_size, issues):
+        matches = existing.get(key(row))
+        if not matches:
+            inserts.append(row)
+            touched.append(row)
+            continue
+        rowid, old = matches.pop()
+        if old != row:
+            updates.append(row + (rowid,))
+            touched += [old, row]
+    deletes = [(rowid, old) for matches in existing.values() for rowid, old in matches]
+    touched += [old for _, old in deletes]
+
+    conn.executemany(f'DELETE FROM "{table}" WHERE rowid = ?', [(rowid,) for rowid, _ in deletes])
+    conn.executemany(f'UPDATE "{table}" SET {", ".join(f"{c} = ?" for c in columns)} WHERE rowid = ?', updates)
+    conn.executemany(f'INSERT OR IGNORE INTO "{table}" ({", ".join(columns)}) '
+                     f'VALUES ({", ".join("?" * len(columns))})', inserts)
+    log_issues(table, issues)
+    stats = {'inserted': len(inserts), 'updated': len(updates), 'deleted': len(deletes)}
+    return stats, [dict(zip(columns, row)) for row in touched]
+
+
+def update_database(db_path=DB_PATH, csv_dir=UTILITIES_DIR, chunk_size=CHUNK_SIZE):
+    # Incremental counterpart of rebuild_database for a database it built: syncs each table
+    # with its CSV and refreshes only the rollup rows of the events those changes touch.
+    start = time.perf_counter()
+    report = {'tables': {}}
+    conn = sqlite3.connect(db_path)
+    try:
+        existing = {row[0] for row in conn.execute("SELECT name FROM sqlite_master WHERE type = 'table'")}
+        missing = [table for table in LOAD_ORDER if table not in existing]
+        if missing:
+            raise ValueError(f"{db_path} has no {', '.join(missing)} table; run a full rebuild first")
+        event_urls, homepages = set(), set()
+        with conn:
+            for table in LOAD_ORDER:
+                stats, touched = sync_table(conn, table, os.path.join(csv_dir, SCHEMAS[table]['csv']), chunk_size)
+                report['tables'][table] = stats
+                for row in touched:
+                    if table == 'people':
+                        homepages.add(row['homepage_base_url'])
+                    else:
+                        event_urls.add(row['event_url'])
+            if homepages:
+                homepages.discard(None)
+                conn.execute("CREATE TEMP TABLE IF NOT EXISTS changed_homepages (homepage_base_url TEXT PRIMARY KEY)")
+                conn.executemany("INSERT OR IGNORE INTO temp.changed_homepages VALUES (?)", [(h,) for h in homepages])
+                event_urls.update(row[0] for row in conn.execute(
+                    "SELECT DISTINCT event_url FROM companies "
+                    "WHERE homepage_base_url IN (SELECT homepage_base_url FROM temp.changed_homepages)"))
+            # a database without rollups yet gets them built in full
+            rollups_present = len(available_rollups(conn)) == len(ROLLUP_TABLES)
+            report['rollups'] = refresh_rollups(conn, event_urls if rollups_present else None)
+        conn.execute("ANALYZE")
+        conn.commit()
+    finally:
+        conn.close()
+    report['total_seconds'] = time.perf_counter() - start
+    report['db_bytes'] = os.path.getsize(db_path)
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Rebuild the events database from the CSVs into typed tables.")
+    parser.add_argument('--db', type=str, default=DB_PATH, help='Path of the SQLite database to (re)build.')
+    parser.add_argument('--csv_dir', type=str, default=UTILITIES_DIR, help='Directory holding the source CSVs.')
+    parser.add_argument('--chunk_size', type=int, default=CHUNK_SIZE, help='CSV rows per executemany batch.')
+    parser.add_argument('--incremental', action='store_true',
+                        help='Apply only the changed rows to an existing database and refresh the affected rollups.')
+    args = parser.parse_args()
+    configure_logging()
+
+    before = os.path.getsize(args.db) if os.path.exists(args.db) else 0
+    if args.incremental:
+        report = update_database(args.db, args.csv_dir, args.chunk_size)
+        for table, stats in report['tables'].items():
+            print(f"{table:<12} {stats['inserted']:>5} inserted  {stats['updated']:>5} updated  {stats['deleted']:>5} deleted")
+        print(f"refreshed rollups for {report['rollups']['events']} events / {report['rollups']['industries']} industries "
+              f"in {report['rollups']['seconds']:.2f}s; total {report['total_seconds']:.2f}s")
+        print(f"database size: {report['db_bytes'] / 1e6:.2f} MB (was {before / 1e6:.2f} MB)")
+        return
+    report = rebuild_database(args.db, args.csv_dir, args.chunk_size)
+    for table, stats in report['tables'].items():
+        print(f"{table:<12} {stats['rows']:>7} rows  {stats['skipped']:>4} rejected  "
+              f"{stats['seconds']:.2f}s  {stats['rows_per_s']:,.0f} rows/s")
+        for issue, count in sorted(stats['issues'].items()):
+            print(f"{'':<12} {count:>7} {issue}")
+    total_rows = sum(stats['rows'] for stats in report['tables'].values())
+    print(f"loaded {total_rows} rows in {report['load_seconds']:.2f}s "
+          f"({total_rows / report['load_seconds']:,.0f} rows/s); indexes + ANALYZE {report['index_seconds']:.2f}s")
+    print(f"indexes: {', '.join(report['indexes'] + report['tag_indexes'])}")
+    print(f"rollups: {', '.join(ROLLUP_TABLES)} ({report['rollups']['seconds']:.2f}s)")
+    print(f"database size: {report['db_bytes'] / 1e6:.2f} MB (was {before / 1e6:.2f} MB)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,105 @@
+import argparse
+import os
+import threading
+import time
+
+# Everything runs locally: the LLM backend is replaced by a replaying stub and the response
+# cache is disabled so every request exercises the full pipeline.
+os.environ["RESPONSE_CACHE_SIZE"] = "0"
+os.environ["RESPONSE_CACHE_SEMANTIC"] = "0"
+
+import python_apisetup
+from llm_backend import ReplayBackend, set_backend
+
+QUERIES = [
+    "List all fintech events in Singapore",
+    "Which companies with more than 1000 employees attend sales conferences?",
+    "Show people working at finance companies",
+    "What events are happening in 2025?",
+]
+
+
+def percentile(values, pct):
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, int(round(pct / 100.0 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+def run_client(app, client_id, requests_per_client, poll_interval, timeout, latencies, errors, lock):
+    http = app.test_client()
+    for i in range(requests_per_client):
+        query = f"{QUERIES[(client_id + i) % len(QUERIES)]} (client {client_id}, request {i})"
+        start = time.perf_counter()
+        submitted = http.post('/api/query', json={'query': query})
+        if submitted.status_code != 202:
+            with lock:
+                errors.append(f"submit {submitted.status_code}")
+            continue
+        job_id = submitted.get_json()['job_id']
+        while True:
+            result = http.get(f'/api/result/{job_id}').get_json()
+            if result['status'] in ('done', 'error'):
+                break
+            if time.perf_counter() - start > timeout:
+                result = {'status': 'timeout'}
+                break
+            time.sleep(poll_interval)
+        elapsed = time.perf_counter() - start
+        with lock:
+            if result['status'] == 'done':
+                latencies.append(elapsed)
+            else:
+                errors.append(result.get('error') or result['status'])
+
+
+def run_load(clients, requests_per_client, poll_interval, timeout):
+    latencies, errors = [], []
+    lock = threading.Lock()
+    threads = [threading.Thread(target=run_client,
+                                args=(python_apisetup.app, c, requests_per_client, poll_interval, timeout,
+                                      latencies, errors, lock))
+               for c in range(clients)]
+    start = time.perf_counter()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    wall = time.perf_counter() - start
+    return {
+        'clients': clients,
+        'completed': len(latencies),
+        'errors': len(errors),
+        'wall_s': wall,
+        'throughput_qps': len(latencies) / wall if wall else 0.0,
+        'p50_s': percentile(latencies, 50),
+        'p95_s': percentile(latencies, 95),
+        'max_s': max(latencies) if latencies else 0.0,
+        'error_samples': errors[:3],
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure /api/query throughput with a local stub in place of Groq.")
+    parser.add_argument('--clients', type=int, nargs='+', default=[1, 4, 16], help='Concurrent client counts to test.')
+    parser.add_argument('--requests', type=int, default=5, help='Requests sent by each client.')
+    parser.add_argument('--llm_latency', type=float, default=0.5, help='Seconds the stub waits per LLM call.')
+    parser.add_argument('--poll_interval', type=float, default=0.05, help='Seconds between result polls.')
+    parser.add_argument('--timeout', type=float, default=120.0, help='Per-request timeout in seconds.')
+    args = parser.parse_args()
+
+    stub = set_backend(ReplayBackend(latency=args.llm_latency))
+
+    print(f"{'clients':>8} {'done':>6} {'errors':>6} {'qps':>8} {'p50_s':>8} {'p95_s':>8} {'max_s':>8}")
+    for clients in args.clients:
+        report = run_load(clients, args.requests, args.poll_interval, args.timeout)
+        print(f"{report['clients']:>8} {report['completed']:>6} {report['errors']:>6} "
+              f"{report['throughput_qps']:>8.2f} {report['p50_s']:>8.3f} {report['p95_s']:>8.3f} {report['max_s']:>8.3f}")
+        if report['error_samples']:
+            print(f"         errors: {report['error_samples']}")
+    print(f"Stub LLM calls: {stub.calls} (workers: {python_apisetup.JOB_WORKERS})")
+
+
+if __name__ == "__main__":
+    main()
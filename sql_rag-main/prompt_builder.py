@@ -0,0 +1,219 @@
+import logging
+import re
+
+from result_shaping import estimate_tokens
+
+logger = logging.getLogger(__name__)
+
+SQL_SYSTEM_PROMPT = "You are an AI assistant that generates SQL queries based on natural language inputs. Strictly follow the context instructions to determine which tables and columns to search."
+
+# Sections are always emitted in this order and each one is fixed text, so every request
+# shares the longest possible byte-identical prefix (provider-side prompt caching keys
+# on it); everything that varies per request (context, query) comes last.
+INSTRUCTIONS = """Given the following natural language query, generate ONLY an appropriate SQLite-compatible SQL query without any additional explanation. Do not print anything other than the query itself.
+
+Each event_url corresponds to a unique event, and each homepage_base_url can be interpreted as a unique company.
+General rules:
+1. Each table only has the columns described in the corresponding description. Company does not have access to event's columns without performing a join and vice-versa.
+2. When generating SQL query for different tables with same column names always specify the table name before referring to the column.
+3. Do not use INTERSECT when Joining different tables
+4. Wherever any people details are mentioned, search for them in the 'people' table.
+"""
+
+SCHEMA_HEADER = "You are given an SQL database with the following schema:"
+
+EVENT_SCHEMA = """event_info contains following columns: event_logo_url,event_name,event_start_date,event_end_date,event_venue,event_country,event_description,event_url,similar_terms
+Event Details:
+1.event_name: Official name of the event
+2.event_start_date: Date when the event begins
+3.event_end_date: Date when the event concludes
+4.event_venue:Specific location where the event is held
+5.event_country: Country where the event takes place
+6.event_description: A detailed summary of the event's purpose and content
+7.event_url: The official website link for the event
+8.event_logo_url: A URL to the event's logo image
+9.similar_terms: Keywords or phrases related to event for search purposes
+"""
+
+COMPANY_SCHEMA = """companies contains following columns: company_logo_url,company_logo_text,company_name,relation_to_event,event_url,company_revenue,employee_range_lower,employee_range_upper,company_phone,company_founding_year,company_address,company_overview,homepage_url,linkedin_company_url,homepage_base_url,company_logo_url_on_event_page,company_logo_match_flag,similar_terms,revenue_millions
+Company employee count and revenue:
+1. When searching for companies based on employee count, use these new columns. For example:
+   - To find companies with more than 1000 employees, use: WHERE employee_range_upper > 1000
+   - To find companies with 50-200 employees, use: WHERE employee_range_lower >= 50 AND employee_range_upper <= 200
+2. The 'company_revenue' column is now standardized in millions and stored in the 'revenue_millions' column.
+3. When searching for companies based on revenue, use the 'revenue_millions' column.
+"""
+
+PEOPLE_SCHEMA = """people contains following columns: first_name,middle_name,last_name,job_title,person_city,person_state,person_country,email,homepage_base_url,duration_in_current_job,duration_in_current_company
+People Details:
+1.first_name: The person's given name
+2.middle_name: The person's middle name (if applicable)
+3.last_name: The person's family name or surname
+4.duration_in_current_job: How long they've been in their current role
+5.duration_in_current_company: How long they've been with their current employer
+6.person_city: The city where the person is located
+7.person_state: The state or region where the person resides
+8.person_country: The country where the person is based
+9.email: The person's email address
+Online Presence:
+homepage_base_url: The root domain of the person's personal or professional website
+"""
+
+JOIN_EVENT_COMPANY = "Events and company data can be merged using 'event_url' column.\n"
+JOIN_COMPANY_PEOPLE = "Company and people data can be merged using 'homepage_base_url' column.\n"
+
+SIMILAR_TERMS_RULES = """IMPORTANT: When searching for relevant information, prioritize using the 'similar_terms' column in the event_info and companies tables. Use the following guidelines:
+1. Ignore any delimiters in the 'similar_terms' column. Treat the entire column as a single text field.
+2. Use case-insensitive partial matching for each relevant keyword from the query.
+3. Search for keywords anywhere within the 'similar_terms' column, not just at the beginning or end of terms.
+4. Include variations and related terms of the keywords in your search.
+5. Use the LIKE operator with wildcards for flexible matching. For example:
+   WHERE LOWER(companies.similar_terms) LIKE '%keyword1%'
+     OR LOWER(companies.similar_terms) LIKE '%keyword2%'
+     OR LOWER(companies.similar_terms) LIKE '%related_term%'
+6. Only use direct column comparisons if there's no relevant match in the 'similar_terms' column.
+7. Verbs like most,participating and other action verbs are not right for searching in similar_terms, comprehend statement in such case. DO NOT do this in case other than verb. Search all nouns in similar_terms only. If noun is mentioned with explicit terms like name or description still search in similar_terms as long as it is a noun.
+"""
+
+# Precomputed tables maintained by rollups.py; described only when present in the database.
+ROLLUP_HEADER = """Precomputed tables (PREFER these over joining event_info, companies and people yourself; they already hold the joined rows and totals):
+"""
+ROLLUP_DESCRIPTIONS = {
+    'event_companies': "- event_companies: one row per company attending an event. Columns: event_url,event_name,event_start_date,event_country,homepage_base_url,company_name,relation_to_event,employee_range_lower,employee_range_upper,revenue_millions,company_similar_terms,event_similar_terms\n",
+    'event_company_people': "- event_company_people: one row per person at a company attending an event. Columns: event_url,event_name,homepage_base_url,company_name,first_name,last_name,job_title,email,person_country\n",
+    'company_industries': "- company_industries: one row per industry term of a company at an event (the similar_terms split up). Columns: event_url,homepage_base_url,industry,score\n",
+    'event_stats': "- event_stats: one row per event. Columns: event_url,event_name,event_start_date,event_country,company_count,people_count,headcount_lower_sum,headcount_upper_sum,revenue_millions_sum\n",
+    'event_industry_stats': "- event_industry_stats: attending companies per event and industry term. Columns: event_url,event_name,industry,company_count,headcount_upper_sum,revenue_millions_sum\n",
+    'event_title_stats': "- event_title_stats: people per event and exact job_title. Columns: event_url,event_name,job_title,people_count\n",
+    'industry_stats': "- industry_stats: one row per industry term across all events. Columns: industry,company_count,event_count,headcount_lower_sum,headcount_upper_sum,revenue_millions_sum\n",
+}
+ROLLUP_RULES = """Use the precomputed tables for counts, totals, rankings ("most", "how many") and event-company-people lookups. Match industry with LOWER(industry) LIKE '%keyword%' and job titles with LOWER(job_title) LIKE '%title%'.
+"""
+AGGREGATE_WORDS = r"\b(how many|number of|count|most|least|top|total|sum|average|avg|largest|biggest|rank\w*|per)\b"
+
+CONTEXT_INSTRUCTIONS = {
+    'company': "- The context is 'company': search only in the similar_terms column of the companies table. DO NOT search the similar_terms column of event_info.",
+    'event': "- The context is 'event': search only in the similar_terms column of the event_info table. DO NOT search the similar_terms column of companies.",
+    'both': "- The context is 'both': search in both tables and use INTERSECT to find common results in the similar_terms columns.",
+    'unknown': "- The context is 'unknown': search in both tables and use UNION to combine results from the similar_terms columns.",
+}
+
+# Words that pull a table into the prompt even when analyze_query did not flag it.
+TABLE_KEYWORDS = {
+    'event_info': r"\b(event|conference|seminar|workshop|meetup|exhibition|expo|trade show|symposium|summit|venue|attend\w*|exhibit\w*|sponsor\w*|partner\w*)",
+    'companies': r"\b(compan|business|corporation|firm|enterprise|organi[sz]ation|industr|employee|revenue|startup|vendor|exhibitor|sponsor|partner|founded)",
+    'people': r"\b(people|person|persons|who|staff|ceo|cto|cfo|coo|founder|director|manager|president|engineer|job|title|email|contact|work(s|ing)? (at|for))",
+}
+
+
+def referenced_tables(query, context):
+    if context == 'unknown':
+        return ['event_info', 'companies', 'people']
+    tables = set()
+    if context in ('event', 'both'):
+        tables.add('event_info')
+    if context in ('company', 'both'):
+        tables.add('companies')
+    lowered = query.lower()
+    for table, pattern in TABLE_KEYWORDS.items():
+        if re.search(pattern, lowered):
+            tables.add(table)
+    if not tables:
+        return ['event_info', 'companies', 'people']
+    # people only reach events through companies
+    if 'people' in tables and 'event_info' in tables:
+        tables.add('companies')
+    return [t for t in ('event_info', 'companies', 'people') if t in tables]
+
+
+def relevant_rollups(query, tables, rollup_tables):
+    # Rollups only help aggregates and multi-table questions; single-table lookups keep the
+    # shorter prompt.
+    if not rollup_tables:
+        return []
+    if len(tables) < 2 and not re.search(AGGREGATE_WORDS, query.lower()):
+        return []
+    return [t for t in ROLLUP_DESCRIPTIONS if t in rollup_tables]
+
+
+def build_sql_prompt(natural_language_query, context, rollup_tables=()):
+    tables = referenced_tables(natural_language_query, context)
+    searches_tags = 'event_info' in tables or 'companies' in tables
+    sections = [('instructions', INSTRUCTIONS)]
+    if searches_tags:
+        sections.append(('similar_terms', SIMILAR_TERMS_RULES))
+    sections.append(('schema', SCHEMA_HEADER + "\n"))
+    stable = len(sections)
+    if 'event_info' in tables:
+        sections.append(('event_info', EVENT_SCHEMA))
+    if 'companies' in tables:
+        sections.append(('companies', COMPANY_SCHEMA))
+    if 'people' in tables:
+        sections.append(('people', PEOPLE_SCHEMA))
+    joins = ''
+    if 'event_info' in tables and 'companies' in tables:
+        joins += JOIN_EVENT_COMPANY
+    if 'companies' in tables and 'people' in tables:
+        joins += JOIN_COMPANY_PEOPLE
+    if joins:
+        sections.append(('joins', joins))
+    rollups = relevant_rollups(natural_language_query, tables, rollup_tables)
+    if rollups:
+        sections.append(('rollups', ROLLUP_HEADER + ''.join(ROLLUP_DESCRIPTIONS[t] for t in rollups) + ROLLUP_RULES))
+    if searches_tags:
+        sections.append(('context', f"CONTEXT INSTRUCTIONS:\n{CONTEXT_INSTRUCTIONS[context]}\n"))
+    sections.append(('query', f"Natural language query: {natural_language_query}\n\nSQL query:"))
+
+    prompt = '\n'.join(text for _, text in sections)
+    messages = [
+        {"role": "system", "content": SQL_SYSTEM_PROMPT},
+        {"role": "user", "content": prompt},
+    ]
+    # The stable prefix is everything before the first section that depends on this query.
+    prefix = SQL_SYSTEM_PROMPT + '\n'.join(text for _, text in sections[:stable])
+    return {
+        'messages': messages,
+        'tables': tables,
+        'sections': [name for name, _ in sections],
+        'prompt_tokens': estimate_tokens(SQL_SYSTEM_PROMPT + prompt),
+        'stable_prefix_tokens': estimate_tokens(prefix),
+    }
+
+
+SQL_REPAIR_INSTRUCTIONS = """The following SQLite query was generated for the natural language query below, but it fails to compile against the database.
+Fix only what the error points at and return ONLY the corrected SQLite-compatible SQL query without any additional explanation.
+"""
+
+TABLE_SCHEMAS = {'event_info': EVENT_SCHEMA, 'companies': COMPANY_SCHEMA, 'people': PEOPLE_SCHEMA}
+
+
+def build_repair_prompt(natural_language_query, sql_query, error, tables):
+    # Targeted second attempt: the failing SQL, the SQLite error and only the schema of the
+    # tables involved, instead of regenerating from the full prompt.
+    base = [t for t in ('event_info', 'companies', 'people') if t in tables]
+    if not base and not any(t in ROLLUP_DESCRIPTIONS for t in tables):
+        base = list(TABLE_SCHEMAS)
+    sections = [SQL_REPAIR_INSTRUCTIONS, SCHEMA_HEADER + "\n"]
+    sections.extend(TABLE_SCHEMAS[t] for t in base)
+    if 'event_info' in base and 'companies' in base:
+        sections.append(JOIN_EVENT_COMPANY)
+    if 'companies' in base and 'people' in base:
+        sections.append(JOIN_COMPANY_PEOPLE)
+    rollups = [t for t in ROLLUP_DESCRIPTIONS if t in tables]
+    if rollups:
+        sections.append(ROLLUP_HEADER + ''.join(ROLLUP_DESCRIPTIONS[t] for t in rollups))
+    sections.append(f"Natural language query: {natural_language_query}\n\nFailing SQL query:\n{sql_query}\n\n"
+                    f"SQLite error: {error}\n\nCorrected SQL query:")
+    return [
+        {"role": "system", "content": SQL_SYSTEM_PROMPT},
+        {"role": "user", "content": '\n'.join(sections)},
+    ]
+
+
+def log_prompt_usage(build, response=None):
+    usage = getattr(response, 'usage', None)
+    provider_tokens = getattr(usage, 'prompt_tokens', None)
+    logger.info("SQL prompt: ~%d tokens (stable prefix ~%d, provider count %s), tables=%s, sections=%s",
+                build['prompt_tokens'], build['stable_prefix_tokens'], provider_tokens,
+                build['tables'], build['sections'])
+    return provider_tokens
@@ -1,40 +1,204 @@
-from flask import Flask, request, jsonify
+import os
+import json
+import logging
+import queue
+import sqlite3
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from flask import Flask, Response, request, jsonify, stream_with_context
 from flask_cors import CORS
-from database_api import process
+from database_api import process_stream, run_query
+from db_pool import DB_PATH, get_pool
+from response_cache import get_response_cache
+from index_advisor import build_indexes
+from tag_search import build_tag_index
+from rollups import ROLLUP_TABLES, available_rollups, refresh_rollups
+from job_store import JobStore
+from intent_analyzer import get_nlp
+from result_shaping import page_rows
+from tracing import configure_logging, render_gauges, render_prometheus
 import pandas as pd
+logger = logging.getLogger(__name__)
 app = Flask(__name__)
 CORS(app)
-last_query_result = None
-previous_query = ""
-result=""
+# LLM round-trips run on a bounded worker pool; each query gets its own job so concurrent
+# users no longer overwrite each other's answers.
+JOB_WORKERS = int(os.environ.get("JOB_WORKERS", 8))
+MAX_PENDING_JOBS = int(os.environ.get("MAX_PENDING_JOBS", 64))
+executor = ThreadPoolExecutor(max_workers=JOB_WORKERS, thread_name_prefix="query-job")
+jobs = JobStore(max_jobs=int(os.environ.get("JOB_STORE_SIZE", 1000)),
+                ttl=float(os.environ.get("JOB_RESULT_TTL", 600)))
+
+def finish_job(job_id, answer):
+    if answer is None:
+        jobs.finish(job_id, response='')
+    else:
+        jobs.finish(job_id, response=answer['summary'], sql=answer['sql'],
+                    rows=answer['rows'], truncated=answer['truncated'])
+
+def run_job(job_id, query):
+    jobs.start(job_id)
+    if query.lower() == 'quit':
+        finish_job(job_id, None)
+        return
+    try:
+        answer = run_query(query)
+    except Exception as e:
+        logger.exception("Job %s failed", job_id)
+        jobs.finish(job_id, error=str(e))
+        return
+    finish_job(job_id, answer)
+
+def job_response(job):
+    response = job['response']
+    if isinstance(response, pd.DataFrame):
+        response = response.to_dict(orient='records')
+    rows = job['rows']
+    return {'job_id': job['id'], 'status': job['status'], 'response': response, 'error': job['error'],
+            'sql': job['sql'], 'row_count': len(rows) if rows is not None else 0,
+            'truncated': job['truncated']}
+
 @app.route('/api/query', methods=['POST'])
 def handle_query():
-    global result
-    global last_query_result, previous_query
     data = request.json
     query = data.get('query')
-    print(f"Received query: {query}")
+    logger.info("Received query: %s", query)
     
-    if query:
-        previous_query = query
-        result = process(query)
-        last_query_result = result  
-        return jsonify({'status': 'Query processed'})
-    else:
+    if not query:
         return jsonify({'status': 'No query received'})
+    if jobs.in_flight() >= MAX_PENDING_JOBS:
+        return jsonify({'status': 'Too many queries in progress, please retry shortly'}), 429
+    job_id = jobs.create(query)
+    executor.submit(run_job, job_id, query)
+    return jsonify({'status': 'Query accepted', 'job_id': job_id}), 202
+
+@app.route('/api/result/<job_id>', methods=['GET'])
+def get_job_result(job_id):
+    job = jobs.get(job_id)
+    if job is None:
+        return jsonify({'job_id': job_id, 'status': 'unknown', 'response': 'No result available'}), 404
+    return jsonify(job_response(job))
+
+@app.route('/api/result/<job_id>/rows', methods=['GET'])
+def get_job_rows(job_id):
+    # Full (bounded) result rows, paged, separate from the digest-based summary.
+    job = jobs.get(job_id)
+    if job is None:
+        return jsonify({'job_id': job_id, 'status': 'unknown', 'rows': []}), 404
+    if job['rows'] is None:
+        return jsonify({'job_id': job_id, 'status': job['status'], 'rows': []})
+    try:
+        page = page_rows(job['rows'], request.args.get('page', 1), request.args.get('page_size', 50))
+    except ValueError:
+        return jsonify({'job_id': job_id, 'status': 'page and page_size must be integers'}), 400
+    page.update({'job_id': job_id, 'status': job['status'], 'truncated': job['truncated']})
+    return jsonify(page)
+
+def stream_job(job_id, query, events, cancelled):
+    # Runs on the job executor like run_job, handing events to the request thread through
+    # `events`. The job is always finished here, even when the client goes away mid-stream.
+    jobs.start(job_id)
+    stream = process_stream(query)
+    finished = False
+    try:
+        for event in stream:
+            if cancelled.is_set():
+                break
+            if event['event'] == 'done':
+                finish_job(job_id, event['answer'])
+                finished = True
+            elif event['event'] == 'error':
+                jobs.finish(job_id, error=event['data'])
+                finished = True
+            events.put(event)
+    except Exception as e:
+        logger.exception("Streaming job %s failed", job_id)
+        events.put({'event': 'error', 'data': str(e)})
+    finally:
+        stream.close()
+        if not finished:
+            jobs.finish(job_id, error='client disconnected' if cancelled.is_set() else 'stream ended without an answer')
+        events.put(None)
+
+@app.route('/api/stream', methods=['GET'])
+def stream_query():
+    # Server-Sent Events: 'sql' and 'rows' progress events, then summary 'token's,
+    # then 'done' (or 'error').
+    query = request.args.get('query')
+    logger.info("Received streaming query: %s", query)
+    if not query:
+        return jsonify({'status': 'No query received'}), 400
+    if jobs.in_flight() >= MAX_PENDING_JOBS:
+        return jsonify({'status': 'Too many queries in progress, please retry shortly'}), 429
+
+    job_id = jobs.create(query)
+    events = queue.Queue()
+    cancelled = threading.Event()
+    executor.submit(stream_job, job_id, query, events, cancelled)
+
+    def relay():
+        try:
+            yield f"event: job\ndata: {json.dumps(job_id)}\n\n"
+            while True:
+                event = events.get()
+                if event is None:
+                    return
+                yield f"event: {event['event']}\ndata: {json.dumps(event['data'])}\n\n"
+        finally:
+            # GeneratorExit on client disconnect: stop the pipeline at its next event
+            cancelled.set()
+
+    return Response(stream_with_context(relay()), mimetype='text/event-stream',
+                    headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+
 @app.route('/api/result', methods=['GET'])
 def get_result():
-    
-    if isinstance(result, pd.DataFrame):
-        result_list = result.to_dict(orient='records')
-        return jsonify({'response': result_list})
-    elif result is not None:
-        return jsonify({'response': result})
-    else:
+    # Kept for older clients: the most recently completed answer.
+    job = jobs.latest()
+    if job is None:
         return jsonify({'response': 'No result available'})
+    return jsonify({'response': job_response(job)['response']})
+
+@app.route('/api/pool', methods=['GET'])
+def get_pool_metrics():
+    return jsonify(get_pool().metrics())
+
+@app.route('/api/cache', methods=['GET'])
+def get_cache_stats():
+    return jsonify(get_response_cache().stats())
+
+@app.route('/api/metrics', methods=['GET'])
+def get_metrics():
+    # Prometheus text exposition: per-stage latency, row/token histograms, outcomes,
+    # plus the pool, cache and job-queue numbers as gauges.
+    body = (render_prometheus()
+            + render_gauges('sql_chatbot_pool', get_pool().metrics())
+            + render_gauges('sql_chatbot_cache', get_response_cache().stats())
+            + render_gauges('sql_chatbot_jobs', {'in_flight': jobs.in_flight()}))
+    return Response(body, mimetype='text/plain; version=0.0.4')
+
+def build_missing_rollups():
+    # load_database.py keeps the rollups current; this only covers databases built before them.
+    conn = sqlite3.connect(DB_PATH)
+    try:
+        if len(available_rollups(conn)) < len(ROLLUP_TABLES):
+            with conn:
+                refresh_rollups(conn)
+            conn.execute("ANALYZE")
+    finally:
+        conn.close()
 
 def run_flask():
-    app.run(debug=True, use_reloader=False)
+    configure_logging()
+    try:
+        build_indexes()
+        build_tag_index()
+        build_missing_rollups()
+    except Exception as e:
+        logger.warning("Could not build indexes: %s", e)
+    # Load the spaCy model off the request path so the server starts listening at once.
+    threading.Thread(target=get_nlp, daemon=True).start()
+    app.run(debug=True, use_reloader=False, threaded=True)
 
 if __name__ == "__main__":
     run_flask()
\ No newline at end of file
@@ -0,0 +1,358 @@
+import logging
+import os
+import re
+import threading
+
+from db_pool import DB_PATH, get_pool
+from intent_analyzer import analyze_query
+from response_cache import db_fingerprint
+from tag_search import available_tag_indexes, tag_condition
+
+logger = logging.getLogger(__name__)
+
+INDUSTRY_VOCAB_PATH = os.environ.get(
+    "INDUSTRY_VOCAB_PATH",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), 'utilities', 'industries_list_dedup.txt'))
+TEMPLATES_ENABLED = os.environ.get("QUERY_TEMPLATES", "1") != "0"
+# Answer matched questions with a fixed-form summary instead of the summarization call.
+TEMPLATE_SUMMARIES = os.environ.get("TEMPLATE_SUMMARIES", "1") != "0"
+
+MONTHS = ['january', 'february', 'march', 'april', 'may', 'june', 'july',
+          'august', 'september', 'october', 'november', 'december']
+COUNTRY_ALIASES = {
+    'us': 'usa', 'u.s.': 'usa', 'u.s.a.': 'usa', 'united states': 'usa',
+    'united states of america': 'usa', 'america': 'usa',
+    'uae': 'united arab emirates', 'uk': 'united kingdom', 'britain': 'united kingdom',
+}
+TITLE_ALIASES = {
+    'ceo': 'chief executive officer', 'cto': 'chief technology officer', 'cfo': 'chief financial officer',
+    'coo': 'chief operating officer', 'cmo': 'chief marketing officer', 'cio': 'chief information officer',
+    'vp': 'vice president',
+}
+COMPARATORS = {
+    'more than': '>', 'over': '>', 'greater than': '>', 'above': '>', 'at least': '>=',
+    'fewer than': '<', 'less than': '<', 'under': '<', 'below': '<', 'at most': '<=',
+}
+
+_LEAD_IN = re.compile(
+    r"^(?:please )?(?:(?:can you )?(?:show|list|find|get|give|display|fetch)(?: me)?|what are|which are|who are|which|what)?\s*"
+    r"(?:the list of |a list of |list of )?(?:all )?(?:the )?", re.IGNORECASE)
+_HOW_MANY = re.compile(r"^how many\s+", re.IGNORECASE)
+_NUMBER = r"(?P<n>\d[\d,]*(?:\.\d+)?k?)"
+_COMPARATOR = "(?P<cmp>" + '|'.join(sorted(COMPARATORS, key=len, reverse=True)) + ")"
+
+_COMPANY_SHAPE = re.compile(
+    r"^(?:(?P<ind1>[\w&/,' -]+?) )?(?:companies|firms|businesses|organi[sz]ations|corporations|enterprises)"
+    r"(?: (?:in|from|within) (?:the )?(?P<ind2>[\w&/,' -]+?)(?: (?:industry|sector|space))?)?"
+    r" (?:with|having|that have|which have|have|has) " + _COMPARATOR + " " + _NUMBER +
+    r" (?:employees|staff|people|workers)$")
+_EVENT_NOUNS = r"(?:events|conferences|exhibitions|expos|summits|trade shows|seminars|workshops|fairs)"
+_EVENT_HEAD = re.compile(r"^(?:upcoming )?(?:(?P<ind>[\w&/,' -]+?) )?" + _EVENT_NOUNS +
+                         r"(?: (?:are |were )?(?:there|held|happening|taking place|hosted|scheduled))?$")
+_EVENT_CLAUSES = [
+    ('month', re.compile(r" (?:in|during|on) (?P<month>" + '|'.join(MONTHS) + r")(?: (?P<year>\d{4}))?$")),
+    ('year', re.compile(r" (?:in|during) (?P<year>\d{4})$")),
+    ('place', re.compile(r" (?:in|at) (?:the )?(?P<place>[a-z][\w.' -]*?)$")),
+]
+_PEOPLE_SHAPE = re.compile(
+    r"^(?P<who>.*?)(?: who)?(?: (?:work|works|working|are|is|employed))? ?(?:at|from|in) (?:the )?"
+    r"(?P<noun>companies|firms|businesses|exhibitors|sponsors)(?: (?:that|which|who) (?:are|were))?"
+    r" (?P<verb>attending|exhibiting at|exhibiting in|participating in|sponsoring|present at|going to|at)"
+    r" (?:the )?(?:event )?(?P<event>.+?)(?: event)?$")
+_PEOPLE_WHO = re.compile(
+    r"^(?:people|persons|contacts|employees|staff)"
+    r"(?: (?:with (?:the |a )?(?:job )?titles?|titled|who are|whose (?:job )?title is|as))?\s*")
+
+
+# companies.relation_to_event implied by the wording; anything else ("attending", "at")
+# covers every relation.
+RELATIONS = {
+    'sponsoring': 'sponsor', 'sponsors': 'sponsor',
+    'exhibiting at': 'exhibitor', 'exhibiting in': 'exhibitor', 'exhibitors': 'exhibitor',
+}
+RELATION_VERBS = {'sponsor': 'sponsoring', 'exhibitor': 'exhibiting at'}
+_SINGULAR = {'companies': 'company', 'events': 'event', 'people': 'person'}
+_PLURAL_NOUN = re.compile(r"\b(" + '|'.join(_SINGULAR) + r")\b")
+
+
+class _Vocabulary:
+    # Industry terms from the tagging vocabulary plus the countries and event names in the
+    # live database. Reloaded when the database file changes (e.g. after a rebuild).
+    def __init__(self, db_path, industry_path):
+        self.db_path = db_path
+        self.industry_path = industry_path
+        self._lock = threading.Lock()
+        self._fingerprint = None
+        self.industries = []
+        self.countries = set()
+        self.event_names = []
+        self.tag_indexes = set()
+
+    def refresh(self):
+        fingerprint = db_fingerprint(self.db_path)
+        if fingerprint == self._fingerprint:
+            return self
+        with self._lock:
+            if fingerprint == self._fingerprint:
+                return self
+            if not self.industries:
+                try:
+                    with open(self.industry_path, encoding='utf-8') as f:
+                        self.industries = [line.strip().lower() for line in f if line.strip()]
+                except OSError as e:
+                    logger.warning("Industry vocabulary unavailable (%s); industry templates disabled", e)
+            with get_pool().connection() as conn:
+                countries = set()
+                for (value,) in conn.execute("SELECT DISTINCT event_country FROM event_info WHERE event_country IS NOT NULL"):
+                    countries.update(part.strip().lower() for part in value.split(',') if part.strip())
+                self.countries = countries
+                self.event_names = [row[0].lower() for row in conn.execute(
+                    "SELECT DISTINCT event_name FROM event_info WHERE event_name IS NOT NULL")]
+                self.tag_indexes = available_tag_indexes(conn)
+            self._fingerprint = fingerprint
+        return self
+
+    def industry(self, text):
+        # The tags are drawn from this vocabulary, so a phrase found in it (as whole words)
+        # is a reliable similar_terms keyword; anything else is left to the LLM.
+        text = (text or '').strip().lower()
+        if not text:
+            return None
+        for variant in dict.fromkeys([text, text.replace(' and ', ' & '), text.replace(' & ', ' and '),
+                                      text[:-1] if text.endswith('s') else text]):
+            pattern = re.compile(rf"(?<!\w){re.escape(variant)}(?!\w)")
+            if any(pattern.search(term) for term in self.industries):
+                return variant
+        return None
+
+    def country(self, text):
+        text = COUNTRY_ALIASES.get(text.strip().lower(), text.strip().lower())
+        return text if text in self.countries else None
+
+    def event(self, text):
+        text = text.strip().strip('"\'').lower()
+        if len(text) >= 3 and any(text in name for name in self.event_names):
+            return text
+        return None
+
+
+_vocabulary = _Vocabulary(DB_PATH, INDUSTRY_VOCAB_PATH)
+
+
+def normalize(query):
+    text = re.sub(r"\s+", ' ', query.strip().lower()).rstrip('?.! ')
+    count = bool(_HOW_MANY.match(text))
+    text = _HOW_MANY.sub('', text)
+    text = re.sub(r"\s+(?:are there|do we have|exist)$", '', text)
+    return _LEAD_IN.sub('', text, count=1).strip(), count
+
+
+def parse_number(text):
+    text = text.replace(',', '')
+    if text.endswith('k'):
+        return int(float(text[:-1]) * 1000)
+    return int(float(text))
+
+
+def _singular(title):
+    words = title.split()
+    if words and len(words[-1]) > 3 and words[-1].endswith('s') and not words[-1].endswith('ss'):
+        words[-1] = words[-1][:-1]
+    elif words and words[-1].endswith('s') and words[-1][:-1] in TITLE_ALIASES:
+        words[-1] = words[-1][:-1]
+    return ' '.join(words)
+
+
+def _title_condition(title):
+    # Abbreviations are matched as whole words ('cto' must not match 'director').
+    title = _singular(title.strip().strip('"\''))
+    padded = "' ' || REPLACE(REPLACE(LOWER(p.job_title), '/', ' '), ',', ' ') || ' ' LIKE ?"
+    conditions, params = [], []
+    if title in TITLE_ALIASES:
+        conditions += [padded, "LOWER(p.job_title) LIKE ?"]
+        params += [f"% {title} %", f"%{TITLE_ALIASES[title]}%"]
+    elif len(title) <= 3:
+        conditions.append(padded)
+        params.append(f"% {title} %")
+    else:
+        conditions.append("LOWER(p.job_title) LIKE ?")
+        params.append(f"%{title}%")
+    return '(' + ' OR '.join(conditions) + ')', params
+
+
+def match_company_shape(text, vocab):
+    m = _COMPANY_SHAPE.match(text)
+    if not m:
+        return None
+    raw = [t for t in (m.group('ind1'), m.group('ind2')) if t]
+    if len(raw) > 1:
+        return None
+    industry = vocab.industry(raw[0]) if raw else None
+    if raw and industry is None:
+        return None
+    n = parse_number(m.group('n'))
+    op = COMPARATORS[m.group('cmp')]
+    where, params = [], []
+    if industry:
+        where.append(tag_condition('c', 'companies', vocab.tag_indexes))
+        params.append(f"%{industry}%")
+    # as in the SQL prompt: upper bound for "more than", and the same column for the other comparisons
+    where.append(f"c.employee_range_upper {op} ?")
+    params.append(n)
+    sql = ("SELECT DISTINCT c.company_name, c.homepage_base_url, c.employee_range_lower, c.employee_range_upper\n"
+           "FROM companies c\n"
+           f"WHERE {' AND '.join(where)}\n"
+           "ORDER BY c.employee_range_upper DESC, c.company_name")
+    description = 'companies' + (f" in {industry}" if industry else '') + f" with {m.group('cmp')} {n:,} employees"
+    return {'template': 'company_industry_size', 'entity': 'company', 'sql': sql, 'params': params,
+            'description': description, 'label_column': 'company_name'}
+
+
+def match_event_shape(text, vocab):
+    filters = {}
+    changed = True
+    while changed:
+        changed = False
+        for name, pattern in _EVENT_CLAUSES:
+            m = pattern.search(text)
+            if not m or name in filters or (name == 'year' and 'month' in filters and filters['month'][1]):
+                continue
+            if name == 'place':
+                country = vocab.country(m.group('place'))
+                if country is None:
+                    continue
+                filters['place'] = country
+            elif name == 'month':
+                filters['month'] = (MONTHS.index(m.group('month')) + 1, m.group('year'))
+            else:
+                filters['year'] = m.group('year')
+            text = text[:m.start()]
+            changed = True
+            break
+    head = _EVENT_HEAD.match(text)
+    if not head or not filters:
+        return None
+    industry = None
+    if head.group('ind'):
+        industry = vocab.industry(head.group('ind'))
+        if industry is None:
+            return None
+
+    where, params, parts = [], [], []
+    if industry:
+        where.append(tag_condition('e', 'event_info', vocab.tag_indexes))
+        params.append(f"%{industry}%")
+    if 'place' in filters:
+        where.append("LOWER(e.event_country) LIKE ?")
+        params.append(f"%{filters['place']}%")
+        place = filters['place']
+        parts.append(f"in {place.upper() if len(place) <= 3 else place.title()}")
+    month, year = filters.get('month', (None, None))
+    year = year or filters.get('year')
+    if year and month:
+        # ISO dates compare as text, so a half-open range can use the event_start_date index
+        end = f"{int(year) + 1}-01-01" if month == 12 else f"{year}-{month + 1:02d}-01"
+        where.append("e.event_start_date >= ? AND e.event_start_date < ?")
+        params += [f"{year}-{month:02d}-01", end]
+    elif year:
+        where.append("e.event_start_date >= ? AND e.event_start_date < ?")
+        params += [f"{year}-01-01", f"{int(year) + 1}-01-01"]
+    elif month:
+        where.append("substr(e.event_start_date, 6, 2) = ?")
+        params.append(f"{month:02d}")
+    if month or year:
+        parts.append("in " + ' '.join(p for p in (MONTHS[month - 1].title() if month else None, year) if p))
+    sql = ("SELECT e.event_name, e.event_start_date, e.event_end_date, e.event_venue, e.event_country, e.event_url\n"
+           "FROM event_info e\n"
+           f"WHERE {' AND '.join(where)}\n"
+           "ORDER BY e.event_start_date, e.event_name")
+    description = (f"{industry} events" if industry else 'events') + ''.join(f" {p}" for p in parts)
+    return {'template': 'events_country_month', 'entity': 'event', 'sql': sql, 'params': params,
+            'description': description, 'label_column': 'event_name'}
+
+
+def match_people_shape(text, vocab):
+    m = _PEOPLE_SHAPE.match(text)
+    if not m:
+        return None
+    event = vocab.event(m.group('event'))
+    if event is None:
+        return None
+    who = m.group('who').strip()
+    title = _PEOPLE_WHO.sub('', who, count=1).strip() if _PEOPLE_WHO.match(who) else who
+    where, params = [], []
+    if title:
+        condition, title_params = _title_condition(title)
+        where.append(condition)
+        params += title_params
+    relation = RELATIONS.get(m.group('noun')) or RELATIONS.get(m.group('verb'))
+    if relation and RELATIONS.get(m.group('verb'), relation) != relation:
+        return None  # "sponsors exhibiting at": leave the mixed wording to the LLM
+    if relation:
+        where.append("c.relation_to_event = ?")
+        params.append(relation)
+    where.append("LOWER(e.event_name) LIKE ?")
+    params.append(f"%{event}%")
+    sql = ("SELECT DISTINCT p.first_name, p.last_name, p.job_title, p.email, c.company_name, e.event_name\n"
+           "FROM people p\n"
+           "JOIN companies c ON p.homepage_base_url = c.homepage_base_url\n"
+           "JOIN event_info e ON c.event_url = e.event_url\n"
+           f"WHERE {' AND '.join(where)}\n"
+           "ORDER BY c.company_name, p.last_name")
+    description = ((f"people titled '{_singular(title)}'" if title else 'people')
+                   + f" at companies {RELATION_VERBS.get(relation, 'attending')} '{event}'")
+    return {'template': 'people_title_event', 'entity': 'people', 'sql': sql, 'params': params,
+            'description': description, 'label_column': 'company_name'}
+
+
+SHAPES = [match_company_shape, match_event_shape, match_people_shape]
+# analyze_query contexts under which a shape is trusted; 'both' means the parse saw
+# qualifiers on events and companies at once, which none of the templates encode.
+ALLOWED_CONTEXTS = {
+    'company': {'company', 'unknown'},
+    'event': {'event', 'unknown'},
+    'people': {'company', 'event', 'unknown', 'both'},
+}
+
+
+def match_template(query):
+    # Returns a dict with parameterized 'sql'/'params' for the common question shapes,
+    # or None to send the question to the LLM. Only whole-question matches are accepted.
+    if not TEMPLATES_ENABLED:
+        return None
+    text, count = normalize(query)
+    vocab = _vocabulary.refresh()
+    for shape in SHAPES:
+        match = shape(text, vocab)
+        if match is None:
+            continue
+        context = analyze_query(query)
+        if context not in ALLOWED_CONTEXTS[match['entity']]:
+            logger.debug("Template %s rejected: intent context is %s", match['template'], context)
+            return None
+        if count:
+            match['sql'] = f"SELECT COUNT(*) AS count FROM (\n{match['sql']}\n)"
+        match['count'] = count
+        logger.info("Query answered by template %s", match['template'])
+        return match
+    return None
+
+
+def _describe(match, n):
+    # descriptions are written in the plural; "1 companies in fintech" -> "1 company in fintech"
+    if n != 1:
+        return match['description']
+    return _PLURAL_NOUN.sub(lambda m: _SINGULAR[m.group(1)], match['description'], count=1)
+
+
+def template_summary(match, result, truncated=False):
+    if match['count']:
+        total = int(result.iloc[0, 0]) if len(result) else 0
+        return f"There {'is' if total == 1 else 'are'} {total:,} {_describe(match, total)}."
+    if result.empty:
+        return f"No {match['description']} were found in the database."
+    labels = list(dict.fromkeys(str(v) for v in result[match['label_column']].dropna()))
+    shown = ', '.join(labels[:5]) + (', ...' if len(labels) > 5 else '')
+    if truncated:
+        return f"Found more than {len(result):,} {match['description']}, including {shown}."
+    return f"Found {len(result):,} {_describe(match, len(result))}, including {shown}."
@@ -0,0 +1,224 @@
+import logging
+import os
+import re
+import threading
+import time
+from collections import OrderedDict
+
+import numpy as np
+
+from db_pool import DB_PATH
+
+logger = logging.getLogger(__name__)
+
+EMBEDDING_MODEL = 'all-MiniLM-L6-v2'
+
+
+def normalize_query(query):
+    query = re.sub(r'\s+', ' ', query.strip().lower())
+    return query.rstrip(' ?.!')
+
+
+_NUMBER = re.compile(r"\d[\d,]*(?:\.\d+)?(?:\s*[km]\b)?", re.IGNORECASE)
+_QUOTED = re.compile(r"[\"']([^\"']+)[\"']")
+_CAPITALIZED = re.compile(r"\b[A-Z][\w&-]*(?:\s+[A-Z][\w&-]*)*")
+
+
+def query_signature(query):
+    # The literals a paraphrase must keep to share an answer: numbers ("1k" == "1,000"),
+    # quoted strings and capitalized names (countries, events, titles). Embeddings place
+    # "more than 1000 employees" and "more than 5000 employees" well above the threshold.
+    numbers = set()
+    for literal in _NUMBER.findall(query):
+        literal = literal.replace(',', '').replace(' ', '').lower()
+        scale = {'k': 1e3, 'm': 1e6}.get(literal[-1], 1)
+        numbers.add(float(literal.rstrip('km')) * scale)
+    entities = {quoted.strip().lower() for quoted in _QUOTED.findall(query)}
+    # the first word of a sentence is capitalized anyway (acronyms such as "CTOs" still count)
+    body = re.sub(r"^\s*[A-Z][a-z]*\b", '', query)
+    entities |= {name.lower() for name in _CAPITALIZED.findall(body)}
+    return frozenset(numbers), frozenset(entities)
+
+
+def db_fingerprint(db_path):
+    # WAL-mode writes land in the -wal file first, so include it in the fingerprint.
+    parts = []
+    for path in (db_path, f"{db_path}-wal"):
+        try:
+            stat = os.stat(path)
+            parts.append((stat.st_mtime_ns, stat.st_size))
+        except OSError:
+            parts.append(None)
+    return tuple(parts)
+
+
+class ResponseCache:
+    def __init__(self, max_entries=256, semantic_max_entries=1024, ttl=3600,
+                 similarity_threshold=0.92, semantic=True, db_path=DB_PATH, encoder=None, clock=time.monotonic):
+        self.max_entries = max_entries
+        self.semantic_max_entries = semantic_max_entries
+        self.ttl = ttl
+        self.similarity_threshold = similarity_threshold
+        self.semantic = semantic
+        self.db_path = db_path
+        # injectable so expiry can be tested without sleeping
+        self.clock = clock
+
+        self._encoder = encoder
+        self._encoder_failed = False
+        self._lock = threading.Lock()
+        self._exact = OrderedDict()
+        self._semantic = OrderedDict()
+        self._matrix = None
+        self._matrix_keys = []
+        self._fingerprint = db_fingerprint(db_path)
+
+        self._exact_hits = 0
+        self._semantic_hits = 0
+        self._misses = 0
+        self._invalidations = 0
+        self._latency_saved = 0.0
+
+    def _get_encoder(self):
+        if self._encoder is None and not self._encoder_failed:
+            try:
+                from sentence_transformers import SentenceTransformer
+                self._encoder = SentenceTransformer(EMBEDDING_MODEL)
+            except ImportError:
+                logger.warning("Semantic cache disabled: sentence-transformers is not installed "
+                               "(pip install sentence-transformers); only exact repeats are cached")
+                self._encoder_failed = True
+            except Exception as e:
+                logger.warning("Semantic cache disabled: %s", e)
+                self._encoder_failed = True
+        return self._encoder
+
+    def _embed(self, text):
+        encoder = self._get_encoder()
+        if encoder is None:
+            return None
+        embedding = np.asarray(encoder.encode(text), dtype=np.float32)
+        norm = np.linalg.norm(embedding)
+        return embedding / norm if norm else embedding
+
+    def _check_database(self):
+        fingerprint = db_fingerprint(self.db_path)
+        if fingerprint != self._fingerprint:
+            self._fingerprint = fingerprint
+            self._clear()
+            self._invalidations += 1
+
+    def _clear(self):
+        self._exact.clear()
+        self._semantic.clear()
+        self._matrix = None
+        self._matrix_keys = []
+
+    def _expired(self, entry, now):
+        return self.ttl is not None and now - entry['created'] > self.ttl
+
+    def _semantic_lookup(self, embedding, signature, now):
+        if self._matrix is None:
+            expired = [key for key, entry in self._semantic.items() if self._expired(entry, now)]
+            for key in expired:
+                del self._semantic[key]
+            if not self._semantic:
+                return None
+            self._matrix_keys = list(self._semantic.keys())
+            self._matrix = np.vstack([self._semantic[key]['embedding'] for key in self._matrix_keys])
+        scores = self._matrix @ embedding
+        # Best-scoring entry above the threshold that asks about the same numbers and names.
+        for index in np.argsort(-scores):
+            if scores[index] < self.similarity_threshold:
+                return None
+            entry = self._semantic.get(self._matrix_keys[index])
+            if entry is not None and not self._expired(entry, now) and entry['signature'] == signature:
+                return entry
+        return None
+
+    def get(self, query):
+        key = normalize_query(query)
+        now = self.clock()
+        with self._lock:
+            self._check_database()
+            entry = self._exact.get(key)
+            if entry is not None:
+                if self._expired(entry, now):
+                    del self._exact[key]
+                else:
+                    self._exact.move_to_end(key)
+                    self._exact_hits += 1
+                    self._latency_saved += entry['latency']
+                    return entry['value']
+            if not self.semantic or not self._semantic:
+                self._misses += 1
+                return None
+
+        # Encoding takes milliseconds; keep it outside the lock.
+        embedding = self._embed(key)
+        with self._lock:
+            entry = (self._semantic_lookup(embedding, query_signature(query), now)
+                     if embedding is not None else None)
+            if entry is None:
+                self._misses += 1
+                return None
+            self._semantic_hits += 1
+            self._latency_saved += entry['latency']
+            return entry['value']
+
+    def put(self, query, value, latency=0.0):
+        key = normalize_query(query)
+        embedding = self._embed(key) if self.semantic else None
+        now = self.clock()
+        with self._lock:
+            self._check_database()
+            self._exact[key] = {'value': value, 'created': now, 'latency': latency}
+            self._exact.move_to_end(key)
+            while len(self._exact) > self.max_entries:
+                self._exact.popitem(last=False)
+            if embedding is not None:
+                self._semantic[key] = {'value': value, 'created': now, 'latency': latency, 'embedding': embedding,
+                                       'signature': query_signature(query)}
+                self._semantic.move_to_end(key)
+                while len(self._semantic) > self.semantic_max_entries:
+                    self._semantic.popitem(last=False)
+                self._matrix = None
+
+    def invalidate(self):
+        with self._lock:
+            self._clear()
+            self._invalidations += 1
+
+    def stats(self):
+        with self._lock:
+            hits = self._exact_hits + self._semantic_hits
+            lookups = hits + self._misses
+            return {
+                'exact_entries': len(self._exact),
+                'semantic_entries': len(self._semantic),
+                'exact_hits': self._exact_hits,
+                'semantic_hits': self._semantic_hits,
+                'misses': self._misses,
+                'hit_rate': round(hits / lookups, 4) if lookups else 0.0,
+                'invalidations': self._invalidations,
+                'latency_saved_s': round(self._latency_saved, 3),
+            }
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_response_cache():
+    global _cache
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                _cache = ResponseCache(
+                    max_entries=int(os.environ.get("RESPONSE_CACHE_SIZE", 256)),
+                    semantic_max_entries=int(os.environ.get("RESPONSE_CACHE_SEMANTIC_SIZE", 1024)),
+                    ttl=float(os.environ.get("RESPONSE_CACHE_TTL", 3600)),
+                    similarity_threshold=float(os.environ.get("RESPONSE_CACHE_SIMILARITY", 0.92)),
+                    semantic=os.environ.get("RESPONSE_CACHE_SEMANTIC", "1") != "0",
+                )
+    return _cache
@@ -0,0 +1,137 @@
+import math
+import os
+import re
+
+import pandas as pd
+
+MAX_RESULT_ROWS = int(os.environ.get("MAX_RESULT_ROWS", 1000))
+SUMMARY_TOKEN_BUDGET = int(os.environ.get("SUMMARY_TOKEN_BUDGET", 1500))
+FETCH_BATCH_SIZE = 256
+TOP_K = 5
+MAX_CELL_CHARS = 120
+
+# LIMIT n / LIMIT ? with an optional ", m" / "OFFSET m" (literal or bound parameter)
+_TRAILING_LIMIT = re.compile(r'\blimit\s+(?:\d+|\?)(?:\s*(?:,|offset)\s*(?:\d+|\?))?\s*$', re.IGNORECASE)
+
+
+def estimate_tokens(text):
+    # ~4 characters per token for English/SQL is close enough for budgeting.
+    return int(math.ceil(len(text) / 4.0))
+
+
+def ensure_limit(sql, max_rows=MAX_RESULT_ROWS):
+    # One extra row tells us whether the result was cut off.
+    sql = sql.strip().rstrip(';').strip()
+    if not re.match(r'^\s*(select|with)\b', sql, re.IGNORECASE) or _TRAILING_LIMIT.search(sql):
+        return sql
+    return f"{sql}\nLIMIT {int(max_rows) + 1}"
+
+
+def fetch_bounded(conn, sql, params=None, max_rows=MAX_RESULT_ROWS):
+    cursor = conn.execute(sql, params or ())
+    try:
+        columns = [d[0] for d in cursor.description] if cursor.description else []
+        rows = []
+        while len(rows) < max_rows:
+            batch = cursor.fetchmany(min(FETCH_BATCH_SIZE, max_rows - len(rows)))
+            if not batch:
+                break
+            rows.extend(batch)
+        truncated = len(rows) >= max_rows and cursor.fetchone() is not None
+    finally:
+        cursor.close()
+    return pd.DataFrame.from_records(rows, columns=columns), truncated
+
+
+def _short(value):
+    text = str(value)
+    return text if len(text) <= MAX_CELL_CHARS else text[:MAX_CELL_CHARS - 3] + '...'
+
+
+def column_digest(series, top_k=TOP_K):
+    non_null = series.dropna()
+    digest = {
+        'column': series.name,
+        'non_null': int(non_null.shape[0]),
+        'distinct': int(non_null.astype(str).nunique()),
+    }
+    numeric = pd.to_numeric(non_null, errors='coerce').dropna()
+    if len(non_null) and len(numeric) == len(non_null):
+        digest['min'] = numeric.min().item()
+        digest['max'] = numeric.max().item()
+        digest['mean'] = round(float(numeric.mean()), 2)
+    elif len(non_null):
+        as_text = non_null.astype(str)
+        digest['min'] = _short(as_text.min())
+        digest['max'] = _short(as_text.max())
+    if digest['distinct'] < len(non_null):
+        counts = non_null.astype(str).value_counts().head(top_k)
+        digest['top'] = [(_short(value), int(count)) for value, count in counts.items()]
+    return digest
+
+
+def result_digest(df, truncated=False):
+    return {
+        'rows': int(len(df)),
+        'truncated': truncated,
+        'columns': [column_digest(df[column]) for column in df.columns],
+    }
+
+
+def _format_digest(digest):
+    more = '+' if digest['truncated'] else ''
+    lines = [f"Rows returned: {digest['rows']}{more}"]
+    for col in digest['columns']:
+        parts = [f"{col['non_null']} non-null", f"{col['distinct']} distinct"]
+        if 'min' in col:
+            parts.append(f"min={col['min']}, max={col['max']}")
+        if 'mean' in col:
+            parts.append(f"mean={col['mean']}")
+        if col.get('top'):
+            parts.append('top: ' + ', '.join(f"{value} ({count})" for value, count in col['top']))
+        lines.append(f"- {col['column']}: " + '; '.join(parts))
+    return '\n'.join(lines)
+
+
+def sample_rows(df, token_budget):
+    if df.empty or token_budget <= 0:
+        return '', 0
+    header = ' | '.join(str(c) for c in df.columns)
+    lines = [header]
+    used = estimate_tokens(header)
+    for row in df.itertuples(index=False):
+        line = ' | '.join('' if pd.isna(v) else _short(v) for v in row)
+        cost = estimate_tokens(line)
+        if used + cost > token_budget:
+            break
+        lines.append(line)
+        used += cost
+    return '\n'.join(lines), len(lines) - 1
+
+
+def describe_result(df, truncated=False, token_budget=SUMMARY_TOKEN_BUDGET):
+    # The summary prompt gets a per-column digest of the whole (bounded) result plus as
+    # many sample rows as fit in the remaining token budget, instead of the full table.
+    digest_text = _format_digest(result_digest(df, truncated))
+    remaining = token_budget - estimate_tokens(digest_text)
+    sample, shown = sample_rows(df, remaining)
+    if not sample:
+        return digest_text
+    note = f"Sample rows ({shown} of {len(df)}{'+' if truncated else ''}):"
+    return f"{digest_text}\n\n{note}\n{sample}"
+
+
+def page_rows(df, page=1, page_size=50):
+    # page/page_size usually come straight from the query string; non-integers raise ValueError.
+    page = max(1, int(page))
+    page_size = max(1, min(int(page_size), 500))
+    start = (page - 1) * page_size
+    chunk = df.iloc[start:start + page_size]
+    return {
+        'page': page,
+        'page_size': page_size,
+        'total_rows': int(len(df)),
+        'pages': int(math.ceil(len(df) / page_size)) if len(df) else 0,
+        'columns': list(df.columns),
+        'rows': chunk.astype(object).where(chunk.notna(), None).to_dict(orient='records'),
+    }
@@ -0,0 +1,219 @@
+import argparse
+import re
+import sqlite3
+import time
+
+from db_pool import DB_PATH
+
+# Denormalized joins and per-event / per-industry aggregates, kept in the same database so
+# generated SQL can read a rollup instead of recomputing the event -> company -> people join.
+# Every table carries event_url, which is the unit of incremental refresh.
+ROLLUP_TABLES = {
+    'event_companies': """
+        CREATE TABLE IF NOT EXISTS event_companies (
+            event_url TEXT, event_name TEXT, event_start_date TEXT, event_country TEXT,
+            homepage_base_url TEXT, company_name TEXT, relation_to_event TEXT,
+            employee_range_lower INTEGER, employee_range_upper INTEGER, revenue_millions REAL,
+            company_similar_terms TEXT, event_similar_terms TEXT
+        )""",
+    'event_company_people': """
+        CREATE TABLE IF NOT EXISTS event_company_people (
+            event_url TEXT, event_name TEXT, homepage_base_url TEXT, company_name TEXT,
+            first_name TEXT, last_name TEXT, job_title TEXT, email TEXT, person_country TEXT
+        )""",
+    'company_industries': """
+        CREATE TABLE IF NOT EXISTS company_industries (
+            event_url TEXT, homepage_base_url TEXT, industry TEXT, score REAL
+        )""",
+    'event_stats': """
+        CREATE TABLE IF NOT EXISTS event_stats (
+            event_url TEXT PRIMARY KEY, event_name TEXT, event_start_date TEXT, event_country TEXT,
+            company_count INTEGER, people_count INTEGER, headcount_lower_sum INTEGER,
+            headcount_upper_sum INTEGER, revenue_millions_sum REAL
+        )""",
+    'event_industry_stats': """
+        CREATE TABLE IF NOT EXISTS event_industry_stats (
+            event_url TEXT, event_name TEXT, industry TEXT, company_count INTEGER,
+            headcount_upper_sum INTEGER, revenue_millions_sum REAL
+        )""",
+    'event_title_stats': """
+        CREATE TABLE IF NOT EXISTS event_title_stats (
+            event_url TEXT, event_name TEXT, job_title TEXT, people_count INTEGER
+        )""",
+    'industry_stats': """
+        CREATE TABLE IF NOT EXISTS industry_stats (
+            industry TEXT PRIMARY KEY, company_count INTEGER, event_count INTEGER,
+            headcount_lower_sum INTEGER, headcount_upper_sum INTEGER, revenue_millions_sum REAL
+        )""",
+}
+
+ROLLUP_INDEXES = [
+    "CREATE INDEX IF NOT EXISTS idx_event_companies_event_url ON event_companies (event_url)",
+    "CREATE INDEX IF NOT EXISTS idx_event_companies_homepage ON event_companies (homepage_base_url)",
+    "CREATE INDEX IF NOT EXISTS idx_event_company_people_event_url ON event_company_people (event_url)",
+    "CREATE INDEX IF NOT EXISTS idx_event_company_people_title ON event_company_people (job_title)",
+    "CREATE INDEX IF NOT EXISTS idx_company_industries_event_url ON company_industries (event_url)",
+    "CREATE INDEX IF NOT EXISTS idx_company_industries_industry ON company_industries (industry)",
+    "CREATE INDEX IF NOT EXISTS idx_event_industry_stats_industry ON event_industry_stats (industry, company_count)",
+    "CREATE INDEX IF NOT EXISTS idx_event_industry_stats_event_url ON event_industry_stats (event_url)",
+    "CREATE INDEX IF NOT EXISTS idx_event_title_stats_event_url ON event_title_stats (event_url)",
+    "CREATE INDEX IF NOT EXISTS idx_event_title_stats_title ON event_title_stats (job_title)",
+]
+
+# Per-event refresh statements; each reads only the events in temp.rollup_events.
+# Revenue sums are rounded so an incremental refresh matches a full one exactly
+# (floating-point addition order differs between the two).
+_EVENT_REFRESH = {
+    'event_companies': """
+        INSERT INTO event_companies
+        SELECT e.event_url, e.event_name, e.event_start_date, e.event_country,
+               c.homepage_base_url, c.company_name, c.relation_to_event,
+               c.employee_range_lower, c.employee_range_upper, c.revenue_millions,
+               c.similar_terms, e.similar_terms
+        FROM event_info e JOIN companies c ON c.event_url = e.event_url
+        WHERE e.event_url IN (SELECT event_url FROM temp.rollup_events)""",
+    'event_company_people': """
+        INSERT INTO event_company_people
+        SELECT ec.event_url, ec.event_name, ec.homepage_base_url, ec.company_name,
+               p.first_name, p.last_name, p.job_title, p.email, p.person_country
+        FROM event_companies ec JOIN people p ON p.homepage_base_url = ec.homepage_base_url
+        WHERE ec.event_url IN (SELECT event_url FROM temp.rollup_events)""",
+    'event_stats': """
+        INSERT INTO event_stats
+        SELECT e.event_url, e.event_name, e.event_start_date, e.event_country,
+               (SELECT COUNT(DISTINCT ec.homepage_base_url) FROM event_companies ec WHERE ec.event_url = e.event_url),
+               (SELECT COUNT(*) FROM event_company_people ecp WHERE ecp.event_url = e.event_url),
+               (SELECT SUM(ec.employee_range_lower) FROM event_companies ec WHERE ec.event_url = e.event_url),
+               (SELECT SUM(ec.employee_range_upper) FROM event_companies ec WHERE ec.event_url = e.event_url),
+               (SELECT ROUND(SUM(ec.revenue_millions), 4) FROM event_companies ec WHERE ec.event_url = e.event_url)
+        FROM event_info e
+        WHERE e.event_url IN (SELECT event_url FROM temp.rollup_events)""",
+    'event_industry_stats': """
+        INSERT INTO event_industry_stats
+        SELECT ec.event_url, ec.event_name, ci.industry, COUNT(DISTINCT ec.homepage_base_url),
+               SUM(ec.employee_range_upper), ROUND(SUM(ec.revenue_millions), 4)
+        FROM company_industries ci
+        JOIN event_companies ec ON ec.event_url = ci.event_url AND ec.homepage_base_url = ci.homepage_base_url
+        WHERE ci.event_url IN (SELECT event_url FROM temp.rollup_events)
+        GROUP BY ec.event_url, ci.industry""",
+    'event_title_stats': """
+        INSERT INTO event_title_stats
+        SELECT event_url, event_name, job_title, COUNT(*)
+        FROM event_company_people
+        WHERE event_url IN (SELECT event_url FROM temp.rollup_events) AND job_title IS NOT NULL
+        GROUP BY event_url, job_title""",
+}
+
+_INDUSTRY_REFRESH = """
+    INSERT INTO industry_stats
+    SELECT ci.industry, COUNT(*),
+           (SELECT COUNT(DISTINCT x.event_url) FROM company_industries x WHERE x.industry = ci.industry),
+           SUM(c.employee_range_lower), SUM(c.employee_range_upper), ROUND(SUM(c.revenue_millions), 4)
+    FROM (SELECT DISTINCT industry, homepage_base_url FROM company_industries
+          WHERE industry IN (SELECT industry FROM temp.rollup_industries)) ci
+    LEFT JOIN (SELECT homepage_base_url, MAX(employee_range_lower) AS employee_range_lower,
+                      MAX(employee_range_upper) AS employee_range_upper, MAX(revenue_millions) AS revenue_millions
+               FROM companies GROUP BY homepage_base_url) c ON c.homepage_base_url = ci.homepage_base_url
+    GROUP BY ci.industry"""
+
+_TERM = re.compile(r"\s*([^|]+?)\s*\((\d+(?:\.\d+)?)\)\s*(?:\||$)")
+
+
+def parse_industries(similar_terms):
+    # 'Finance (0.50)|Financial Services (0.46)' -> [('Finance', 0.5), ('Financial Services', 0.46)]
+    if not similar_terms:
+        return []
+    terms = [(term, float(score)) for term, score in _TERM.findall(similar_terms)]
+    if not terms:
+        terms = [(term.strip(), None) for term in similar_terms.split('|') if term.strip()]
+    return terms
+
+
+def create_rollups(conn):
+    for statement in ROLLUP_TABLES.values():
+        conn.execute(statement)
+    for statement in ROLLUP_INDEXES:
+        conn.execute(statement)
+
+
+def available_rollups(conn):
+    names = {row[0] for row in conn.execute("SELECT name FROM sqlite_master WHERE type = 'table'")}
+    return [table for table in ROLLUP_TABLES if table in names]
+
+
+def refresh_rollups(conn, event_urls=None):
+    # Recomputes every rollup row for the given events (all events when None). Industry
+    # totals span events, so only the industries those events' companies touch (before
+    # and after the refresh) are recomputed.
+    start = time.perf_counter()
+    create_rollups(conn)
+    conn.execute("CREATE TEMP TABLE IF NOT EXISTS rollup_events (event_url TEXT PRIMARY KEY)")
+    conn.execute("CREATE TEMP TABLE IF NOT EXISTS rollup_industries (industry TEXT PRIMARY KEY)")
+    conn.execute("DELETE FROM temp.rollup_events")
+    conn.execute("DELETE FROM temp.rollup_industries")
+    full = event_urls is None
+    if full:
+        conn.execute("INSERT INTO temp.rollup_events SELECT event_url FROM event_info "
+                     "UNION SELECT event_url FROM companies WHERE event_url IS NOT NULL")
+    else:
+        conn.executemany("INSERT OR IGNORE INTO temp.rollup_events VALUES (?)",
+                         [(url,) for url in event_urls if url is not None])
+    affected = conn.execute("SELECT COUNT(*) FROM temp.rollup_events").fetchone()[0]
+
+    conn.execute("INSERT OR IGNORE INTO temp.rollup_industries SELECT DISTINCT industry FROM company_industries "
+                 "WHERE event_url IN (SELECT event_url FROM temp.rollup_events)")
+    for table in ['company_industries'] + list(_EVENT_REFRESH):
+        conn.execute(f"DELETE FROM {table} WHERE event_url IN (SELECT event_url FROM temp.rollup_events)")
+
+    rows = conn.execute("SELECT event_url, homepage_base_url, similar_terms FROM companies "
+                        "WHERE event_url IN (SELECT event_url FROM temp.rollup_events)").fetchall()
+    conn.executemany("INSERT INTO company_industries VALUES (?, ?, ?, ?)",
+                     [(event_url, homepage, term, score)
+                      for event_url, homepage, terms in rows for term, score in parse_industries(terms)])
+    conn.execute("INSERT OR IGNORE INTO temp.rollup_industries SELECT DISTINCT industry FROM company_industries "
+                 "WHERE event_url IN (SELECT event_url FROM temp.rollup_events)")
+    for statement in _EVENT_REFRESH.values():
+        conn.execute(statement)
+
+    if full:
+        conn.execute("DELETE FROM industry_stats")
+    else:
+        conn.execute("DELETE FROM industry_stats WHERE industry IN (SELECT industry FROM temp.rollup_industries)")
+    conn.execute(_INDUSTRY_REFRESH)
+    industries = conn.execute("SELECT COUNT(*) FROM temp.rollup_industries").fetchone()[0]
+    return {'events': affected, 'industries': industries, 'seconds': time.perf_counter() - start}
+
+
+def refresh_tagged_rows(conn, table, key_columns, updates):
+    # similar_terms feeds company_industries and the industry stats, so a tag write done in
+    # place (utilities/embedding_gen.py, utilities/incremental_tagging.py) must refresh the
+    # events those rows belong to. `updates` are write_tags_to_db rows: [tags, *key values].
+    # Databases without rollups are left without them.
+    if not updates or not available_rollups(conn):
+        return None
+    where = ' AND '.join(f"{column} = ?" for column in key_columns)
+    event_urls = set()
+    for update in updates:
+        event_urls.update(row[0] for row in conn.execute(f"SELECT event_url FROM {table} WHERE {where}", update[1:]))
+    return refresh_rollups(conn, event_urls)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Rebuild the precomputed event/company/people rollup tables.")
+    parser.add_argument('--db', type=str, default=DB_PATH, help='Path to the SQLite database.')
+    parser.add_argument('--events', type=str, nargs='*', help='Only refresh these event_urls.')
+    args = parser.parse_args()
+
+    conn = sqlite3.connect(args.db)
+    try:
+        with conn:
+            stats = refresh_rollups(conn, args.events or None)
+        conn.execute("ANALYZE")
+    finally:
+        conn.close()
+    print(f"Refreshed rollups for {stats['events']} events and {stats['industries']} industries "
+          f"in {stats['seconds']:.2f}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,40 @@
+import re
+
+SQL_KEYWORDS = {
+    'where', 'on', 'join', 'inner', 'left', 'right', 'outer', 'cross', 'natural', 'group',
+    'order', 'limit', 'union', 'intersect', 'except', 'having', 'using', 'select', 'as', 'full',
+}
+
+_KEYWORD_ALTERNATION = '|'.join(sorted(SQL_KEYWORDS))
+# One table reference: a name, then an optional alias that is not itself a keyword, so the
+# JOIN of "FROM companies JOIN event_info" is not taken as the alias of companies.
+_TABLE_NAME = re.compile(r'\s*([A-Za-z_]\w*)(?:\s+(?:as\s+)?(?!(?:%s)\b)([A-Za-z_]\w*))?' % _KEYWORD_ALTERNATION,
+                         re.IGNORECASE)
+_REF_START = re.compile(r'\b(?:from|join)\b', re.IGNORECASE)
+_COMMA = re.compile(r'\s*,')
+
+
+def table_aliases(sql):
+    # Maps every name a table can be referred to by (its own name and any alias) to the
+    # real table name, for the flat FROM/JOIN lists (comma joins included) the SQL
+    # generator produces.
+    aliases = {}
+    for start in _REF_START.finditer(sql):
+        position = start.end()
+        while True:
+            match = _TABLE_NAME.match(sql, position)
+            if match is None or match.group(1).lower() in SQL_KEYWORDS:
+                break
+            table, alias = match.group(1), match.group(2)
+            aliases[table.lower()] = table
+            if alias:
+                aliases[alias.lower()] = table
+            comma = _COMMA.match(sql, match.end())
+            if comma is None:
+                break
+            position = comma.end()
+    return aliases
+
+
+def referenced_tables(sql):
+    return sorted(set(table_aliases(sql).values()))
@@ -0,0 +1,196 @@
+import logging
+import re
+import sqlite3
+
+from sql_utils import table_aliases
+
+logger = logging.getLogger(__name__)
+
+MAX_LOCAL_REPAIRS = 5
+
+_FENCE = re.compile(r"```(?:sql|sqlite)?\s*(.*?)```", re.IGNORECASE | re.DOTALL)
+# The statement starts at SELECT/WITH at the beginning of a line (or right after a colon,
+# "Here is the query: SELECT ..."), never at a "with" inside the lead-in prose.
+_STATEMENT_START = re.compile(r"(?:^|(?<=:))[ \t]*(select|with)\b", re.IGNORECASE | re.MULTILINE)
+_AMBIGUOUS = re.compile(r"ambiguous column name: (?:(\w+)\.)?(\w+)", re.IGNORECASE)
+_ALIAS_BEFORE = re.compile(r"\bas\s*$", re.IGNORECASE)
+_NO_SUCH_COLUMN = re.compile(r"no such column: (?:(\w+)\.)?(\w+)", re.IGNORECASE)
+_STRING_LITERAL = re.compile(r"('(?:[^']|'')*')")
+
+
+def strip_code_fences(sql):
+    fenced = _FENCE.search(sql)
+    if fenced:
+        sql = fenced.group(1)
+    sql = sql.replace('`', '')
+    # Drop any lead-in prose ("Here is the query:") before the statement.
+    start = _STATEMENT_START.search(sql)
+    if start:
+        sql = sql[start.start(1):]
+    return first_statement(sql).strip()
+
+
+def first_statement(sql):
+    # Only the first statement is ever executed. A ';' inside a string literal or comment
+    # does not end it, which sqlite3.complete_statement knows.
+    end = sql.find(';')
+    while end != -1:
+        if sqlite3.complete_statement(sql[:end + 1]):
+            return sql[:end]
+        end = sql.find(';', end + 1)
+    return sql
+
+
+def check_sql(conn, sql):
+    # Compiles the statement against the live schema without fetching any rows.
+    try:
+        conn.execute(f"EXPLAIN QUERY PLAN {sql}").fetchall()
+        return None
+    except sqlite3.Error as e:
+        return str(e)
+
+
+def _top_level_split(sql, keyword):
+    # Splits on a keyword that is outside parentheses and string literals.
+    parts, depth, quote, last = [], 0, None, 0
+    pattern = re.compile(rf"\b{keyword}\b", re.IGNORECASE)
+    i = 0
+    while i < len(sql):
+        ch = sql[i]
+        if quote:
+            if ch == quote:
+                quote = None
+        elif ch in ("'", '"'):
+            quote = ch
+        elif ch == '(':
+            depth += 1
+        elif ch == ')':
+            depth -= 1
+        elif depth == 0:
+            match = pattern.match(sql, i)
+            if match and (i == 0 or not (sql[i - 1].isalnum() or sql[i - 1] == '_')):
+                parts.append(sql[last:i])
+                last = i = match.end()
+                continue
+        i += 1
+    parts.append(sql[last:])
+    return parts
+
+
+def _split_trailing_clauses(sql):
+    # ORDER BY / LIMIT after the last operand of a compound apply to the whole compound.
+    for keyword in ('order by', 'limit'):
+        parts = _top_level_split(sql, keyword.replace(' ', r'\s+'))
+        if len(parts) > 1:
+            head = parts[0]
+            return head, sql[len(head):]
+    return sql, ''
+
+
+def rewrite_intersect(conn, sql):
+    # A INTERSECT B -> SELECT DISTINCT * FROM (A) WHERE (cols) IN (B), which needs no
+    # compound-select support and lets SQLite use indexes on B.
+    parts = _top_level_split(sql, 'intersect')
+    if len(parts) < 2:
+        return sql
+    last, trailing = _split_trailing_clauses(parts[-1])
+    parts[-1] = last
+    current = parts[0].strip()
+    for other in parts[1:]:
+        other = other.strip()
+        try:
+            cursor = conn.execute(f"SELECT * FROM ({current}) LIMIT 0")
+            columns = [d[0] for d in cursor.description]
+            cursor.close()
+        except sqlite3.Error:
+            return sql
+        cols = ', '.join(f'"{c}"' for c in columns)
+        target = cols if len(columns) == 1 else f"({cols})"
+        current = f"SELECT DISTINCT * FROM ({current}) WHERE {target} IN ({other})"
+    return f"{current} {trailing.strip()}".strip()
+
+
+def table_columns(conn, table):
+    return {row[1].lower() for row in conn.execute(f"PRAGMA table_info({table})").fetchall()}
+
+
+def _sub_outside_literals(pattern, repl, sql):
+    # re.sub that leaves single-quoted string literals ('%event_url%') untouched.
+    parts = _STRING_LITERAL.split(sql)
+    for i in range(0, len(parts), 2):
+        text = parts[i]
+        parts[i] = re.sub(pattern, lambda match: repl(match, text), text, flags=re.IGNORECASE)
+    return ''.join(parts)
+
+
+def qualify_column(conn, sql, column, qualifier=None):
+    # Resolves an ambiguous or misattributed column to the one referenced table that has
+    # it. When several do, picking one would silently answer a different question, so the
+    # query is left for the LLM repair.
+    aliases = table_aliases(sql)
+    refs = []
+    for name, table in aliases.items():
+        if name == table.lower() and any(a != name and t == table for a, t in aliases.items()):
+            continue  # prefer the alias the query actually uses
+        refs.append((name, table))
+    owners = [(name, table) for name, table in refs if column.lower() in table_columns(conn, table)]
+    if len(owners) != 1:
+        return sql
+    name = owners[0][0]
+    col = re.escape(column)
+    if qualifier:
+        return _sub_outside_literals(rf"\b{re.escape(qualifier)}\.{col}\b", lambda match, _: f"{name}.{column}", sql)
+
+    def qualify(match, text):
+        # leave output aliases ("AS event_url") alone
+        if _ALIAS_BEFORE.search(text, 0, match.start()):
+            return match.group(0)
+        return f"{name}.{column}"
+
+    return _sub_outside_literals(rf"(?<![\w.\"]){col}\b(?!\s*\()", qualify, sql)
+
+
+def repair_locally(conn, sql, error):
+    ambiguous = _AMBIGUOUS.search(error)
+    if ambiguous:
+        fixed = qualify_column(conn, sql, ambiguous.group(2))
+        if fixed != sql:
+            return fixed, 'qualified ambiguous column ' + ambiguous.group(2)
+    missing = _NO_SUCH_COLUMN.search(error)
+    if missing and missing.group(1):
+        # e.g. companies.event_name when event_info is also in the query (rule 9)
+        fixed = qualify_column(conn, sql, missing.group(2), missing.group(1))
+        if fixed != sql:
+            return fixed, f"moved {missing.group(1)}.{missing.group(2)} to its owning table"
+    return sql, None
+
+
+def validate_sql(conn, sql):
+    # Returns (sql, error, repairs); error is None when the statement compiles.
+    repairs = []
+    cleaned = strip_code_fences(sql)
+    if cleaned != sql.strip():
+        repairs.append('stripped code fences/prose')
+    sql = cleaned
+
+    rewritten = rewrite_intersect(conn, sql)
+    if rewritten != sql:
+        repairs.append('rewrote INTERSECT as IN subquery')
+        sql = rewritten
+
+    error = check_sql(conn, sql)
+    for _ in range(MAX_LOCAL_REPAIRS):
+        if error is None:
+            break
+        fixed, repair = repair_locally(conn, sql, error)
+        if repair is None or fixed == sql:
+            break
+        repairs.append(repair)
+        sql = fixed
+        error = check_sql(conn, sql)
+
+    if repairs:
+        logger.info("Repaired generated SQL locally: %s", '; '.join(repairs))
+    if error:
+        logger.warning("Generated SQL failed validation: %s", error)
+    return sql, error, repairs
@@ -0,0 +1,137 @@
+import argparse
+import logging
+import re
+import sqlite3
+
+from db_pool import DB_PATH
+from sql_utils import table_aliases
+
+logger = logging.getLogger(__name__)
+
+# Tables whose similar_terms column ("Term (0.50)|Other Term (0.43)" as written by
+# utilities/embedding_gen.py) is searched by the generated SQL.
+TAGGED_TABLES = ['event_info', 'companies']
+FTS_SUFFIX = '_terms_fts'
+
+# LOWER(alias.similar_terms) LIKE '%kw%'  or  alias.similar_terms LIKE '%kw%'
+_LIKE_TERM = re.compile(
+    r"(?:LOWER\s*\(\s*(?:(?P<q1>\w+)\s*\.\s*)?similar_terms\s*\)"
+    r"|(?<![\w.])(?:(?P<q2>\w+)\s*\.\s*)?similar_terms)"
+    r"\s+LIKE\s+'%(?P<kw>[^'%_]+)%'",
+    re.IGNORECASE,
+)
+
+
+def fts_table(table):
+    return f"{table}{FTS_SUFFIX}"
+
+
+def build_tag_index(db_path=DB_PATH, tables=TAGGED_TABLES):
+    # A trigram FTS5 index answers LIKE '%kw%' from the index with the same
+    # case-insensitive substring semantics as the original scan, so rewritten queries
+    # return exactly the rows the LLM asked for. External content keeps the tags in one
+    # place; triggers keep the index in step with writes to similar_terms.
+    conn = sqlite3.connect(db_path)
+    built = []
+    try:
+        existing = {row[0] for row in conn.execute("SELECT name FROM sqlite_master WHERE type = 'table'")}
+        for table in tables:
+            if table not in existing:
+                continue
+            fts = fts_table(table)
+            conn.execute(
+                f"CREATE VIRTUAL TABLE IF NOT EXISTS {fts} USING fts5("
+                f"similar_terms, content='{table}', content_rowid='rowid', tokenize='trigram')"
+            )
+            conn.executescript(f"""
+                CREATE TRIGGER IF NOT EXISTS {fts}_ai AFTER INSERT ON {table} BEGIN
+                    INSERT INTO {fts}(rowid, similar_terms) VALUES (new.rowid, new.similar_terms);
+                END;
+                CREATE TRIGGER IF NOT EXISTS {fts}_ad AFTER DELETE ON {table} BEGIN
+                    INSERT INTO {fts}({fts}, rowid, similar_terms) VALUES ('delete', old.rowid, old.similar_terms);
+                END;
+                CREATE TRIGGER IF NOT EXISTS {fts}_au AFTER UPDATE OF similar_terms ON {table} BEGIN
+                    INSERT INTO {fts}({fts}, rowid, similar_terms) VALUES ('delete', old.rowid, old.similar_terms);
+                    INSERT INTO {fts}(rowid, similar_terms) VALUES (new.rowid, new.similar_terms);
+                END;
+            """)
+            # rowids of tables without an INTEGER PRIMARY KEY can change on VACUUM, so
+            # always rebuild rather than trusting an existing index.
+            conn.execute(f"INSERT INTO {fts}({fts}) VALUES ('rebuild')")
+            built.append(fts)
+        conn.commit()
+    finally:
+        conn.close()
+    return built
+
+
+def available_tag_indexes(conn):
+    names = {row[0] for row in conn.execute("SELECT name FROM sqlite_master WHERE type = 'table'")}
+    return {table for table in TAGGED_TABLES if fts_table(table) in names}
+
+
+def rewrite_like_chains(sql, indexed_tables):
+    if not indexed_tables or 'similar_terms' not in sql.lower():
+        return sql
+    aliases = table_aliases(sql)
+    tagged = sorted({t for t in aliases.values() if t in indexed_tables})
+
+    def replace(match):
+        qualifier = match.group('q1') or match.group('q2')
+        keyword = match.group('kw')
+        if len(keyword.strip()) < 3:
+            # trigram indexes cannot serve patterns shorter than three characters
+            return match.group(0)
+        if qualifier:
+            table = aliases.get(qualifier.lower())
+            ref = qualifier
+        elif len(tagged) == 1 and len(set(aliases.values())) == 1:
+            table = tagged[0]
+            ref = table
+        else:
+            logger.warning("Tag search left as a full scan: unqualified similar_terms with tables %s: %s",
+                           sorted(set(aliases.values())), match.group(0))
+            return match.group(0)
+        if table not in indexed_tables:
+            if table is None:
+                logger.warning("Tag search left as a full scan: %r is not a table in the query: %s",
+                               qualifier, match.group(0))
+            return match.group(0)
+        escaped = keyword.replace("'", "''")
+        return f"{ref}.rowid IN (SELECT rowid FROM {fts_table(table)} WHERE similar_terms LIKE '%{escaped}%')"
+
+    return _LIKE_TERM.sub(replace, sql)
+
+
+def tag_condition(ref, table, indexed_tables):
+    # Parameterized form of the rewrite above for SQL built in code: bind '%keyword%' to the
+    # placeholder. Falls back to the plain LIKE when the table has no trigram index.
+    if table in indexed_tables:
+        return f"{ref}.rowid IN (SELECT rowid FROM {fts_table(table)} WHERE similar_terms LIKE ?)"
+    return f"LOWER({ref}.similar_terms) LIKE ?"
+
+
+def rewrite_for_connection(conn, sql):
+    return rewrite_like_chains(sql, available_tag_indexes(conn))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Build trigram FTS5 indexes over the similar_terms columns.")
+    parser.add_argument('--db', type=str, default=DB_PATH, help='Path to the SQLite database.')
+    parser.add_argument('--rewrite', type=str, help='Print the indexed rewrite of a SQL query instead of building.')
+    args = parser.parse_args()
+
+    if args.rewrite:
+        conn = sqlite3.connect(args.db)
+        try:
+            print(rewrite_for_connection(conn, args.rewrite))
+        finally:
+            conn.close()
+        return
+
+    built = build_tag_index(args.db)
+    print(f"Built tag indexes on {args.db}: {', '.join(built)}")
+
+
+if __name__ == "__main__":
+    main()
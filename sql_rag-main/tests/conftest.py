@@ -0,0 +1,57 @@
+import os
+import sqlite3
+import sys
+
+import pytest
+
+# Tests import the modules the same way the scripts do, from sql_rag-main itself.
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+EVENTS = [
+    ('Fintech Summit Asia', '2025-03-10', '2025-03-12', 'Marina Bay Sands', 'Singapore',
+     'https://fintech.example/', 'Fintech (0.62)|Finance (0.51)'),
+    ('Healthcare Expo', '2024-10-02', '2024-10-04', 'Expo Hall', 'Japan',
+     'https://health.example/', 'Healthcare (0.70)|Medical Devices (0.48)'),
+]
+COMPANIES = [
+    ('Acme Pay', 'sponsor', 'https://fintech.example/', 'acmepay.com', 'Fintech (0.55)|Payments (0.50)', 1001, 5000, 120.0),
+    ('Ledgerly', 'exhibitor', 'https://fintech.example/', 'ledgerly.io', 'Software (0.58)|Fintech (0.47)', 51, 200, 8.5),
+    ('MediCore', 'partner', 'https://health.example/', 'medicore.jp', 'Healthcare (0.64)', 5001, 10000, 900.0),
+]
+PEOPLE = [
+    ('Ada', 'Lim', 'CTO', 'ada@acmepay.com', 'Singapore', 'acmepay.com'),
+    ('Ben', 'Tan', 'Sales Manager', 'ben@acmepay.com', 'Singapore', 'acmepay.com'),
+    ('Chie', 'Sato', 'Director of Sales', 'chie@medicore.jp', 'Japan', 'medicore.jp'),
+]
+
+
+def create_fixture_db(path):
+    conn = sqlite3.connect(path)
+    conn.executescript("""
+        CREATE TABLE event_info (event_name TEXT, event_start_date TEXT, event_end_date TEXT, event_venue TEXT,
+                                 event_country TEXT, event_url TEXT, similar_terms TEXT);
+        CREATE TABLE companies (company_name TEXT, relation_to_event TEXT, event_url TEXT, homepage_base_url TEXT,
+                                similar_terms TEXT, employee_range_lower REAL, employee_range_upper REAL,
+                                revenue_millions REAL);
+        CREATE TABLE people (first_name TEXT, last_name TEXT, job_title TEXT, email TEXT, person_country TEXT,
+                             homepage_base_url TEXT);
+    """)
+    conn.executemany("INSERT INTO event_info VALUES (?, ?, ?, ?, ?, ?, ?)", EVENTS)
+    conn.executemany("INSERT INTO companies VALUES (?, ?, ?, ?, ?, ?, ?, ?)", COMPANIES)
+    conn.executemany("INSERT INTO people VALUES (?, ?, ?, ?, ?, ?)", PEOPLE)
+    conn.commit()
+    return conn
+
+
+@pytest.fixture
+def db_path(tmp_path):
+    path = str(tmp_path / 'events.db')
+    create_fixture_db(path).close()
+    return path
+
+
+@pytest.fixture
+def conn(db_path):
+    connection = sqlite3.connect(db_path)
+    yield connection
+    connection.close()
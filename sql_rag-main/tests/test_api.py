@@ -0,0 +1,105 @@
+import threading
+
+import pandas as pd
+import pytest
+
+pytest.importorskip('flask')
+import python_apisetup
+
+
+@pytest.fixture
+def api(monkeypatch):
+    monkeypatch.setattr(python_apisetup, 'jobs', python_apisetup.JobStore())
+    return python_apisetup
+
+
+def fake_stream(release):
+    def process_stream(query):
+        yield {'event': 'sql', 'data': 'SELECT 1'}
+        release.wait(5)
+        yield {'event': 'done', 'data': {'summary': 'ok', 'cached': False},
+               'answer': {'summary': 'ok', 'sql': 'SELECT 1', 'rows': None, 'truncated': False}}
+    return process_stream
+
+
+def wait_for(predicate, timeout=5.0):
+    event = threading.Event()
+    for _ in range(int(timeout / 0.01)):
+        if predicate():
+            return True
+        event.wait(0.01)
+    return False
+
+
+def test_stream_finishes_job(api, monkeypatch):
+    release = threading.Event()
+    release.set()
+    monkeypatch.setattr(api, 'process_stream', fake_stream(release))
+    body = api.app.test_client().get('/api/stream?query=q').get_data(as_text=True)
+    assert 'event: sql' in body and 'event: done' in body
+    assert api.jobs.in_flight() == 0
+    assert api.jobs.latest()['response'] == 'ok'
+
+
+def test_abandoned_stream_does_not_leak_a_running_job(api, monkeypatch):
+    release = threading.Event()
+    monkeypatch.setattr(api, 'process_stream', fake_stream(release))
+    response = api.app.test_client().get('/api/stream?query=q', buffered=False)
+    chunks = response.response
+    assert 'event: job' in next(chunks).decode()
+    assert 'event: sql' in next(chunks).decode()
+    response.close()  # client disconnects mid-stream
+    release.set()
+    assert wait_for(lambda: api.jobs.in_flight() == 0)
+
+
+def test_disconnect_closes_the_llm_stream(api, monkeypatch):
+    import database_api
+    from response_cache import ResponseCache
+    release, closed = threading.Event(), threading.Event()
+
+    class Summary:
+        # like a provider stream: only stops when closed, not when garbage collected
+        tokens = iter(['One', ' event.'])
+
+        def __iter__(self):
+            return self
+
+        def __next__(self):
+            token = next(self.tokens)
+            if token != 'One':
+                release.wait(5)
+            return token
+
+        def close(self):
+            closed.set()
+
+    monkeypatch.setattr(database_api, 'get_response_cache', lambda: ResponseCache(semantic=False))
+    monkeypatch.setattr(database_api, 'plan_query', lambda query: ('SELECT 1', None, None))
+    monkeypatch.setattr(database_api, 'query_db_bounded', lambda sql, params: (pd.DataFrame({'a': [1]}), False))
+    monkeypatch.setattr(database_api, 'stream_query_summary', lambda sql_query, result, truncated=False: Summary())
+    monkeypatch.setattr(api, 'process_stream', database_api.process_stream)
+    response = api.app.test_client().get('/api/stream?query=q', buffered=False)
+    chunks = response.response
+    while 'event: token' not in next(chunks).decode():
+        pass
+    response.close()  # client disconnects mid-summary
+    release.set()
+    assert wait_for(closed.is_set)
+    assert wait_for(lambda: api.jobs.in_flight() == 0)
+
+
+def test_stream_respects_pending_limit(api, monkeypatch):
+    monkeypatch.setattr(api, 'MAX_PENDING_JOBS', 1)
+    api.jobs.create('already running')
+    response = api.app.test_client().get('/api/stream?query=q')
+    assert response.status_code == 429
+
+
+def test_rows_rejects_bad_paging(api):
+    job_id = api.jobs.create('q')
+    api.jobs.finish(job_id, response='ok', rows=pd.DataFrame({'a': [1, 2, 3]}))
+    client = api.app.test_client()
+    assert client.get(f'/api/result/{job_id}/rows?page=abc').status_code == 400
+    page = client.get(f'/api/result/{job_id}/rows?page=1&page_size=0').get_json()
+    assert page['page_size'] == 1 and len(page['rows']) == 1
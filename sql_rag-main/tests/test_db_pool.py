@@ -0,0 +1,104 @@
+import os
+import sqlite3
+import threading
+
+import pytest
+
+from db_pool import ConnectionPool, PoolTimeoutError, QueryTimeoutError
+
+SLOW_QUERY = ("WITH RECURSIVE n(i) AS (SELECT 1 UNION ALL SELECT i + 1 FROM n) "
+              "SELECT count(*) FROM n")
+
+
+@pytest.fixture
+def pool(db_path):
+    pool = ConnectionPool(db_path, size=2, acquire_timeout=0.05, query_timeout_ms=200)
+    yield pool
+    pool.close()
+
+
+def test_connections_are_reused(pool):
+    for _ in range(3):
+        with pool.connection() as conn:
+            assert conn.execute("SELECT count(*) FROM event_info").fetchone() == (2,)
+    metrics = pool.metrics()
+    assert metrics['connections_created'] == 1
+    assert metrics['acquisitions'] == 3
+    assert metrics['active_connections'] == 0 and metrics['idle_connections'] == 1
+
+
+def test_connections_are_read_only(pool):
+    with pytest.raises(sqlite3.OperationalError):
+        with pool.connection() as conn:
+            conn.execute("DELETE FROM event_info")
+
+
+def test_exhausted_pool_times_out(pool):
+    held = threading.Event()
+    release = threading.Event()
+
+    def hold():
+        with pool.connection():
+            held.set()
+            release.wait(5)
+
+    threads = [threading.Thread(target=hold) for _ in range(pool.size)]
+    for thread in threads:
+        held.clear()
+        thread.start()
+        held.wait(5)
+    try:
+        with pytest.raises(PoolTimeoutError):
+            with pool.connection():
+                pass
+    finally:
+        release.set()
+        for thread in threads:
+            thread.join()
+    assert pool.metrics()['connections_created'] == pool.size
+
+
+def test_long_query_is_aborted(pool):
+    with pytest.raises(QueryTimeoutError):
+        with pool.connection(timeout_ms=50) as conn:
+            conn.execute(SLOW_QUERY).fetchone()
+    assert pool.metrics()['query_timeouts'] == 1
+    # the connection goes back to the pool without its progress handler
+    with pool.connection(timeout_ms=0) as conn:
+        assert conn.execute("SELECT 1").fetchone() == (1,)
+
+
+def test_statement_repeat_rate(pool):
+    with pool.connection() as conn:
+        for sql in ('SELECT 1', 'SELECT 1', 'SELECT 2'):
+            pool.record_statement(conn, sql)
+    metrics = pool.metrics()
+    assert (metrics['statement_repeats'], metrics['statement_first_runs']) == (1, 2)
+    assert metrics['statement_repeat_rate'] == round(1 / 3, 4)
+
+
+def test_replaced_database_file_is_reopened(pool, db_path):
+    with pool.connection() as conn:
+        assert conn.execute("SELECT count(*) FROM event_info").fetchone() == (2,)
+    # what load_database.rebuild_database does: build a scratch file and swap it in
+    scratch = f"{db_path}.loading"
+    rebuilt = sqlite3.connect(scratch)
+    rebuilt.execute("CREATE TABLE event_stats (event_url TEXT)")
+    rebuilt.commit()
+    rebuilt.close()
+    os.replace(scratch, db_path)
+
+    with pool.connection() as conn:
+        tables = {row[0] for row in conn.execute("SELECT name FROM sqlite_master WHERE type = 'table'")}
+    assert tables == {'event_stats'}
+    metrics = pool.metrics()
+    assert metrics['reopens'] == 1 and metrics['connections_created'] == 1
+
+
+def test_connection_in_use_during_reset_is_retired_on_release(pool):
+    with pool.connection() as held:
+        pool.reset()
+    with pool.connection() as conn:
+        assert conn is not held
+        assert conn.execute("SELECT 1").fetchone() == (1,)
+    assert pool.metrics()['connections_created'] == 1
@@ -0,0 +1,62 @@
+import os
+import sys
+
+import numpy as np
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'utilities'))
+from embedding_gen import find_similar_terms, normalize_rows, row_text, tag_rows, top_terms  # noqa: E402
+
+TERMS = [f"Term {i}" for i in range(40)]
+
+
+class StubEncoder:
+    # Deterministic stand-in for a SentenceTransformer: a fixed random vector per text.
+    def __init__(self, dim=16):
+        self.dim = dim
+
+    def vector(self, text):
+        seed = sum(text.encode('utf-8')) * 7919 + len(text)
+        return np.random.default_rng(seed).standard_normal(self.dim).astype(np.float32)
+
+    def encode(self, texts, batch_size=None):
+        if isinstance(texts, str):
+            return self.vector(texts)
+        return np.stack([self.vector(t) for t in texts])
+
+
+@pytest.fixture
+def term_embeddings():
+    return np.random.default_rng(0).standard_normal((len(TERMS), 16)).astype(np.float32)
+
+
+ROWS = [{'event_name': f"Event {i}", 'event_description': f"Conference number {i} on topic {i * 3}"} for i in range(25)]
+
+
+@pytest.mark.parametrize('relative_threshold, top_n', [(0.8, 5), (0.5, 3), (0.0, 10)])
+def test_batched_tagging_matches_the_per_row_loop(term_embeddings, relative_threshold, top_n):
+    model = StubEncoder()
+    expected = []
+    for row in ROWS:
+        # the original loop: one encode and a full argsort per row
+        similar = find_similar_terms(model.encode(' '.join(row.values())), term_embeddings, TERMS,
+                                     relative_threshold, top_n)
+        expected.append([(term, float(score)) for term, score in similar])
+
+    tagged = list(tag_rows(ROWS, model, normalize_rows(term_embeddings), TERMS, relative_threshold, top_n,
+                           batch_size=8))
+    assert [row for row, _ in tagged] == ROWS
+    for (_, similar), want in zip(tagged, expected):
+        assert [term for term, _ in similar] == [term for term, _ in want]
+        assert [score for _, score in similar] == pytest.approx([score for _, score in want], abs=1e-5)
+
+
+def test_top_terms_caps_top_n_at_the_term_count():
+    similarities = np.array([[0.1, 0.9, 0.5]], dtype=np.float32)
+    assert top_terms(similarities, ['a', 'b', 'c'], relative_threshold=0.0, top_n=10) == [
+        [('b', pytest.approx(0.9)), ('c', pytest.approx(0.5)), ('a', pytest.approx(0.1))]]
+
+
+def test_row_text_leaves_out_existing_tags():
+    row = {'event_name': 'Fintech Summit Asia', 'similar_terms': 'Fintech (0.62)'}
+    assert row_text(row) == row_text({'event_name': 'Fintech Summit Asia'}) == 'Fintech Summit Asia'
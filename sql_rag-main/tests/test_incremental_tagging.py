@@ -0,0 +1,98 @@
+import csv
+import hashlib
+import os
+import sys
+
+import numpy as np
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'utilities'))
+from incremental_tagging import open_store, refresh  # noqa: E402
+
+TERMS = ['Fintech', 'Finance', 'Healthcare', 'Software']
+
+
+class HashEncoder:
+    # Deterministic stand-in for a SentenceTransformer: same text, same vector.
+    def __init__(self):
+        self.encoded = 0
+
+    def encode(self, texts, batch_size=None):
+        self.encoded += len(texts)
+        return np.stack([np.frombuffer(hashlib.sha256(t.encode()).digest()[:16], dtype=np.uint8).astype(np.float32)
+                         for t in texts])
+
+
+@pytest.fixture
+def tagging(tmp_path):
+    csv_path = tmp_path / 'companies.csv'
+    with open(csv_path, 'w', newline='', encoding='utf-8') as f:
+        writer = csv.writer(f)
+        writer.writerow(['company_name', 'homepage_base_url', 'event_url'])
+        writer.writerow(['Acme Pay', 'acmepay.com', 'https://fintech.example/'])
+        writer.writerow(['MediCore', 'medicore.jp', 'https://health.example/'])
+    embeddings = HashEncoder().encode(TERMS)
+    store = open_store(str(tmp_path / 'state.db'))
+    yield csv_path, store, embeddings
+    store.close()
+
+
+def run(tagging, model, **settings):
+    csv_path, store, embeddings = tagging
+    return refresh(str(csv_path), store, model, embeddings, TERMS, ['homepage_base_url', 'event_url'], **settings)
+
+
+def test_unchanged_settings_touch_nothing(tagging):
+    model = HashEncoder()
+    updates, stats = run(tagging, model)
+    assert len(updates) == 2 and stats['settings_changed'] == []
+    updates, stats = run(tagging, model)
+    assert updates == [] and stats['encoded'] == 0 and stats['rescored'] == 0
+
+
+@pytest.mark.parametrize('settings, changed', [
+    ({'top_n': 2}, ['top_n']),
+    ({'relative_threshold': 0.5}, ['relative_threshold']),
+    ({'delimiter': ';'}, ['delimiter']),
+])
+def test_changed_setting_retags_every_row(tagging, settings, changed):
+    model = HashEncoder()
+    run(tagging, model)
+    updates, stats = run(tagging, model, **settings)
+    assert stats['settings_changed'] == changed
+    assert len(updates) == 2 and stats['rescored'] == 2 and stats['encoded'] == 0
+
+
+def test_changed_model_reencodes_every_row(tagging):
+    run(tagging, HashEncoder())
+    model = HashEncoder()
+    updates, stats = run(tagging, model, model_name='paraphrase-MiniLM-L3-v2')
+    assert stats['settings_changed'] == ['model']
+    assert model.encoded == 2 and len(updates) == 2
+
+
+def test_added_term_is_scored_without_reencoding(tagging):
+    csv_path, store, embeddings = tagging
+    model = HashEncoder()
+    run(tagging, model)
+    terms = TERMS + ['Payments']
+    extended = np.vstack([embeddings, HashEncoder().encode(['Payments'])])
+    updates, stats = refresh(str(csv_path), store, model, extended, terms, ['homepage_base_url', 'event_url'])
+    assert (stats['terms_added'], stats['terms_removed']) == (1, 0)
+    assert stats['encoded'] == 0 and stats['rescored'] == 2
+    # merging only the new term's scores gives the same tags as scoring every term
+    fresh = open_store(':memory:')
+    expected, _ = refresh(str(csv_path), fresh, HashEncoder(), extended, terms, ['homepage_base_url', 'event_url'])
+    tags = dict(store.execute("SELECT row_key, similar_terms FROM row_state").fetchall())
+    assert sorted(tags.values()) == sorted(update[0] for update in expected)
+
+
+def test_removed_term_rescores_every_row(tagging):
+    csv_path, store, embeddings = tagging
+    model = HashEncoder()
+    run(tagging, model)
+    updates, stats = refresh(str(csv_path), store, model, embeddings[1:], TERMS[1:], ['homepage_base_url', 'event_url'])
+    assert (stats['terms_added'], stats['terms_removed']) == (0, 1)
+    assert stats['encoded'] == 0 and stats['rescored'] == 2
+    tags = [row[0] for row in store.execute("SELECT similar_terms FROM row_state")]
+    assert not any('Fintech (' in tag for tag in tags)
@@ -0,0 +1,36 @@
+import sqlite3
+
+from index_advisor import INDEXES, build_indexes, check_query_plan, explain_query_plan, full_scans, suggest_indexes
+from sql_utils import table_aliases
+
+JOINED = ("SELECT c.company_name FROM event_info e JOIN companies c ON e.event_url = c.event_url "
+          "WHERE c.revenue_millions > 100 AND e.event_country = 'Singapore'")
+
+
+def test_full_scans_on_joined_query(conn):
+    scans = full_scans(explain_query_plan(conn, JOINED), table_aliases(JOINED))
+    # the join key has no index yet, so SQLite builds an automatic one for companies
+    assert {table for table, _ in scans} == {'event_info', 'companies'}
+    suggestions = suggest_indexes(conn, JOINED)
+    assert 'CREATE INDEX idx_companies_event_url ON companies (event_url)' in suggestions
+    assert 'CREATE INDEX idx_companies_revenue_millions ON companies (revenue_millions)' in suggestions
+
+
+def test_full_scans_ignores_index_lookups():
+    aliases = {'e': 'event_info', 'event_info_terms_fts': 'event_info_terms_fts'}
+    plan = ['SEARCH e USING INDEX idx_event_info_event_url (event_url=?)',
+            'SCAN event_info_terms_fts VIRTUAL TABLE INDEX 0:M1']
+    assert full_scans(plan, aliases) == []
+
+
+def test_indexed_columns_are_not_suggested(db_path):
+    assert build_indexes(db_path) == list(INDEXES)
+    conn = sqlite3.connect(db_path)
+    try:
+        assert suggest_indexes(conn, JOINED) == ['CREATE INDEX idx_event_info_event_country ON event_info (event_country)']
+    finally:
+        conn.close()
+
+
+def test_check_query_plan_tolerates_invalid_sql(conn):
+    assert check_query_plan(conn, 'SELECT nope FROM missing_table') == ([], [])
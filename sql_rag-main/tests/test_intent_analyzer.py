@@ -0,0 +1,126 @@
+import os
+
+import pytest
+
+import intent_analyzer
+from intent_analyzer import _QueryMemo, analyze_queries, analyze_query, clear_cache, lemma_category
+
+CORPUS = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'query_corpus.txt')
+
+EVENT_INDICATORS = ['event', 'conference', 'seminar', 'workshop', 'meetup', 'exhibition', 'trade show', 'symposium']
+COMPANY_INDICATORS = ['company', 'business', 'corporation', 'firm', 'enterprise', 'organization', 'industry']
+
+
+def baseline_context(doc):
+    # The analyze_query that lived in database_api.py before intent_analyzer.py, minus its prints.
+    def related_noun(token):
+        for ancestor in token.ancestors:
+            if any(i in ancestor.lemma_.lower() for i in EVENT_INDICATORS):
+                return 'event'
+            if any(i in ancestor.lemma_.lower() for i in COMPANY_INDICATORS):
+                return 'company'
+        for child in token.subtree:
+            if child.dep_ in ['nsubj', 'dobj', 'pobj']:
+                if any(i in child.lemma_.lower() for i in EVENT_INDICATORS):
+                    return 'event'
+                if any(i in child.lemma_.lower() for i in COMPANY_INDICATORS):
+                    return 'company'
+        return 'unknown'
+
+    def qualifiers(token):
+        return [c.text for c in token.subtree if c.dep_ in ['amod', 'pobj'] and c.pos_ in ['ADJ', 'NOUN']]
+
+    event_context = company_context = False
+    for token in doc:
+        modifiers = [c for c in token.children if c.pos_ in ['ADJ'] or c.dep_ in ['compound', 'amod']]
+        if token.lemma_.lower() in EVENT_INDICATORS and modifiers:
+            event_context = True
+        if token.lemma_.lower() in COMPANY_INDICATORS and modifiers:
+            company_context = True
+    if not event_context or not company_context:
+        for token in doc:
+            if token.pos_ == 'VERB':
+                noun = related_noun(token)
+                if qualifiers(token):
+                    if noun == 'event' and not event_context:
+                        event_context = True
+                    elif noun == 'company' and not company_context:
+                        company_context = True
+    if event_context and company_context:
+        return 'both'
+    return 'event' if event_context else 'company' if company_context else 'unknown'
+
+
+def load_corpus():
+    with open(CORPUS, encoding='utf-8') as f:
+        return [line.strip() for line in f if line.strip()]
+
+
+def test_lemma_category_is_cached():
+    lemma_category.cache_clear()
+    assert lemma_category('conference') == 'event'
+    assert lemma_category('eventbrite') == 'event'
+    assert lemma_category('fintechcompany') == 'company'
+    assert lemma_category('people') is None
+    lemma_category('conference')
+    info = lemma_category.cache_info()
+    assert (info.hits, info.misses) == (1, 4)
+
+
+def test_query_memo_is_a_bounded_lru():
+    memo = _QueryMemo(2)
+    memo.put('a', 'event')
+    memo.put('b', 'company')
+    assert memo.get('a') == 'event'  # 'a' is now the most recent
+    memo.put('c', 'both')
+    assert memo.get('b') is None
+    assert (memo.get('a'), memo.get('c')) == ('event', 'both')
+    assert (memo.hits, memo.misses) == (3, 1)
+
+
+@pytest.fixture
+def nlp():
+    pytest.importorskip('en_core_web_sm')
+    clear_cache()
+    yield intent_analyzer.get_nlp()
+    clear_cache()
+
+
+def test_contexts_match_the_baseline_analyzer(nlp):
+    import spacy
+    full = spacy.load(intent_analyzer.SPACY_MODEL)
+    queries = load_corpus()
+    expected = [baseline_context(full(query)) for query in queries]
+    assert [analyze_query(query) for query in queries] == expected
+    clear_cache()
+    assert analyze_queries(queries) == expected
+
+
+def test_repeat_calls_hit_the_memo(nlp, monkeypatch):
+    query = load_corpus()[0]
+    context = analyze_query(query)
+    hits = intent_analyzer._memo.hits
+
+    def no_parse(*args, **kwargs):
+        raise AssertionError("memoized query was parsed again")
+
+    monkeypatch.setattr(intent_analyzer, 'get_nlp', no_parse)
+    assert analyze_query(f"  {query} ") == context
+    assert analyze_queries([query, query]) == [context, context]
+    assert intent_analyzer._memo.hits == hits + 2
+
+
+def test_analyze_queries_pipes_only_uncached_queries(nlp, monkeypatch):
+    queries = load_corpus()[:4]
+    analyze_query(queries[0])
+    piped = []
+    original = nlp.pipe
+
+    def pipe(texts, **kwargs):
+        texts = list(texts)
+        piped.extend(texts)
+        return original(texts, **kwargs)
+
+    monkeypatch.setattr(nlp, 'pipe', pipe)
+    analyze_queries(queries + [queries[1]])
+    assert piped == queries[1:]
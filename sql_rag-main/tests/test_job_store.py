@@ -0,0 +1,64 @@
+from job_store import DONE, FAILED, RUNNING, JobStore
+
+
+def test_lifecycle():
+    store = JobStore()
+    job_id = store.create('events in japan')
+    store.start(job_id)
+    assert store.get(job_id)['status'] == RUNNING
+    assert store.in_flight() == 1
+    store.finish(job_id, response='two events')
+    job = store.get(job_id)
+    assert job['status'] == DONE and job['response'] == 'two events'
+    assert store.latest()['id'] == job_id
+    assert store.in_flight() == 0
+
+
+def test_failed_job_is_not_latest():
+    store = JobStore()
+    job_id = store.create('q')
+    store.finish(job_id, error='boom')
+    assert store.get(job_id)['status'] == FAILED
+    assert store.latest() is None
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_abandoned_running_job_expires():
+    clock = FakeClock()
+    store = JobStore(ttl=600, clock=clock)
+    job_id = store.create('q')
+    store.start(job_id)
+    clock.now += 600
+    assert store.in_flight() == 1
+    clock.now += 0.001
+    assert store.in_flight() == 0
+    assert store.get(job_id) is None
+
+
+def test_finished_job_is_kept_for_ttl_after_finishing():
+    clock = FakeClock()
+    store = JobStore(ttl=600, clock=clock)
+    job_id = store.create('q')
+    clock.now += 500
+    store.finish(job_id, response='ok')
+    clock.now += 550  # past ttl since submission, not since finishing
+    assert store.get(job_id)['response'] == 'ok'
+    clock.now += 51
+    assert store.get(job_id) is None
+
+
+def test_capacity_drops_finished_jobs_first():
+    store = JobStore(max_jobs=2)
+    done = store.create('a')
+    store.finish(done, response='x')
+    running = store.create('b')
+    store.create('c')
+    assert store.get(done) is None
+    assert store.get(running) is not None
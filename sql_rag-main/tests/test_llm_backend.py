@@ -0,0 +1,51 @@
+import json
+
+from types import SimpleNamespace
+
+from llm_backend import DEFAULT_SQL, GroqBackend, RecordingBackend, ReplayBackend, load_recordings
+
+MESSAGES = [{'role': 'user', 'content': 'List events in Japan'}]
+
+
+def test_replay_answers_from_recordings_and_counts_misses():
+    backend = ReplayBackend({'events in japan': {'sql': 'SELECT 1', 'summary': 'One event.'}})
+    response = backend.complete('sql', 'Events in Japan?', MESSAGES)
+    assert response.choices[0].message.content == 'SELECT 1'
+    assert ''.join(backend.stream('summary', 'events in japan', MESSAGES)).strip() == 'One event.'
+    assert backend.complete('sql', 'something unrecorded', MESSAGES).choices[0].message.content == DEFAULT_SQL
+    assert (backend.calls, backend.misses) == (3, 1)
+
+
+def test_recording_round_trip(tmp_path):
+    path = str(tmp_path / 'recordings.jsonl')
+    recorder = RecordingBackend(ReplayBackend(default_sql='SELECT 2'), path)
+    recorder.complete('sql', 'Events in Japan', MESSAGES)
+    with open(path, 'a', encoding='utf-8') as f:
+        f.write(json.dumps({'query': 'events in japan', 'sql': 'SELECT 3'}) + '\n')
+    # later lines win
+    assert load_recordings(path) == {'events in japan': {'sql': 'SELECT 3'}}
+    replay = ReplayBackend(path=path)
+    assert replay.complete('sql', 'Events in Japan', MESSAGES).choices[0].message.content == 'SELECT 3'
+
+
+class FakeChunks:
+    def __init__(self, tokens):
+        self.tokens, self.closed = tokens, False
+
+    def __iter__(self):
+        for token in self.tokens:
+            yield SimpleNamespace(choices=[SimpleNamespace(delta=SimpleNamespace(content=token))])
+
+    def close(self):
+        self.closed = True
+
+
+def test_closing_a_groq_stream_closes_the_http_stream():
+    chunks = FakeChunks(['One', ' event.'])
+    backend = GroqBackend(api_key='unused')
+    backend._client = SimpleNamespace(chat=SimpleNamespace(completions=SimpleNamespace(
+        create=lambda messages, **options: chunks)))
+    stream = RecordingBackend(backend, None).stream('summary', 'events in japan', MESSAGES)
+    assert next(stream) == 'One'
+    stream.close()
+    assert chunks.closed
@@ -0,0 +1,47 @@
+import sqlite3
+from collections import Counter
+
+import pandas as pd
+
+from load_database import SCHEMAS, create_table, load_table, transform
+
+COMPANY_COLUMNS = ['company_name', 'relation_to_event', 'event_url', 'company_revenue', 'company_founding_year',
+                   'homepage_base_url', 'employee_range_lower', 'employee_range_upper', 'revenue_millions']
+
+
+def write_companies(path, rows):
+    pd.DataFrame(rows, columns=COMPANY_COLUMNS).to_csv(path, index=False)
+
+
+def test_check_failures_null_the_field_and_keep_the_row(tmp_path):
+    csv_path = tmp_path / SCHEMAS['companies']['csv']
+    write_companies(csv_path, [
+        ['Acme Pay', 'sponsor', 'https://fintech.example/', '', '2010', 'acmepay.com', '1001', '5000', '-5'],
+        ['Ledgerly', 'exhibitor', 'https://fintech.example/', '$8.5 million', '2018', 'ledgerly.io', '5000', '3', ''],
+        ['Ledgerly', 'exhibitor', 'https://fintech.example/', '$9 million', '2018', 'ledgerly.io', '51', '200', ''],
+        ['Nowhere', 'partner', '', '$1 million', '2001', 'nowhere.com', '1', '10', ''],
+    ])
+    conn = sqlite3.connect(':memory:')
+    create_table(conn, 'companies')
+    read, skipped, issues = load_table(conn, 'companies', csv_path)
+
+    assert (read, skipped) == (4, 2)
+    rows = dict(conn.execute("SELECT company_name, revenue_millions FROM companies").fetchall())
+    assert rows == {'Acme Pay': None, 'Ledgerly': 8.5}
+    assert conn.execute("SELECT employee_range_lower, employee_range_upper FROM companies "
+                        "WHERE company_name = 'Ledgerly'").fetchone() == (None, None)
+    assert issues['negative revenue_millions (nulled)'] == 1
+    assert issues['employee_range_lower > employee_range_upper (nulled)'] == 1
+    assert issues['missing event_url (dropped)'] == 1
+    assert issues['duplicate key (dropped)'] == 1
+
+
+def test_end_date_before_start_is_nulled():
+    chunk = pd.DataFrame({'event_name': ['Fintech Summit Asia'], 'event_url': ['https://fintech.example/'],
+                          'event_start_date': ['2025-03-10'], 'event_end_date': ['2025-03-01']})
+    issues = Counter()
+    [row] = transform('event_info', chunk, issues)
+    columns = [name for name, _ in SCHEMAS['event_info']['columns']]
+    assert row[columns.index('event_start_date')] == '2025-03-10'
+    assert row[columns.index('event_end_date')] is None
+    assert issues['event_end_date before event_start_date (nulled)'] == 1
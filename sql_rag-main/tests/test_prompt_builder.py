@@ -0,0 +1,85 @@
+from prompt_builder import (COMPANY_SCHEMA, EVENT_SCHEMA, INSTRUCTIONS, JOIN_COMPANY_PEOPLE, JOIN_EVENT_COMPANY,
+                            PEOPLE_SCHEMA, ROLLUP_DESCRIPTIONS, SCHEMA_HEADER, SIMILAR_TERMS_RULES, SQL_SYSTEM_PROMPT,
+                            build_repair_prompt, build_sql_prompt, referenced_tables, relevant_rollups)
+from result_shaping import estimate_tokens
+
+ALL_TABLES = ['event_info', 'companies', 'people']
+
+
+def user_prompt(build):
+    return build['messages'][1]['content']
+
+
+def test_referenced_tables():
+    assert referenced_tables("fintech events in Singapore", 'event') == ['event_info']
+    assert referenced_tables("fintech companies with more than 1000 employees", 'company') == ['companies']
+    # people only reach events through companies
+    assert referenced_tables("email of the CTO at each fintech event", 'event') == ALL_TABLES
+    assert referenced_tables("anything at all", 'unknown') == ALL_TABLES
+    assert referenced_tables("list them", 'none') == ALL_TABLES
+
+
+def test_relevant_rollups():
+    rollups = list(ROLLUP_DESCRIPTIONS)
+    assert relevant_rollups("fintech events", ['event_info'], rollups) == []
+    assert relevant_rollups("how many fintech events", ['event_info'], rollups) == rollups
+    assert relevant_rollups("companies at fintech events", ['event_info', 'companies'], ['event_stats']) == ['event_stats']
+    assert relevant_rollups("how many fintech events", ['event_info'], ()) == []
+
+
+def test_irrelevant_schema_sections_are_dropped():
+    build = build_sql_prompt("fintech events in Singapore", 'event')
+    prompt = user_prompt(build)
+    assert build['tables'] == ['event_info']
+    assert EVENT_SCHEMA in prompt
+    assert COMPANY_SCHEMA not in prompt and PEOPLE_SCHEMA not in prompt and JOIN_EVENT_COMPANY not in prompt
+    assert 'rollups' not in build['sections']
+    assert build['sections'] == ['instructions', 'similar_terms', 'schema', 'event_info', 'context', 'query']
+
+    build = build_sql_prompt("emails of people working at fintech companies", 'company')
+    assert build['tables'] == ['companies', 'people']
+    assert JOIN_COMPANY_PEOPLE in user_prompt(build) and EVENT_SCHEMA not in user_prompt(build)
+
+
+def test_rollups_are_described_for_aggregates_only_when_present():
+    build = build_sql_prompt("how many companies attend fintech events", 'both', rollup_tables=['event_stats'])
+    assert 'rollups' in build['sections']
+    assert ROLLUP_DESCRIPTIONS['event_stats'] in user_prompt(build)
+    assert ROLLUP_DESCRIPTIONS['industry_stats'] not in user_prompt(build)
+
+
+def test_stable_prefix_is_identical_across_questions():
+    prefix = '\n'.join([INSTRUCTIONS, SIMILAR_TERMS_RULES, SCHEMA_HEADER + "\n"])
+    builds = [build_sql_prompt("fintech events in Singapore", 'event'),
+              build_sql_prompt("companies with revenue above 100 million", 'company'),
+              build_sql_prompt("how many people attend healthcare expos", 'unknown', rollup_tables=['event_stats'])]
+    for build in builds:
+        assert build['messages'][0]['content'] == SQL_SYSTEM_PROMPT
+        assert user_prompt(build).startswith(prefix)
+        assert build['sections'][:3] == ['instructions', 'similar_terms', 'schema']
+        # the query itself always comes last
+        assert user_prompt(build).endswith("\n\nSQL query:")
+    assert len({build['stable_prefix_tokens'] for build in builds}) == 1
+    assert builds[0]['stable_prefix_tokens'] == estimate_tokens(SQL_SYSTEM_PROMPT + prefix)
+
+
+def test_prompt_tokens_estimate_counts_system_and_user_text():
+    build = build_sql_prompt("fintech events in Singapore", 'event')
+    assert build['prompt_tokens'] == estimate_tokens(SQL_SYSTEM_PROMPT + user_prompt(build))
+    full = build_sql_prompt("fintech events in Singapore", 'unknown')
+    assert full['prompt_tokens'] > build['prompt_tokens']
+
+
+def test_repair_prompt_carries_the_error_and_only_the_tables_involved():
+    messages = build_repair_prompt("fintech companies", "SELECT nope FROM companies", "no such column: nope",
+                                   ['companies'])
+    content = messages[1]['content']
+    assert "SELECT nope FROM companies" in content and "SQLite error: no such column: nope" in content
+    assert COMPANY_SCHEMA in content and EVENT_SCHEMA not in content and PEOPLE_SCHEMA not in content
+    assert content.endswith("Corrected SQL query:")
+
+    # unknown tables fall back to the full schema; rollup-only queries describe just the rollup
+    assert all(schema in build_repair_prompt("q", "SELECT 1", "err", [])[1]['content']
+               for schema in (EVENT_SCHEMA, COMPANY_SCHEMA, PEOPLE_SCHEMA))
+    content = build_repair_prompt("q", "SELECT x FROM event_stats", "err", ['event_stats'])[1]['content']
+    assert ROLLUP_DESCRIPTIONS['event_stats'] in content and EVENT_SCHEMA not in content
@@ -0,0 +1,63 @@
+import pandas as pd
+import pytest
+
+from query_templates import (_Vocabulary, match_company_shape, match_event_shape, match_people_shape, normalize,
+                             parse_number, template_summary)
+
+
+@pytest.fixture
+def vocab(conn):
+    vocabulary = _Vocabulary(':memory:', None)
+    vocabulary.industries = ['fintech', 'healthcare', 'software', 'oil & gas']
+    vocabulary.countries = {'singapore', 'japan'}
+    vocabulary.event_names = [row[0].lower() for row in conn.execute("SELECT event_name FROM event_info")]
+    return vocabulary
+
+
+def run(conn, match):
+    return conn.execute(match['sql'], match['params']).fetchall()
+
+
+def test_normalize_and_numbers():
+    assert normalize("How many events are there?") == ("events", True)
+    assert parse_number('1k') == 1000 and parse_number('10,000') == 10000
+
+
+def test_company_shape(conn, vocab):
+    match = match_company_shape('fintech companies with more than 500 employees', vocab)
+    assert [row[0] for row in run(conn, match)] == ['Acme Pay']
+    assert match_company_shape('bakery companies with more than 500 employees', vocab) is None
+
+
+def test_event_shape(conn, vocab):
+    match = match_event_shape('healthcare events in japan in october 2024', vocab)
+    assert [row[0] for row in run(conn, match)] == ['Healthcare Expo']
+    assert match_event_shape('events in atlantis', vocab) is None
+
+
+@pytest.mark.parametrize('text, people', [
+    ('people at companies attending fintech summit asia', {'Ada', 'Ben'}),
+    ('people at companies sponsoring fintech summit asia', {'Ada', 'Ben'}),
+    ('people at exhibitors at fintech summit asia', set()),
+    ('ctos at companies sponsoring fintech summit asia', {'Ada'}),
+])
+def test_people_shape_filters_on_relation(conn, vocab, text, people):
+    match = match_people_shape(text, vocab)
+    assert {row[0] for row in run(conn, match)} == people
+
+
+def test_people_shape_describes_relation(vocab):
+    assert 'sponsoring' in match_people_shape('people at companies sponsoring fintech summit asia', vocab)['description']
+    assert match_people_shape('people at sponsors exhibiting at fintech summit asia', vocab) is None
+
+
+def test_template_summary_pluralization(vocab):
+    match = match_company_shape('fintech companies with more than 500 employees', vocab)
+    match['count'] = False
+    one = pd.DataFrame({'company_name': ['Acme Pay']})
+    assert template_summary(match, one).startswith("Found 1 company in fintech")
+    two = pd.DataFrame({'company_name': ['Acme Pay', 'Ledgerly']})
+    assert template_summary(match, two).startswith("Found 2 companies")
+    match['count'] = True
+    assert template_summary(match, pd.DataFrame({'count': [1]})).startswith("There is 1 company")
+    assert template_summary(match, pd.DataFrame({'count': [3]})).startswith("There are 3 companies")
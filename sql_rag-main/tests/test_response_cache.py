@@ -0,0 +1,72 @@
+import os
+
+import numpy as np
+
+from response_cache import ResponseCache, normalize_query, query_signature
+
+
+class ConstantEncoder:
+    # Every question embeds to the same vector, so only the signature check separates them.
+    def encode(self, text):
+        return np.ones(4, dtype=np.float32)
+
+
+def make_cache(db_path, **kwargs):
+    return ResponseCache(db_path=db_path, encoder=ConstantEncoder(), **kwargs)
+
+
+def test_normalize_query():
+    assert normalize_query("  Events in   Japan?? ") == "events in japan"
+
+
+def test_query_signature():
+    assert query_signature("Oil and gas companies with over 1k employees") == \
+        query_signature("oil and gas firms with more than 1,000 employees")
+    assert query_signature("Companies with more than 1000 employees") != \
+        query_signature("Companies with more than 5000 employees")
+    assert query_signature("Show me events in Singapore")[1] == {'singapore'}
+    assert query_signature('events tagged "green energy"')[1] == {'green energy'}
+
+
+def test_exact_hit(db_path):
+    cache = make_cache(db_path, semantic=False)
+    cache.put("Events in Japan", {'summary': 'two'})
+    assert cache.get("events in japan?") == {'summary': 'two'}
+    assert cache.stats()['exact_hits'] == 1
+
+
+def test_semantic_hit_needs_same_numbers_and_names(db_path):
+    cache = make_cache(db_path)
+    cache.put("Companies with more than 5000 employees", {'summary': '>5000'})
+    assert cache.get("Companies with more than 1000 employees") is None
+    assert cache.get("Which companies have more than 5,000 employees") == {'summary': '>5000'}
+    cache.put("Show me events in Singapore", {'summary': 'sg'})
+    assert cache.get("What events are held in Japan") is None
+    assert cache.get("What events are held in Singapore") == {'summary': 'sg'}
+
+
+def test_database_change_invalidates(db_path):
+    cache = make_cache(db_path, semantic=False)
+    cache.put("Events in Japan", {'summary': 'two'})
+    stat = os.stat(db_path)
+    os.utime(db_path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10 ** 9))
+    assert cache.get("Events in Japan") is None
+    assert cache.stats()['invalidations'] == 1
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_ttl_expiry(db_path):
+    clock = FakeClock()
+    cache = make_cache(db_path, semantic=False, ttl=60, clock=clock)
+    cache.put("Events in Japan", {'summary': 'two'})
+    clock.now += 60
+    assert cache.get("Events in Japan") == {'summary': 'two'}
+    clock.now += 0.001
+    assert cache.get("Events in Japan") is None
@@ -0,0 +1,41 @@
+import pandas as pd
+import pytest
+
+from result_shaping import describe_result, ensure_limit, estimate_tokens, fetch_bounded, page_rows, result_digest
+
+
+def test_ensure_limit():
+    assert ensure_limit("SELECT * FROM companies;", max_rows=10) == "SELECT * FROM companies\nLIMIT 11"
+    assert ensure_limit("SELECT * FROM companies LIMIT 5") == "SELECT * FROM companies LIMIT 5"
+    assert ensure_limit("SELECT * FROM companies LIMIT 5 OFFSET 10") == "SELECT * FROM companies LIMIT 5 OFFSET 10"
+    assert ensure_limit("SELECT * FROM companies LIMIT ?") == "SELECT * FROM companies LIMIT ?"
+    assert ensure_limit("SELECT * FROM companies LIMIT ? OFFSET ?") == "SELECT * FROM companies LIMIT ? OFFSET ?"
+    assert ensure_limit("PRAGMA table_info(companies)") == "PRAGMA table_info(companies)"
+
+
+def test_fetch_bounded(conn):
+    df, truncated = fetch_bounded(conn, "SELECT company_name FROM companies ORDER BY 1", max_rows=2)
+    assert list(df['company_name']) == ['Acme Pay', 'Ledgerly'] and truncated
+    df, truncated = fetch_bounded(conn, "SELECT company_name FROM companies WHERE employee_range_upper > ?",
+                                  (1000,), max_rows=5)
+    assert len(df) == 2 and not truncated
+
+
+def test_page_rows():
+    df = pd.DataFrame({'a': range(5), 'b': [None, 'x', 'y', 'z', 'w']})
+    page = page_rows(df, '2', '2')
+    assert page['rows'] == [{'a': 2, 'b': 'y'}, {'a': 3, 'b': 'z'}]
+    assert page['pages'] == 3 and page['total_rows'] == 5
+    assert page_rows(df, 0, 0)['page_size'] == 1
+    assert page_rows(df, 1, 10)['rows'][0]['b'] is None
+    with pytest.raises(ValueError):
+        page_rows(df, 'abc', 50)
+
+
+def test_describe_result_respects_budget():
+    df = pd.DataFrame({'company_name': [f'Company {i}' for i in range(200)], 'employees': range(200)})
+    digest = result_digest(df, truncated=True)
+    assert digest is not None
+    text = describe_result(df, truncated=True, token_budget=300)
+    assert 'company_name' in text
+    assert estimate_tokens(text) <= 400
@@ -0,0 +1,40 @@
+from rollups import ROLLUP_TABLES, available_rollups, parse_industries, refresh_rollups, refresh_tagged_rows
+
+
+def snapshot(conn):
+    return {table: sorted(conn.execute(f"SELECT * FROM {table}").fetchall(), key=repr) for table in ROLLUP_TABLES}
+
+
+def test_parse_industries():
+    assert parse_industries('Finance (0.50)|Financial Services (0.46)') == [('Finance', 0.5), ('Financial Services', 0.46)]
+    assert parse_industries('Finance|Banking') == [('Finance', None), ('Banking', None)]
+    assert parse_industries(None) == []
+
+
+def test_full_refresh(conn):
+    assert available_rollups(conn) == []
+    stats = refresh_rollups(conn)
+    assert stats['events'] == 2
+    assert available_rollups(conn) == list(ROLLUP_TABLES)
+    assert conn.execute("SELECT company_count, people_count FROM event_stats WHERE event_url = ?",
+                        ('https://fintech.example/',)).fetchone() == (2, 2)
+    assert conn.execute("SELECT company_count FROM industry_stats WHERE industry = 'Fintech'").fetchone() == (2,)
+
+
+def test_tag_write_refreshes_derived_rollups(conn):
+    refresh_rollups(conn)
+    updates = [['Payments (0.60)', 'acmepay.com', 'https://fintech.example/']]
+    conn.executemany("UPDATE companies SET similar_terms = ? WHERE homepage_base_url = ? AND event_url = ?", updates)
+    stats = refresh_tagged_rows(conn, 'companies', ['homepage_base_url', 'event_url'], updates)
+    assert stats['events'] == 1
+    assert conn.execute("SELECT company_count FROM industry_stats WHERE industry = 'Fintech'").fetchone() == (1,)
+    assert conn.execute("SELECT company_similar_terms FROM event_companies WHERE homepage_base_url = 'acmepay.com'"
+                        ).fetchone() == ('Payments (0.60)',)
+    incremental = snapshot(conn)
+    refresh_rollups(conn)
+    assert snapshot(conn) == incremental
+
+
+def test_tag_write_without_rollups_creates_none(conn):
+    assert refresh_tagged_rows(conn, 'event_info', ['event_url'], [['X (0.9)', 'https://health.example/']]) is None
+    assert available_rollups(conn) == []
@@ -0,0 +1,31 @@
+from sql_utils import referenced_tables, table_aliases
+
+
+def test_aliased_join():
+    sql = "SELECT * FROM companies c JOIN event_info AS e ON c.event_url = e.event_url"
+    assert table_aliases(sql) == {'companies': 'companies', 'c': 'companies',
+                                  'event_info': 'event_info', 'e': 'event_info'}
+
+
+def test_unaliased_join_keeps_joined_table():
+    sql = "SELECT * FROM companies JOIN event_info ON companies.event_url = event_info.event_url"
+    assert table_aliases(sql) == {'companies': 'companies', 'event_info': 'event_info'}
+
+
+def test_inner_and_left_outer_join():
+    sql = ("SELECT * FROM companies INNER JOIN event_info ON 1 = 1 "
+           "LEFT OUTER JOIN people p ON p.homepage_base_url = companies.homepage_base_url")
+    assert referenced_tables(sql) == ['companies', 'event_info', 'people']
+    assert table_aliases(sql)['p'] == 'people'
+
+
+def test_comma_join():
+    assert table_aliases("SELECT * FROM companies c, event_info e WHERE c.event_url = e.event_url") == {
+        'companies': 'companies', 'c': 'companies', 'event_info': 'event_info', 'e': 'event_info'}
+    assert referenced_tables("SELECT * FROM companies, people WHERE 1") == ['companies', 'people']
+
+
+def test_keywords_are_not_aliases():
+    assert table_aliases("SELECT * FROM companies WHERE employee_range_upper > 10 ORDER BY 1 LIMIT 5") == {
+        'companies': 'companies'}
+    assert table_aliases("SELECT * FROM (SELECT 1) x") == {}
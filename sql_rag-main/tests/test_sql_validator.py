@@ -0,0 +1,61 @@
+from sql_validator import (check_sql, first_statement, qualify_column, rewrite_intersect, strip_code_fences,
+                           validate_sql)
+
+
+def test_strip_code_fences_and_prose():
+    assert strip_code_fences("```sql\nSELECT 1;\n```") == "SELECT 1"
+    assert strip_code_fences("Here is the query: SELECT 1; SELECT 2") == "SELECT 1"
+
+
+def test_with_in_lead_in_prose_is_not_the_statement():
+    text = "Here is the query with a join:\nSELECT company_name FROM companies"
+    assert strip_code_fences(text) == "SELECT company_name FROM companies"
+    assert strip_code_fences("WITH x AS (SELECT 1) SELECT * FROM x") == "WITH x AS (SELECT 1) SELECT * FROM x"
+
+
+def test_semicolon_inside_literal_does_not_end_statement():
+    sql = "SELECT * FROM companies WHERE similar_terms LIKE '%a;b%'; DROP TABLE companies"
+    assert first_statement(sql) == "SELECT * FROM companies WHERE similar_terms LIKE '%a;b%'"
+    assert strip_code_fences(sql) == "SELECT * FROM companies WHERE similar_terms LIKE '%a;b%'"
+
+
+def test_check_sql(conn):
+    assert check_sql(conn, "SELECT company_name FROM companies") is None
+    assert 'no such column' in check_sql(conn, "SELECT nope FROM companies")
+
+
+def test_misattributed_column_is_moved_to_joined_table(conn):
+    sql = ("SELECT companies.company_name, companies.event_name FROM companies "
+           "JOIN event_info ON companies.event_url = event_info.event_url")
+    fixed, error, repairs = validate_sql(conn, sql)
+    assert error is None
+    assert 'event_info.event_name' in fixed
+    assert len(conn.execute(fixed).fetchall()) == 3
+
+
+def test_ambiguous_column_with_several_owners_is_left_for_the_llm(conn):
+    # both tables have similar_terms; guessing event_info would answer a different question
+    sql = ("SELECT similar_terms FROM event_info e JOIN companies c ON c.event_url = e.event_url "
+           "WHERE c.company_name = 'Acme Pay'")
+    fixed, error, repairs = validate_sql(conn, sql)
+    assert 'ambiguous column name: similar_terms' in error
+    assert fixed == sql and repairs == []
+
+
+def test_qualification_skips_string_literals(conn):
+    sql = "SELECT event_name FROM event_info WHERE event_venue LIKE '%event_name%'"
+    assert qualify_column(conn, sql, 'event_name') == (
+        "SELECT event_info.event_name FROM event_info WHERE event_venue LIKE '%event_name%'")
+    sql = ("SELECT companies.event_name FROM companies JOIN event_info ON companies.event_url = event_info.event_url "
+           "WHERE event_info.event_venue <> 'companies.event_name'")
+    assert qualify_column(conn, sql, 'event_name', 'companies') == (
+        "SELECT event_info.event_name FROM companies JOIN event_info ON companies.event_url = event_info.event_url "
+        "WHERE event_info.event_venue <> 'companies.event_name'")
+
+
+def test_intersect_rewrite(conn):
+    sql = ("SELECT homepage_base_url FROM companies WHERE employee_range_upper > 1000 "
+           "INTERSECT SELECT homepage_base_url FROM people")
+    rewritten = rewrite_intersect(conn, sql)
+    assert 'INTERSECT' not in rewritten
+    assert sorted(conn.execute(rewritten).fetchall()) == sorted(conn.execute(sql).fetchall())
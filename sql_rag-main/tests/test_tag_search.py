@@ -0,0 +1,50 @@
+import logging
+
+from tag_search import available_tag_indexes, build_tag_index, rewrite_for_connection, rewrite_like_chains, tag_condition
+
+INDEXED = {'event_info', 'companies'}
+
+
+def test_single_table_rewrite():
+    sql = "SELECT company_name FROM companies WHERE LOWER(similar_terms) LIKE '%fintech%'"
+    assert rewrite_like_chains(sql, INDEXED) == (
+        "SELECT company_name FROM companies WHERE companies.rowid IN "
+        "(SELECT rowid FROM companies_terms_fts WHERE similar_terms LIKE '%fintech%')")
+
+
+def test_bare_join_rewrite():
+    sql = ("SELECT companies.company_name FROM companies JOIN event_info ON companies.event_url = event_info.event_url "
+           "WHERE LOWER(event_info.similar_terms) LIKE '%fintech%'")
+    assert "event_info.rowid IN (SELECT rowid FROM event_info_terms_fts" in rewrite_like_chains(sql, INDEXED)
+
+
+def test_short_keyword_and_unindexed_table_are_left_alone():
+    sql = "SELECT * FROM companies WHERE LOWER(similar_terms) LIKE '%ai%'"
+    assert rewrite_like_chains(sql, INDEXED) == sql
+    assert rewrite_like_chains(sql, set()) == sql
+
+
+def test_unmapped_chain_is_logged(caplog):
+    sql = ("SELECT * FROM companies c JOIN event_info e ON c.event_url = e.event_url "
+           "WHERE LOWER(similar_terms) LIKE '%fintech%'")
+    with caplog.at_level(logging.WARNING, logger='tag_search'):
+        assert rewrite_like_chains(sql, INDEXED) == sql
+    assert 'full scan' in caplog.text
+
+
+def test_rewrite_returns_the_same_rows(conn, db_path):
+    assert set(build_tag_index(db_path)) == {'event_info_terms_fts', 'companies_terms_fts'}
+    assert available_tag_indexes(conn) == INDEXED
+    sql = ("SELECT companies.company_name FROM companies JOIN event_info ON companies.event_url = event_info.event_url "
+           "WHERE LOWER(companies.similar_terms) LIKE '%fintech%' ORDER BY 1")
+    rewritten = rewrite_for_connection(conn, sql)
+    assert rewritten != sql
+    assert conn.execute(rewritten).fetchall() == conn.execute(sql).fetchall() == [('Acme Pay',), ('Ledgerly',)]
+
+
+def test_tag_condition(conn, db_path):
+    build_tag_index(db_path)
+    condition = tag_condition('c', 'companies', INDEXED)
+    rows = conn.execute(f"SELECT company_name FROM companies c WHERE {condition}", ('%health%',)).fetchall()
+    assert rows == [('MediCore',)]
+    assert tag_condition('c', 'companies', set()) == "LOWER(c.similar_terms) LIKE ?"
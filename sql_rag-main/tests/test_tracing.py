@@ -0,0 +1,120 @@
+import logging
+import re
+
+import pytest
+
+import tracing
+from tracing import Counter, Histogram, annotate, render_gauges, render_prometheus, span, trace_query
+
+SAMPLE = re.compile(r'^[a-zA-Z_:][a-zA-Z0-9_:]*(\{[a-zA-Z_][a-zA-Z0-9_]*="(?:[^"\\]|\\.)*"'
+                    r'(?:,[a-zA-Z_][a-zA-Z0-9_]*="(?:[^"\\]|\\.)*")*\})? -?(?:[0-9.e+-]+|\+Inf|NaN)$')
+
+
+def assert_valid_exposition(text):
+    assert text.endswith('\n')
+    for line in text.splitlines():
+        if line.startswith('# HELP ') or line.startswith('# TYPE '):
+            continue
+        assert SAMPLE.match(line), line
+
+
+def test_histogram_buckets_sum_and_count():
+    histogram = Histogram('test_seconds', 'Test latency.', (0.1, 1.0))
+    for value in (0.05, 0.1, 0.5, 3.0):
+        histogram.observe(value, stage='sql')
+    lines = histogram.render()
+    assert lines[:2] == ['# HELP test_seconds Test latency.', '# TYPE test_seconds histogram']
+    # buckets are cumulative and le is inclusive; 3.0 only lands in +Inf
+    assert lines[2:] == [
+        'test_seconds_bucket{stage="sql",le="0.1"} 2',
+        'test_seconds_bucket{stage="sql",le="1.0"} 3',
+        'test_seconds_bucket{stage="sql",le="+Inf"} 4',
+        'test_seconds_sum{stage="sql"} 3.65',
+        'test_seconds_count{stage="sql"} 4',
+    ]
+
+
+def test_label_values_are_escaped():
+    counter = Counter('test_total', 'Test counter.')
+    counter.inc(outcome='say "hi"\n')
+    assert counter.render()[-1] == 'test_total{outcome="say \\"hi\\"\\n"} 1'
+    assert_valid_exposition('\n'.join(counter.render()) + '\n')
+
+
+def test_spans_nest_in_a_trace():
+    finished = []
+    tracing.add_trace_listener(finished.append)
+    try:
+        with trace_query('fintech events') as trace:
+            with span('sql'):
+                with span('execute'):
+                    annotate(outcome='template')
+        assert tracing.current_trace() is None
+    finally:
+        tracing.remove_trace_listener(finished.append)
+    assert finished == [trace]
+    # inner spans finish first
+    assert [stage for stage, _ in trace.spans] == ['execute', 'sql']
+    assert trace.attributes['outcome'] == 'template'
+    assert trace.elapsed >= sum(seconds for stage, seconds in trace.spans if stage == 'sql')
+
+
+def test_span_outside_a_trace_only_feeds_the_histogram():
+    with span('standalone'):
+        pass
+    assert 'sql_chatbot_stage_seconds_count{stage="standalone"}' in render_prometheus()
+
+
+def test_error_outcome_is_recorded():
+    with pytest.raises(ValueError):
+        with trace_query('bad question') as trace:
+            raise ValueError('no SQL')
+    assert trace.attributes == {'outcome': 'error', 'error': 'no SQL'}
+
+
+def test_slow_query_is_logged(monkeypatch, caplog):
+    monkeypatch.setattr(tracing, 'SLOW_QUERY_SECONDS', 0.0)
+    before = tracing.SLOW_QUERIES._values.get((), 0)
+    with caplog.at_level(logging.WARNING, logger='slow_query'):
+        with trace_query('slow question'):
+            annotate(sql='SELECT 1', plan=['SCAN event_info'])
+    assert tracing.SLOW_QUERIES._values[()] == before + 1
+    [record] = [r for r in caplog.records if r.name == 'slow_query']
+    assert "'slow question'" in record.getMessage() and 'SELECT 1' in record.getMessage()
+
+
+def test_fast_query_is_not_logged(monkeypatch, caplog):
+    monkeypatch.setattr(tracing, 'SLOW_QUERY_SECONDS', 60.0)
+    with caplog.at_level(logging.WARNING, logger='slow_query'):
+        with trace_query('fast question'):
+            pass
+    assert not [r for r in caplog.records if r.name == 'slow_query']
+
+
+def test_render_gauges_skips_non_numbers():
+    assert render_gauges('test', {'size': 4, 'ratio': 0.5, 'enabled': True, 'path': 'x'}) == (
+        '# TYPE test_size gauge\ntest_size 4\n# TYPE test_ratio gauge\ntest_ratio 0.5\n')
+
+
+def test_metrics_endpoint_serves_a_valid_exposition(db_path, monkeypatch):
+    pytest.importorskip('flask')
+    import python_apisetup
+    from db_pool import ConnectionPool
+    from response_cache import ResponseCache
+
+    pool = ConnectionPool(db_path, size=1)
+    monkeypatch.setattr(python_apisetup, 'get_pool', lambda: pool)
+    monkeypatch.setattr(python_apisetup, 'get_response_cache', lambda: ResponseCache(semantic=False, db_path=db_path))
+    with trace_query('metrics question'), span('sql'):
+        pass
+    try:
+        response = python_apisetup.app.test_client().get('/api/metrics')
+    finally:
+        pool.close()
+    assert response.status_code == 200
+    assert response.mimetype == 'text/plain'
+    body = response.get_data(as_text=True)
+    assert_valid_exposition(body)
+    assert '# TYPE sql_chatbot_stage_seconds histogram' in body
+    assert 'sql_chatbot_stage_seconds_bucket{stage="sql",le="+Inf"}' in body
+    assert 'sql_chatbot_pool_size 1' in body and 'sql_chatbot_jobs_in_flight ' in body
@@ -0,0 +1,58 @@
+import os
+import sys
+
+import numpy as np
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'utilities'))
+from vector_search import IVFIndex, build_store, open_index, store_fingerprint  # noqa: E402
+
+
+@pytest.fixture
+def store(tmp_path):
+    path = str(tmp_path / 'industries')
+    build_store(np.random.default_rng(0).standard_normal((200, 16)), path)
+    return path
+
+
+def test_flat_search_finds_the_stored_vector(store):
+    index = open_index(store)
+    query = np.asarray(index.vectors[42], dtype=np.float32)
+    assert index.search(query, k=1)[0][0][0] == 42
+
+
+def test_ivf_is_trained_once_per_store(store, monkeypatch):
+    first = open_index(store, 'ivf')
+    assert os.path.exists(f"{store}.ivf.npz")
+
+    def retrain(self, **settings):
+        raise AssertionError("IVF index was retrained")
+
+    monkeypatch.setattr(IVFIndex, 'train', retrain)
+    second = open_index(store, 'ivf')
+    np.testing.assert_array_equal(first.centroids, second.centroids)
+    query = np.asarray(first.flat.vectors[7], dtype=np.float32)
+    assert first.search(query, k=3) == second.search(query, k=3)
+
+
+def test_ivf_is_retrained_when_the_store_or_settings_change(store, monkeypatch):
+    open_index(store, 'ivf')
+    trained = []
+    original = IVFIndex.train
+    monkeypatch.setattr(IVFIndex, 'train', lambda self, **settings: trained.append(settings) or original(self, **settings))
+
+    open_index(store, 'ivf', nlist=4)
+    before = store_fingerprint(store)
+    build_store(np.random.default_rng(1).standard_normal((200, 16)), store)
+    assert store_fingerprint(store) != before
+    open_index(store, 'ivf', nlist=4)
+    assert [settings['nlist'] for settings in trained] == [4, 4]
+
+
+def test_hnsw_is_saved_and_reloaded(store):
+    pytest.importorskip('hnswlib')
+    first = open_index(store, 'hnsw')
+    assert os.path.exists(f"{store}.hnsw.bin")
+    second = open_index(store, 'hnsw')
+    query = np.asarray(first.index.get_items([3])[0], dtype=np.float32)
+    assert first.search(query, k=3) == second.search(query, k=3)
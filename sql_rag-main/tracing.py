@@ -0,0 +1,208 @@
+import bisect
+import contextvars
+import logging
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+logger = logging.getLogger(__name__)
+slow_query_logger = logging.getLogger('slow_query')
+
+SLOW_QUERY_SECONDS = float(os.environ.get("SLOW_QUERY_SECONDS", 5.0))
+
+LATENCY_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+COUNT_BUCKETS = (0, 1, 5, 10, 50, 100, 250, 500, 1000, 2500, 5000)
+
+
+def _label_key(labels):
+    return tuple(sorted(labels.items()))
+
+
+def _format_labels(key, extra=None):
+    pairs = list(key) + ([extra] if extra else [])
+    if not pairs:
+        return ''
+    escaped = (str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n') for _, value in pairs)
+    return '{' + ','.join(f'{name}="{value}"' for (name, _), value in zip(pairs, escaped)) + '}'
+
+
+class Counter:
+    def __init__(self, name, help_text):
+        self.name = name
+        self.help_text = help_text
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount=1, **labels):
+        key = _label_key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            for key, value in sorted(self._values.items()):
+                lines.append(f"{self.name}{_format_labels(key)} {value}")
+        return lines
+
+
+class Histogram:
+    def __init__(self, name, help_text, buckets):
+        self.name = name
+        self.help_text = help_text
+        self.buckets = tuple(buckets)
+        self._series = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value, **labels):
+        key = _label_key(labels)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = {'counts': [0] * len(self.buckets), 'sum': 0.0, 'count': 0}
+            index = bisect.bisect_left(self.buckets, value)
+            if index < len(self.buckets):
+                series['counts'][index] += 1
+            series['sum'] += value
+            series['count'] += 1
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            for key, series in sorted(self._series.items()):
+                cumulative = 0
+                for bound, count in zip(self.buckets, series['counts']):
+                    cumulative += count
+                    lines.append(f"{self.name}_bucket{_format_labels(key, ('le', bound))} {cumulative}")
+                lines.append(f"{self.name}_bucket{_format_labels(key, ('le', '+Inf'))} {series['count']}")
+                lines.append(f"{self.name}_sum{_format_labels(key)} {series['sum']}")
+                lines.append(f"{self.name}_count{_format_labels(key)} {series['count']}")
+        return lines
+
+
+STAGE_SECONDS = Histogram('sql_chatbot_stage_seconds', 'Latency of each query pipeline stage.', LATENCY_BUCKETS)
+QUERY_SECONDS = Histogram('sql_chatbot_query_seconds', 'End-to-end latency of a query.', LATENCY_BUCKETS)
+RESULT_ROWS = Histogram('sql_chatbot_result_rows', 'Rows returned by the generated SQL.', COUNT_BUCKETS)
+LLM_TOKENS = Histogram('sql_chatbot_llm_tokens', 'Tokens per LLM call, by call and direction.', COUNT_BUCKETS)
+QUERIES = Counter('sql_chatbot_queries_total', 'Queries by how they were answered.')
+SLOW_QUERIES = Counter('sql_chatbot_slow_queries_total', 'Queries slower than SLOW_QUERY_SECONDS.')
+
+METRICS = [STAGE_SECONDS, QUERY_SECONDS, RESULT_ROWS, LLM_TOKENS, QUERIES, SLOW_QUERIES]
+
+_current = contextvars.ContextVar('query_trace', default=None)
+_listeners = []
+
+
+class Trace:
+    def __init__(self, query):
+        self.query = query
+        self.spans = []
+        self.attributes = {}
+        self.start = time.perf_counter()
+        self.elapsed = None
+
+    def annotate(self, **attributes):
+        self.attributes.update(attributes)
+
+
+def current_trace():
+    return _current.get()
+
+
+def annotate(**attributes):
+    trace = _current.get()
+    if trace is not None:
+        trace.annotate(**attributes)
+
+
+@contextmanager
+def span(stage):
+    # Times one pipeline stage into STAGE_SECONDS and the current trace (if any).
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - start
+        STAGE_SECONDS.observe(elapsed, stage=stage)
+        trace = _current.get()
+        if trace is not None:
+            trace.spans.append((stage, elapsed))
+        logger.debug("stage %s took %.1f ms", stage, elapsed * 1000)
+
+
+@contextmanager
+def trace_query(query):
+    # One trace per question: records the outcome, end-to-end latency and, above
+    # SLOW_QUERY_SECONDS, a slow-query log entry with the SQL and its plan.
+    trace = Trace(query)
+    previous = _current.get()
+    _current.set(trace)
+    try:
+        yield trace
+    except Exception as e:
+        trace.annotate(outcome='error', error=str(e))
+        raise
+    finally:
+        # set rather than reset(token): process_stream is a generator and may be closed
+        # from a different context than the one it started in
+        _current.set(previous)
+        finish_trace(trace)
+
+
+def add_trace_listener(listener):
+    # listener(trace) is called with every finished trace (trace.elapsed is set), e.g. by
+    # bench_pipeline.py to collect exact per-stage timings rather than histogram buckets.
+    _listeners.append(listener)
+
+
+def remove_trace_listener(listener):
+    if listener in _listeners:
+        _listeners.remove(listener)
+
+
+def finish_trace(trace):
+    elapsed = trace.elapsed = time.perf_counter() - trace.start
+    outcome = trace.attributes.get('outcome', 'llm')
+    QUERY_SECONDS.observe(elapsed, outcome=outcome)
+    QUERIES.inc(outcome=outcome)
+    stages = ' '.join(f"{stage}={seconds * 1000:.1f}ms" for stage, seconds in trace.spans)
+    logger.info("query answered via %s in %.1f ms: %s", outcome, elapsed * 1000, stages)
+    if elapsed >= SLOW_QUERY_SECONDS:
+        SLOW_QUERIES.inc()
+        slow_query_logger.warning("slow query (%.2f s): %r | stages: %s | sql: %s | plan: %s",
+                                  elapsed, trace.query, stages, trace.attributes.get('sql'),
+                                  trace.attributes.get('plan'))
+    for listener in list(_listeners):
+        listener(trace)
+
+
+def observe_llm_usage(call, response):
+    usage = getattr(response, 'usage', None)
+    for direction in ('prompt_tokens', 'completion_tokens'):
+        value = getattr(usage, direction, None)
+        if value is not None:
+            LLM_TOKENS.observe(value, call=call, direction=direction.split('_')[0])
+
+
+def render_prometheus():
+    lines = []
+    for metric in METRICS:
+        lines.extend(metric.render())
+    return '\n'.join(lines) + '\n'
+
+
+def render_gauges(prefix, values):
+    # Point-in-time numbers (pool, cache, job queue) exported alongside the histograms.
+    lines = []
+    for name, value in values.items():
+        if isinstance(value, (int, float)) and not isinstance(value, bool):
+            lines += [f"# TYPE {prefix}_{name} gauge", f"{prefix}_{name} {value}"]
+    return '\n'.join(lines) + '\n' if lines else ''
+
+
+def configure_logging():
+    # Level-gated output in place of print(): LOG_LEVEL=DEBUG shows per-stage timings,
+    # WARNING keeps only slow queries, full scans and errors.
+    logging.basicConfig(level=os.environ.get("LOG_LEVEL", "INFO").upper(),
+                        format="%(asctime)s %(levelname)s %(name)s: %(message)s")
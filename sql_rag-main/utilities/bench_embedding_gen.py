@@ -0,0 +1,73 @@
+import argparse
+import itertools
+import time
+
+import numpy as np
+from sentence_transformers import SentenceTransformer
+
+from embedding_gen import (find_similar_terms, iter_csv, load_embeddings, load_terms, normalize_rows,
+                           row_text, tag_batch, tag_rows)
+
+
+def loop_tagging(rows, model, embeddings, terms, relative_threshold, top_n):
+    # The original per-row path: one encode, one full cosine and argsort per row.
+    return [find_similar_terms(model.encode(row_text(row)), embeddings, terms, relative_threshold, top_n)
+            for row in rows]
+
+
+def batch_tagging(rows, model, term_matrix, terms, relative_threshold, top_n, batch_size):
+    return [tags for _, tags in tag_rows(rows, model, term_matrix, terms, relative_threshold, top_n, batch_size)]
+
+
+def same_terms(a, b):
+    return [t for t, _ in a] == [t for t, _ in b]
+
+
+def timed(fn):
+    start = time.perf_counter()
+    result = fn()
+    return result, time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark per-row vs batched similar-term tagging.")
+    parser.add_argument('--input_csv', type=str, default='company_info_updated.csv', help='CSV whose rows are tagged.')
+    parser.add_argument('--embeddings_file', type=str, default='embeddings.npy', help='Term embeddings.')
+    parser.add_argument('--terms_file', type=str, default='industries_list_dedup.txt', help='Terms file.')
+    parser.add_argument('--rows', type=int, default=500, help='Number of CSV rows to tag.')
+    parser.add_argument('--batch_sizes', type=int, nargs='+', default=[32, 64, 128], help='Batch sizes to try.')
+    parser.add_argument('--relative_threshold', type=float, default=0.8)
+    parser.add_argument('--top_n', type=int, default=5)
+    args = parser.parse_args()
+
+    model = SentenceTransformer('all-MiniLM-L6-v2')
+    embeddings = load_embeddings(args.embeddings_file)
+    terms = load_terms(args.terms_file)
+    rows = list(itertools.islice(iter_csv(args.input_csv), args.rows))
+    n = len(rows)
+    model.encode(row_text(rows[0]))  # warm-up
+
+    baseline, loop_time = timed(lambda: loop_tagging(rows, model, embeddings, terms, args.relative_threshold, args.top_n))
+    print(f"{'mode':<22} {'seconds':>9} {'rows/sec':>10} {'speedup':>8} {'agree':>7}")
+    print(f"{'per-row loop':<22} {loop_time:>9.2f} {n / loop_time:>10.1f} {'1.0x':>8} {'-':>7}")
+
+    term_matrix, norm_time = timed(lambda: normalize_rows(embeddings))
+    for batch_size in args.batch_sizes:
+        tagged, batch_time = timed(lambda: batch_tagging(rows, model, term_matrix, terms,
+                                                         args.relative_threshold, args.top_n, batch_size))
+        agree = sum(same_terms(a, b) for a, b in zip(baseline, tagged)) / n
+        print(f"{'batched (' + str(batch_size) + ')':<22} {batch_time:>9.2f} {n / batch_time:>10.1f} "
+              f"{loop_time / batch_time:>7.1f}x {agree:>6.1%}")
+
+    # Scoring alone, with encoding taken out of both sides.
+    row_embeddings = model.encode([row_text(row) for row in rows], batch_size=64)
+    _, loop_score = timed(lambda: [find_similar_terms(e, embeddings, terms, args.relative_threshold, args.top_n)
+                                   for e in row_embeddings])
+    _, batch_score = timed(lambda: tag_batch(np.asarray(row_embeddings), term_matrix, terms,
+                                             args.relative_threshold, args.top_n))
+    print(f"scoring only: loop {n / loop_score:.0f} rows/sec, batched {n / batch_score:.0f} rows/sec "
+          f"({loop_score / batch_score:.1f}x; term matrix normalized once in {norm_time * 1000:.2f} ms)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,79 @@
+import argparse
+import os
+import tempfile
+import time
+
+import numpy as np
+
+from vector_search import FlatIndex, IVFIndex, HNSWIndex, build_store, normalize_rows
+
+
+def brute_force(queries, embeddings, k):
+    # Baseline: the per-chunk Python loop in similar_industry_retrieve, vectorized only
+    # enough to finish at larger sizes (full sort, no pre-normalization).
+    results = []
+    norms = np.linalg.norm(embeddings, axis=1)
+    for q in queries:
+        scores = embeddings @ q / (norms * np.linalg.norm(q))
+        results.append([int(i) for i in np.argsort(-scores)[:k]])
+    return results
+
+
+def recall(truth, found, k):
+    hits = sum(len(set(t[:k]) & {i for i, _ in f[:k]}) for t, f in zip(truth, found))
+    return hits / float(len(truth) * k)
+
+
+def timed(fn):
+    start = time.perf_counter()
+    result = fn()
+    return result, time.perf_counter() - start
+
+
+def synthetic(n, dim, clusters, seed):
+    # Clustered vectors look more like sentence embeddings than uniform noise.
+    rng = np.random.default_rng(seed)
+    centers = rng.standard_normal((clusters, dim)).astype(np.float32)
+    data = centers[rng.integers(0, clusters, n)] + 0.5 * rng.standard_normal((n, dim)).astype(np.float32)
+    return data
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Recall/latency of the vector store against brute force.")
+    parser.add_argument('--sizes', type=int, nargs='+', default=[683, 10000, 100000], help='Number of stored vectors.')
+    parser.add_argument('--queries', type=int, default=100, help='Queries per run.')
+    parser.add_argument('--dim', type=int, default=384, help='Embedding dimension (all-MiniLM-L6-v2 is 384).')
+    parser.add_argument('--k', type=int, default=5, help='Neighbours returned.')
+    parser.add_argument('--nprobe', type=int, default=8, help='IVF lists probed per query.')
+    args = parser.parse_args()
+
+    print(f"{'size':>8} {'index':<14} {'build_s':>8} {'ms/query':>9} {'recall@k':>9}")
+    with tempfile.TemporaryDirectory() as tmp:
+        for n in args.sizes:
+            data = synthetic(n, args.dim, max(8, n // 500), seed=n)
+            queries = data[np.random.default_rng(1).integers(0, n, args.queries)] + 0.1
+            truth, base_time = timed(lambda: brute_force(queries, data, args.k))
+            print(f"{n:>8} {'brute force':<14} {0.0:>8.2f} {base_time * 1000 / args.queries:>9.3f} {1.0:>9.3f}")
+
+            variants = []
+            for dtype in ('float32', 'float16', 'int8'):
+                path = os.path.join(tmp, f"{n}_{dtype}")
+                _, build = timed(lambda: build_store(data, path, dtype))
+                variants.append((f"flat {dtype}", FlatIndex.load(path), build))
+            flat = FlatIndex.from_embeddings(data)
+            ivf, build = timed(lambda: IVFIndex(flat, nprobe=args.nprobe))
+            variants.append((f"ivf (p={args.nprobe})", ivf, build))
+            try:
+                hnsw, build = timed(lambda: HNSWIndex(flat))
+                variants.append(("hnsw", hnsw, build))
+            except ImportError as e:
+                print(f"{n:>8} {'hnsw':<14} skipped: {e}")
+
+            for name, index, build in variants:
+                found, elapsed = timed(lambda: index.search(queries, k=args.k))
+                print(f"{n:>8} {name:<14} {build:>8.2f} {elapsed * 1000 / args.queries:>9.3f} "
+                      f"{recall(truth, found, args.k):>9.3f}")
+
+
+if __name__ == "__main__":
+    main()
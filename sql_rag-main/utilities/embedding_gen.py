@@ -1,16 +1,36 @@
 import numpy as np
-from sentence_transformers import SentenceTransformer
 import argparse
 import csv
+import os
+import sqlite3
+import sys
+
+# rollups.py lives in the app directory, one level up
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from rollups import available_rollups, refresh_rollups
 
 def load_csv(file_path):
     with open(file_path, 'r', encoding='utf-8') as f:
         reader = csv.DictReader(f)
         return list(reader)
 
+def iter_csv(file_path):
+    with open(file_path, 'r', encoding='utf-8') as f:
+        reader = csv.DictReader(f)
+        for row in reader:
+            yield row
+
+def csv_fieldnames(file_path):
+    with open(file_path, 'r', encoding='utf-8') as f:
+        return csv.DictReader(f).fieldnames
+
 def load_embeddings(file_path):
     return np.load(file_path, allow_pickle=True)
 
+def load_terms(file_path):
+    with open(file_path, 'r') as f:
+        return [line.strip() for line in f]
+
 def cosine_similarity(a, b):
     return np.dot(a, b.T) / (np.linalg.norm(a) * np.linalg.norm(b, axis=1))
 
@@ -18,10 +38,66 @@ def find_similar_terms(row_embedding, embeddings, terms, relative_threshold=0.8,
     similarities = cosine_similarity(row_embedding, embeddings)
     max_similarity = np.max(similarities)
     threshold = max_similarity * relative_threshold
-    
+
     similar_indices = np.argsort(similarities)[-top_n:][::-1]
     return [(terms[i], similarities[i]) for i in similar_indices if similarities[i] >= threshold]
 
+def normalize_rows(matrix):
+    matrix = np.asarray(matrix, dtype=np.float32)
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return matrix / norms
+
+def row_text(row):
+    # Existing tags are output, not content: leave them out so re-tagging a tagged
+    # file gives the same result as tagging the raw one. (The original loop embedded
+    # every column, so a tagged file's old tags used to leak into its new ones.)
+    return ' '.join(v or '' for k, v in row.items() if k != 'similar_terms')
+
+def batched(iterable, size):
+    batch = []
+    for item in iterable:
+        batch.append(item)
+        if len(batch) == size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+def top_terms(similarities, terms, relative_threshold=0.8, top_n=5):
+    # similarities: (rows, terms). argpartition finds each row's top_n in linear time;
+    # only those top_n are then sorted.
+    top_n = min(top_n, similarities.shape[1])
+    candidates = np.argpartition(-similarities, top_n - 1, axis=1)[:, :top_n]
+    scores = np.take_along_axis(similarities, candidates, axis=1)
+    order = np.argsort(-scores, axis=1)
+    candidates = np.take_along_axis(candidates, order, axis=1)
+    scores = np.take_along_axis(scores, order, axis=1)
+    thresholds = scores[:, :1] * relative_threshold
+    results = []
+    for row_candidates, row_scores, threshold in zip(candidates, scores, thresholds[:, 0]):
+        results.append([(terms[i], float(s)) for i, s in zip(row_candidates, row_scores) if s >= threshold])
+    return results
+
+def tag_batch(row_embeddings, term_matrix, terms, relative_threshold=0.8, top_n=5):
+    # term_matrix must already be row-normalized (normalize_rows), so one matrix
+    # multiply gives the cosine similarity of every row against every term.
+    similarities = normalize_rows(row_embeddings) @ term_matrix.T
+    return top_terms(similarities, terms, relative_threshold, top_n)
+
+def format_terms(similar_terms, delimiter='|'):
+    return delimiter.join([f"{term} ({score:.2f})" for term, score in similar_terms])
+
+def tag_rows(rows, model, term_matrix, terms, relative_threshold=0.8, top_n=5, batch_size=64):
+    for batch in batched(rows, batch_size):
+        row_embeddings = model.encode([row_text(row) for row in batch], batch_size=batch_size)
+        for row, similar_terms in zip(batch, tag_batch(row_embeddings, term_matrix, terms, relative_threshold, top_n)):
+            yield row, similar_terms
+
+def write_tags_to_db(conn, table, key_columns, updates):
+    where = ' AND '.join(f"{column} = ?" for column in key_columns)
+    conn.executemany(f"UPDATE {table} SET similar_terms = ? WHERE {where}", updates)
+
 def main():
     parser = argparse.ArgumentParser(description="Compare CSV rows with embeddings and store similar terms.")
     parser.add_argument('--company_info_csv', type=str, default='event_info.csv', help='Path to the input CSV file.')
@@ -31,31 +107,50 @@ def main():
     parser.add_argument('--relative_threshold', type=float, default=0.8, help='Relative threshold for similarity (0-1).')
     parser.add_argument('--top_n', type=int, default=5, help='Number of top similar terms to consider.')
     parser.add_argument('--delimiter', type=str, default='|', help='Delimiter for similar terms.')
+    parser.add_argument('--batch_size', type=int, default=64, help='Rows encoded and scored per batch.')
+    parser.add_argument('--sqlite_db', type=str, help='Also write the tags into this SQLite database.')
+    parser.add_argument('--table', type=str, default='event_info', help='Table updated when --sqlite_db is set.')
+    parser.add_argument('--key_columns', type=str, nargs='+', default=['event_url'], help='Columns identifying a CSV row in --table.')
     args = parser.parse_args()
 
+    # imported here so the tagging functions can be used without torch installed
+    from sentence_transformers import SentenceTransformer
     model = SentenceTransformer('all-MiniLM-L6-v2')
-    csv_data = load_csv(args.company_info_csv)
-    embeddings = load_embeddings(args.embeddings_file)
-    
-    with open(args.terms_file, 'r') as f:
-        terms = [line.strip() for line in f]
+    term_matrix = normalize_rows(load_embeddings(args.embeddings_file))
+    terms = load_terms(args.terms_file)
+
+    conn = sqlite3.connect(args.sqlite_db) if args.sqlite_db else None
+    input_fields = csv_fieldnames(args.company_info_csv)
+    fieldnames = input_fields + ([] if 'similar_terms' in input_fields else ['similar_terms'])
 
-    # Write results to the output CSV
+    # Rows are read, tagged and written one batch at a time, so memory stays flat
+    # regardless of the input size.
+    count = 0
     with open(args.output_csv, 'w', newline='', encoding='utf-8') as f:
-        fieldnames = list(csv_data[0].keys()) + ['similar_terms']
         writer = csv.DictWriter(f, fieldnames=fieldnames)
         writer.writeheader()
 
-        for row in csv_data:
-            row_text = ' '.join(row.values())
-            row_embedding = model.encode(row_text)
-            similar_terms = find_similar_terms(row_embedding, embeddings, terms, args.relative_threshold, args.top_n)
-            
-            new_row = row.copy()
-            new_row['similar_terms'] = args.delimiter.join([f"{term} ({score:.2f})" for term, score in similar_terms])
-            writer.writerow(new_row)
+        tagged = tag_rows(iter_csv(args.company_info_csv), model, term_matrix, terms,
+                          args.relative_threshold, args.top_n, args.batch_size)
+        for batch in batched(tagged, args.batch_size):
+            updates = []
+            for row, similar_terms in batch:
+                new_row = row.copy()
+                new_row['similar_terms'] = format_terms(similar_terms, args.delimiter)
+                writer.writerow(new_row)
+                updates.append([new_row['similar_terms']] + [row[k] for k in args.key_columns])
+            if conn is not None:
+                write_tags_to_db(conn, args.table, args.key_columns, updates)
+            count += len(batch)
 
-    print(f"Results written to {args.output_csv}")
+    if conn is not None:
+        # every row was retagged, so every event's tag-derived rollups are stale
+        if available_rollups(conn):
+            refresh_rollups(conn)
+        conn.commit()
+        conn.close()
+        print(f"Tags written to {args.sqlite_db} ({args.table})")
+    print(f"Results for {count} rows written to {args.output_csv}")
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
@@ -0,0 +1,228 @@
+import argparse
+import hashlib
+import json
+import os
+import sqlite3
+import sys
+import time
+
+import numpy as np
+
+from embedding_gen import (batched, format_terms, iter_csv, load_embeddings, load_terms, normalize_rows,
+                           row_text, top_terms, write_tags_to_db)
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from rollups import refresh_tagged_rows
+
+MODEL_NAME = 'all-MiniLM-L6-v2'
+
+# Sidecar store kept next to the data: per-row content hash, cached row embedding and the
+# row's unthresholded top-n candidates (exact scores), plus a signature for every term.
+# With these, a refresh only encodes new/changed rows and only scores added terms.
+# `settings` records what the stored state was computed with; see settings_changes.
+STORE_SCHEMA = """
+CREATE TABLE IF NOT EXISTS row_state (
+    row_key TEXT PRIMARY KEY,
+    content_hash TEXT NOT NULL,
+    embedding BLOB NOT NULL,
+    candidates TEXT NOT NULL,
+    similar_terms TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS term_state (
+    term TEXT PRIMARY KEY,
+    signature TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS settings (
+    name TEXT PRIMARY KEY,
+    value TEXT NOT NULL
+);
+"""
+
+
+def content_hash(text):
+    return hashlib.sha1(text.encode('utf-8')).hexdigest()
+
+
+def term_signature(embedding):
+    return hashlib.sha1(np.ascontiguousarray(embedding, dtype=np.float32).tobytes()).hexdigest()
+
+
+def row_key(row, key_columns):
+    return json.dumps([row.get(k) or '' for k in key_columns])
+
+
+def open_store(path):
+    store = sqlite3.connect(path)
+    store.executescript(STORE_SCHEMA)
+    return store
+
+
+def term_changes(store, terms, embeddings):
+    stored = dict(store.execute("SELECT term, signature FROM term_state").fetchall())
+    current = {term: term_signature(embeddings[i]) for i, term in enumerate(terms)}
+    added = [t for t, sig in current.items() if t not in stored]
+    # A term whose embedding changed invalidates its old scores just like a removal.
+    removed = [t for t, sig in stored.items() if t not in current or current[t] != sig]
+    added += [t for t in removed if t in current]
+    return current, added, removed
+
+
+def settings_changes(store, settings):
+    # Names of the settings that differ from the ones the stored state was built with.
+    # An empty store has nothing to compare, so every row is new anyway; a store written
+    # before settings were recorded has rows of unknown settings, so all of them differ.
+    stored = dict(store.execute("SELECT name, value FROM settings").fetchall())
+    if not stored and store.execute("SELECT 1 FROM row_state LIMIT 1").fetchone() is None:
+        return []
+    return sorted(name for name, value in settings.items() if stored.get(name) != value)
+
+
+def candidates_for(similarities, terms, top_n):
+    # relative_threshold=0 keeps all top_n; the threshold is applied when formatting so
+    # a later term change can still promote a previously filtered candidate.
+    return top_terms(similarities, terms, relative_threshold=0.0, top_n=top_n)
+
+
+def apply_threshold(candidates, relative_threshold):
+    if not candidates:
+        return []
+    threshold = candidates[0][1] * relative_threshold
+    return [(t, s) for t, s in candidates if s >= threshold]
+
+
+def merge_candidates(old, new, top_n):
+    merged = {t: s for t, s in old}
+    merged.update({t: s for t, s in new})
+    return sorted(merged.items(), key=lambda item: -item[1])[:top_n]
+
+
+def refresh(csv_path, store, model, embeddings, terms, key_columns, relative_threshold=0.8, top_n=5,
+            delimiter='|', batch_size=64, model_name=MODEL_NAME):
+    term_matrix = normalize_rows(embeddings)
+    term_index = {t: i for i, t in enumerate(terms)}
+    current_terms, added, removed = term_changes(store, terms, embeddings)
+    settings = {'model': model_name, 'top_n': str(top_n), 'relative_threshold': repr(float(relative_threshold)),
+                'delimiter': delimiter}
+    changed_settings = settings_changes(store, settings)
+    # Any changed setting retags every row: a different model re-encodes them, top_n,
+    # the threshold or the delimiter rescore them from the cached embeddings.
+    full_rescore = bool(removed) or bool(changed_settings)
+    added_idx = [term_index[t] for t in added]
+
+    stats = {'rows': 0, 'encoded': 0, 'rescored': 0, 'changed': 0, 'deleted': 0,
+             'terms_added': len(added), 'terms_removed': len(removed), 'settings_changed': changed_settings}
+    seen = set()
+    updates = []
+    state = {}
+    for key, content, embedding, candidates, tags in store.execute(
+            "SELECT row_key, content_hash, embedding, candidates, similar_terms FROM row_state"):
+        state[key] = (content, embedding, candidates, tags)
+    reencode = 'model' in changed_settings
+
+    for batch in batched(iter_csv(csv_path), batch_size):
+        keys, texts, hashes = [], [], []
+        for row in batch:
+            key = row_key(row, key_columns)
+            text = row_text(row)
+            keys.append(key)
+            texts.append(text)
+            hashes.append(content_hash(text))
+            seen.add(key)
+
+        stale = [i for i, key in enumerate(keys) if reencode or key not in state or state[key][0] != hashes[i]]
+        row_embeddings = {}
+        if stale:
+            encoded = model.encode([texts[i] for i in stale], batch_size=batch_size)
+            for i, emb in zip(stale, np.atleast_2d(encoded)):
+                row_embeddings[i] = np.asarray(emb, dtype=np.float32)
+            stats['encoded'] += len(stale)
+
+        for i, key in enumerate(keys):
+            if i in row_embeddings:
+                emb = row_embeddings[i]
+                sims = normalize_rows(emb[None, :]) @ term_matrix.T
+                candidates = candidates_for(sims, terms, top_n)[0]
+            else:
+                emb = np.frombuffer(state[key][1], dtype=np.float32)
+                old = [tuple(c) for c in json.loads(state[key][2])]
+                if full_rescore:
+                    sims = normalize_rows(emb[None, :]) @ term_matrix.T
+                    candidates = candidates_for(sims, terms, top_n)[0]
+                elif added_idx:
+                    sims = normalize_rows(emb[None, :]) @ term_matrix[added_idx].T
+                    new = candidates_for(sims, [terms[j] for j in added_idx], top_n)[0]
+                    candidates = merge_candidates(old, new, top_n)
+                else:
+                    continue
+                stats['rescored'] += 1
+
+            tags = format_terms(apply_threshold(candidates, relative_threshold), delimiter)
+            store.execute(
+                "INSERT OR REPLACE INTO row_state (row_key, content_hash, embedding, candidates, similar_terms) "
+                "VALUES (?, ?, ?, ?, ?)",
+                (key, hashes[i], emb.tobytes(), json.dumps(candidates), tags))
+            if changed_settings or key not in state or state[key][3] != tags:
+                updates.append([tags] + json.loads(key))
+        stats['rows'] += len(batch)
+
+    gone = [key for key in state if key not in seen]
+    store.executemany("DELETE FROM row_state WHERE row_key = ?", [(key,) for key in gone])
+    stats['deleted'] = len(gone)
+
+    store.execute("DELETE FROM term_state")
+    store.executemany("INSERT INTO term_state (term, signature) VALUES (?, ?)", current_terms.items())
+    store.execute("DELETE FROM settings")
+    store.executemany("INSERT INTO settings (name, value) VALUES (?, ?)", settings.items())
+    stats['changed'] = len(updates)
+    return updates, stats
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Re-tag only new or changed rows and apply the tags in place.")
+    parser.add_argument('--input_csv', type=str, default='company_info_updated.csv', help='CSV to tag.')
+    parser.add_argument('--embeddings_file', type=str, default='embeddings.npy', help='Term embeddings.')
+    parser.add_argument('--terms_file', type=str, default='industries_list_dedup.txt', help='Terms file.')
+    parser.add_argument('--store', type=str, default='tagging_state.db', help='Sidecar store of row hashes and embeddings.')
+    parser.add_argument('--sqlite_db', type=str, default='../events_database.db', help='Database updated in place.')
+    parser.add_argument('--table', type=str, default='companies', help='Table whose similar_terms are updated.')
+    parser.add_argument('--key_columns', type=str, nargs='+', default=['homepage_base_url', 'event_url'],
+                        help='Columns identifying a CSV row in --table.')
+    parser.add_argument('--relative_threshold', type=float, default=0.8, help='Relative threshold for similarity (0-1).')
+    parser.add_argument('--top_n', type=int, default=5, help='Number of top similar terms to consider.')
+    parser.add_argument('--delimiter', type=str, default='|', help='Delimiter for similar terms.')
+    parser.add_argument('--batch_size', type=int, default=64, help='Rows encoded per batch.')
+    parser.add_argument('--model', type=str, default=MODEL_NAME,
+                        help='Sentence-transformers model; must be the one that produced --embeddings_file.')
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    # imported here so refresh() can be used without torch installed
+    from sentence_transformers import SentenceTransformer
+    model = SentenceTransformer(args.model)
+    embeddings = load_embeddings(args.embeddings_file)
+    terms = load_terms(args.terms_file)
+
+    store = open_store(args.store)
+    conn = sqlite3.connect(args.sqlite_db)
+    try:
+        updates, stats = refresh(args.input_csv, store, model, embeddings, terms, args.key_columns,
+                                 args.relative_threshold, args.top_n, args.delimiter, args.batch_size, args.model)
+        write_tags_to_db(conn, args.table, args.key_columns, updates)
+        rollup_stats = refresh_tagged_rows(conn, args.table, args.key_columns, updates)
+        conn.commit()
+        store.commit()
+    finally:
+        conn.close()
+        store.close()
+
+    if stats['settings_changed']:
+        print(f"Settings changed ({', '.join(stats['settings_changed'])}): retagged every row")
+    print(f"{stats['rows']} rows checked, {stats['encoded']} encoded, {stats['rescored']} rescored, "
+          f"{stats['changed']} tags updated in {args.table}, {stats['deleted']} removed from the store "
+          f"(terms +{stats['terms_added']}/-{stats['terms_removed']}) in {time.perf_counter() - start:.2f}s")
+    if rollup_stats:
+        print(f"Refreshed rollups for {rollup_stats['events']} events and {rollup_stats['industries']} industries")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,7 +1,7 @@
 import numpy as np
 from sentence_transformers import SentenceTransformer, util
 import argparse
-import numpy as np
+from vector_search import FlatIndex, open_index
 
 def load_chunks(file_path):
     return np.load(file_path)
@@ -14,29 +14,26 @@ def cosine_similarity(a, b):
     b = np.atleast_2d(b)
     return np.dot(a, b.T) / (np.linalg.norm(a) * np.linalg.norm(b))
 def find_most_similar_chunks(input_text, chunks, embeddings, model,num_chunks=3,similarity_threshold=0.5):
+    # One matrix multiply over all chunks (see vector_search.FlatIndex) instead of a
+    # per-chunk cosine_similarity call and a full sort.
+    index = embeddings if hasattr(embeddings, 'search') else FlatIndex.from_embeddings(embeddings)
     input_embedding = model.encode(input_text)
-    similarities = []
-    for i, chunk in enumerate(chunks):
-        chunk_embedding = embeddings[i]
-        similarity = cosine_similarity([input_embedding], [chunk_embedding])[0][0]
-        if similarity >= similarity_threshold:
-            similarities.append((similarity, chunk))
-    
-    # Sort similarities in descending order and get the top num_chunks
-    most_similar = sorted(similarities, key=lambda x: x[0], reverse=True)[:num_chunks]
-    return [chunk for _, chunk in most_similar]
+    hits = index.search(input_embedding, k=num_chunks, threshold=similarity_threshold)[0]
+    return [chunks[i] for i, _ in hits]
 
 def main():
     parser = argparse.ArgumentParser(description="Perform similarity-based search on code chunks.")
     parser.add_argument('input_text', type=str, help='The input text to search for similar code chunks.')
     parser.add_argument('--chunks_file', type=str, default='chunks.npy', help='Path to the file containing code chunks.')
     parser.add_argument('--embeddings_file', type=str, default='embeddings.npy', help='Path to the file containing embeddings.')
+    parser.add_argument('--store', type=str, help='Memory-mapped store built by vector_search.py; used instead of --embeddings_file.')
+    parser.add_argument('--index', type=str, default='flat', choices=['flat', 'ivf', 'hnsw'], help='Search index over --store.')
 
     args = parser.parse_args()
 
     model = SentenceTransformer('all-MiniLM-L6-v2')
     chunks = load_chunks(args.chunks_file)
-    embeddings = load_embeddings(args.embeddings_file)
+    embeddings = open_index(args.store, args.index) if args.store else load_embeddings(args.embeddings_file)
     most_similar_chunks = find_most_similar_chunks(args.input_text, chunks, embeddings, model, num_chunks=3,similarity_threshold=0.5)
 
     for i, chunk in enumerate(most_similar_chunks, 1):
@@ -0,0 +1,278 @@
+import argparse
+import hashlib
+import json
+import os
+
+import numpy as np
+
+# On-disk layout for a store at <path>:
+#   <path>.vectors.npy  row-normalized vectors (float32, float16 or int8)
+#   <path>.scales.npy   per-row dequantization scale (int8 only)
+#   <path>.meta.json    dtype, count, dimension and a fingerprint of the vectors
+#   <path>.ivf.npz      trained IVF centroids and list assignments (written by open_index)
+#   <path>.hnsw.bin     hnswlib graph, with its build settings in <path>.hnsw.json
+# Vectors are opened with mmap_mode='r', so only the pages a search touches are read.
+# The trained indexes are reused while the store fingerprint and build settings match.
+
+DTYPES = ('float32', 'float16', 'int8')
+SEARCH_BLOCK_ROWS = 65536
+
+
+def normalize_rows(matrix):
+    matrix = np.asarray(matrix, dtype=np.float32)
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return matrix / norms
+
+
+def quantize_int8(vectors):
+    scales = np.abs(vectors).max(axis=1) / 127.0
+    scales[scales == 0] = 1.0
+    quantized = np.clip(np.rint(vectors / scales[:, None]), -127, 127).astype(np.int8)
+    return quantized, scales.astype(np.float32)
+
+
+def build_store(embeddings, path, dtype='float32'):
+    if dtype not in DTYPES:
+        raise ValueError(f"dtype must be one of {DTYPES}")
+    vectors = normalize_rows(embeddings)
+    if dtype == 'int8':
+        vectors, scales = quantize_int8(vectors)
+        np.save(f"{path}.scales.npy", scales)
+    else:
+        vectors, scales = vectors.astype(dtype), None
+    np.save(f"{path}.vectors.npy", vectors)
+    digest = hashlib.sha1(np.ascontiguousarray(vectors).tobytes())
+    if scales is not None:
+        digest.update(scales.tobytes())
+    with open(f"{path}.meta.json", 'w') as f:
+        json.dump({'dtype': dtype, 'count': int(vectors.shape[0]), 'dim': int(vectors.shape[1]),
+                   'fingerprint': digest.hexdigest()}, f)
+
+
+def store_fingerprint(path):
+    # Stores built before the fingerprint was recorded fall back to file sizes and mtimes.
+    with open(f"{path}.meta.json") as f:
+        meta = json.load(f)
+    if 'fingerprint' in meta:
+        return meta['fingerprint']
+    files = [p for p in (f"{path}.vectors.npy", f"{path}.scales.npy") if os.path.exists(p)]
+    stats = [(os.path.getsize(p), os.stat(p).st_mtime_ns) for p in files]
+    return hashlib.sha1(json.dumps([meta, stats]).encode('utf-8')).hexdigest()
+
+
+def _replace_with(target, write):
+    # Writes via a temporary file, so a reader never sees a half-written index.
+    scratch = f"{target}.tmp"
+    write(scratch)
+    os.replace(scratch, target)
+
+
+def top_k(scores, k, threshold=None):
+    # scores: (queries, rows) -> per query, [(row, score)] best first.
+    k = min(k, scores.shape[1])
+    if k <= 0:
+        return [[] for _ in range(scores.shape[0])]
+    idx = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+    part = np.take_along_axis(scores, idx, axis=1)
+    order = np.argsort(-part, axis=1)
+    idx = np.take_along_axis(idx, order, axis=1)
+    part = np.take_along_axis(part, order, axis=1)
+    results = []
+    for row_idx, row_scores in zip(idx, part):
+        hits = [(int(i), float(s)) for i, s in zip(row_idx, row_scores)]
+        if threshold is not None:
+            hits = [(i, s) for i, s in hits if s >= threshold]
+        results.append(hits)
+    return results
+
+
+def merge_top_k(a, b, k):
+    return [sorted(x + y, key=lambda hit: -hit[1])[:k] for x, y in zip(a, b)]
+
+
+class FlatIndex:
+    # Exact search: one matrix multiply per block of stored vectors.
+    def __init__(self, vectors, scales=None):
+        self.vectors = vectors
+        self.scales = scales
+
+    @classmethod
+    def load(cls, path, mmap=True):
+        mode = 'r' if mmap else None
+        vectors = np.load(f"{path}.vectors.npy", mmap_mode=mode)
+        scales = np.load(f"{path}.scales.npy") if os.path.exists(f"{path}.scales.npy") else None
+        return cls(vectors, scales)
+
+    @classmethod
+    def from_embeddings(cls, embeddings):
+        return cls(normalize_rows(embeddings))
+
+    def __len__(self):
+        return self.vectors.shape[0]
+
+    def scores(self, queries, start=0, stop=None):
+        block = np.asarray(self.vectors[start:stop], dtype=np.float32)
+        scores = queries @ block.T
+        if self.scales is not None:
+            scores *= self.scales[start:stop]
+        return scores
+
+    def search(self, queries, k=5, threshold=None):
+        queries = normalize_rows(np.atleast_2d(queries))
+        results = None
+        for start in range(0, len(self), SEARCH_BLOCK_ROWS):
+            block = top_k(self.scores(queries, start, start + SEARCH_BLOCK_ROWS), k, threshold)
+            block = [[(i + start, s) for i, s in hits] for hits in block]
+            results = block if results is None else merge_top_k(results, block, k)
+        return results or [[] for _ in range(queries.shape[0])]
+
+
+class IVFIndex:
+    # Inverted-file index: vectors are bucketed by their nearest k-means centroid and a
+    # query only scores the nprobe closest buckets. `trained` is a saved (centroids, assign).
+    def __init__(self, flat, nlist=None, nprobe=8, iterations=10, seed=0, trained=None):
+        self.flat = flat
+        self.nprobe = nprobe
+        self.settings = {'nlist': nlist or max(1, int(np.sqrt(len(flat)))), 'iterations': iterations, 'seed': seed}
+        self.centroids, self.assign = trained if trained is not None else self.train(**self.settings)
+        self.lists = [np.flatnonzero(self.assign == c) for c in range(self.centroids.shape[0])]
+
+    def train(self, nlist, iterations, seed):
+        n = len(self.flat)
+        rng = np.random.default_rng(seed)
+        data = np.asarray(self.flat.vectors, dtype=np.float32)
+        if self.flat.scales is not None:
+            data = normalize_rows(data * self.flat.scales[:, None])
+        centroids = data[rng.choice(n, size=min(nlist, n), replace=False)]
+        for _ in range(iterations):
+            assign = np.argmax(data @ centroids.T, axis=1)
+            for c in range(centroids.shape[0]):
+                members = data[assign == c]
+                if len(members):
+                    centroids[c] = members.mean(axis=0)
+            centroids = normalize_rows(centroids)
+        return centroids, np.argmax(data @ centroids.T, axis=1)
+
+    def save(self, path, fingerprint):
+        meta = json.dumps({'fingerprint': fingerprint, **self.settings})
+
+        def write(scratch):
+            with open(scratch, 'wb') as f:
+                np.savez(f, centroids=self.centroids, assign=self.assign, meta=np.array(meta))
+
+        _replace_with(f"{path}.ivf.npz", write)
+
+    @classmethod
+    def open(cls, path, flat, fingerprint, nlist=None, nprobe=8, iterations=10, seed=0):
+        # Reuses <path>.ivf.npz when it was trained on this store with the same settings.
+        index_path = f"{path}.ivf.npz"
+        settings = {'nlist': nlist or max(1, int(np.sqrt(len(flat)))), 'iterations': iterations, 'seed': seed}
+        if os.path.exists(index_path):
+            with np.load(index_path) as saved:
+                if json.loads(str(saved['meta'])) == {'fingerprint': fingerprint, **settings}:
+                    return cls(flat, nprobe=nprobe, trained=(saved['centroids'], saved['assign']), **settings)
+        index = cls(flat, nprobe=nprobe, **settings)
+        index.save(path, fingerprint)
+        return index
+
+    def search(self, queries, k=5, threshold=None):
+        queries = normalize_rows(np.atleast_2d(queries))
+        probes = np.argsort(-(queries @ self.centroids.T), axis=1)[:, :self.nprobe]
+        results = []
+        for query, lists in zip(queries, probes):
+            candidates = np.concatenate([self.lists[c] for c in lists])
+            if not len(candidates):
+                results.append([])
+                continue
+            block = np.asarray(self.flat.vectors[candidates], dtype=np.float32)
+            scores = block @ query
+            if self.flat.scales is not None:
+                scores *= self.flat.scales[candidates]
+            hits = top_k(scores[None, :], k, threshold)[0]
+            results.append([(int(candidates[i]), s) for i, s in hits])
+        return results
+
+
+def _hnswlib():
+    try:
+        import hnswlib
+    except ImportError as e:
+        raise ImportError("The hnsw index needs the optional hnswlib package (pip install hnswlib); "
+                          "use the 'flat' or 'ivf' index without it.") from e
+    return hnswlib
+
+
+class HNSWIndex:
+    # Graph-based ANN via the optional hnswlib package. `saved` is a file written by save().
+    def __init__(self, flat, m=16, ef_construction=200, ef=64, saved=None):
+        hnswlib = _hnswlib()
+        dim = flat.vectors.shape[1]
+        self.settings = {'m': m, 'ef_construction': ef_construction, 'dim': int(dim), 'count': len(flat)}
+        self.index = hnswlib.Index(space='ip', dim=dim)
+        if saved is not None:
+            self.index.load_index(saved, max_elements=len(flat))
+        else:
+            data = np.asarray(flat.vectors, dtype=np.float32)
+            if flat.scales is not None:
+                data = normalize_rows(data * flat.scales[:, None])
+            self.index.init_index(max_elements=data.shape[0], M=m, ef_construction=ef_construction)
+            self.index.add_items(data, np.arange(data.shape[0]))
+        self.index.set_ef(ef)
+
+    def save(self, path, fingerprint):
+        _replace_with(f"{path}.hnsw.bin", self.index.save_index)
+        with open(f"{path}.hnsw.json", 'w') as f:
+            json.dump({'fingerprint': fingerprint, **self.settings}, f)
+
+    @classmethod
+    def open(cls, path, flat, fingerprint, m=16, ef_construction=200, ef=64):
+        # Reuses <path>.hnsw.bin when it was built from this store with the same settings.
+        index_path, meta_path = f"{path}.hnsw.bin", f"{path}.hnsw.json"
+        settings = {'m': m, 'ef_construction': ef_construction, 'dim': int(flat.vectors.shape[1]), 'count': len(flat)}
+        if os.path.exists(index_path) and os.path.exists(meta_path):
+            with open(meta_path) as f:
+                if json.load(f) == {'fingerprint': fingerprint, **settings}:
+                    return cls(flat, m, ef_construction, ef, saved=index_path)
+        index = cls(flat, m, ef_construction, ef)
+        index.save(path, fingerprint)
+        return index
+
+    def search(self, queries, k=5, threshold=None):
+        queries = normalize_rows(np.atleast_2d(queries))
+        labels, distances = self.index.knn_query(queries, k=k)
+        results = []
+        for row_labels, row_dist in zip(labels, distances):
+            hits = [(int(i), float(1.0 - d)) for i, d in zip(row_labels, row_dist)]
+            if threshold is not None:
+                hits = [(i, s) for i, s in hits if s >= threshold]
+            results.append(hits)
+        return results
+
+
+def open_index(path, kind='flat', **kwargs):
+    # ivf and hnsw are trained once per store and saved next to it (see the layout above).
+    flat = FlatIndex.load(path)
+    if kind == 'flat':
+        return flat
+    if kind == 'ivf':
+        return IVFIndex.open(path, flat, store_fingerprint(path), **kwargs)
+    if kind == 'hnsw':
+        return HNSWIndex.open(path, flat, store_fingerprint(path), **kwargs)
+    raise ValueError(f"Unknown index kind: {kind}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Build a memory-mapped, pre-normalized embedding store.")
+    parser.add_argument('--embeddings_file', type=str, default='embeddings.npy', help='Source embeddings.')
+    parser.add_argument('--store', type=str, default='industries', help='Output store path prefix.')
+    parser.add_argument('--dtype', type=str, default='float32', choices=DTYPES, help='Storage precision.')
+    args = parser.parse_args()
+
+    embeddings = np.load(args.embeddings_file)
+    build_store(embeddings, args.store, args.dtype)
+    print(f"Stored {embeddings.shape[0]} vectors as {args.dtype} at {args.store}.vectors.npy")
+
+
+if __name__ == "__main__":
+    main()